@@ -0,0 +1,54 @@
+"""
+적립식 백테스트 배치 벤치마크
+10년치 합성 시세로 사용자 스케줄 10만 건을 evaluate_batch 한 번에 평가하는 시간을 측정
+
+실행: AI 디렉토리에서 `python -m benchmarks.bench_backtest [스케줄 수]`
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from function_calling.backtest import evaluate_batch, mask_index
+
+SYMBOLS = ["SPY", "QQQ", "EWY", "EWJ", "MCHI", "VGK"]
+
+
+def make_prices(years=10):
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=252 * years).values.astype("datetime64[D]")
+    prices = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, (len(SYMBOLS), len(dates))), axis=1))
+    return dates, prices
+
+
+def make_schedules(count):
+    rng = np.random.default_rng(1)
+    cycles = rng.choice(["daily", "weekly", "monthly"], count, p=[0.1, 0.3, 0.6])
+    days = np.where(cycles == "weekly", rng.integers(0, 7, count), rng.integers(1, 29, count))
+    mask_idx = np.array([mask_index(c, d) for c, d in zip(cycles, days)])
+    symbol_idx = rng.integers(0, len(SYMBOLS), count)
+    amounts = rng.choice([10.0, 20.0, 30.0, 50.0, 100.0], count)
+    # 사용자당 평균 2개 ETF
+    user_idx = np.sort(rng.integers(0, count // 2, count))
+    return user_idx, symbol_idx, mask_idx, amounts
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    dates, prices = make_prices()
+    user_idx, symbol_idx, mask_idx, amounts = make_schedules(count)
+    user_count = int(user_idx.max()) + 1
+
+    start = time.perf_counter()
+    result = evaluate_batch(dates, prices, user_idx, symbol_idx, mask_idx, amounts, user_count=user_count)
+    elapsed = time.perf_counter() - start
+
+    irr = result["irr"][~np.isnan(result["irr"])]
+    print(f"거래일 {len(dates):,}일, 스케줄 {count:,}건, 사용자 {user_count:,}명")
+    print(f"평가 시간: {elapsed:.2f}초 ({count / elapsed:,.0f} 스케줄/초)")
+    print(f"IRR 중앙값: {np.median(irr) * 100:.2f}%, 계산된 사용자: {len(irr):,}명")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+tool 결과 직렬화 벤치마크
+str(output) 방식과 serialize_tool_output 방식의 tool 메시지 크기(토큰 수)와 변환 시간을 비교
+
+실행: AI 디렉토리에서 `python -m benchmarks.bench_tool_serialization`
+"""
+
+import time
+import random
+import numpy as np
+import pandas as pd
+
+from function_calling.serializer import serialize_tool_output
+
+SYMBOLS = ["SPY", "QQQ", "EWY", "EWJ", "MCHI", "VGK"]
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+
+    def count_tokens(text):
+        return len(_encoding.encode(text))
+except ImportError:
+    # tiktoken이 없으면 근사치 사용 (ASCII 4글자당 1토큰, 그 외 글자당 1토큰)
+    def count_tokens(text):
+        ascii_count = sum(1 for ch in text if ord(ch) < 128)
+        return ascii_count // 4 + (len(text) - ascii_count)
+
+
+def make_finance_info(days=250):
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2024-07-01", periods=days).strftime("%Y-%m-%d").tolist()
+    infos = []
+    for symbol in SYMBOLS:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+        infos.append({
+            symbol: {
+                "날짜": dates,
+                "종가": close.tolist(),
+                "최고가": (close * 1.01).tolist(),
+                "최저가": (close * 0.99).tolist(),
+                "시가": (close * 1.001).tolist(),
+                "거래량": rng.integers(1e6, 5e7, days).astype(float).tolist(),
+            }
+        })
+    return infos
+
+
+def make_analized():
+    return [
+        {symbol: {key: [random.randint(0, 20) for _ in range(4)] for key in ("strongBuy", "buy", "hold", "sell", "strongSell")}}
+        for symbol in SYMBOLS
+    ]
+
+
+def make_financial():
+    items = [f"Item {i}" for i in range(40)]
+    return {
+        symbol: {f"202{y}-12-31": {item: random.random() * 1e10 for item in items} for y in range(1, 5)}
+        for symbol in SYMBOLS[:2]
+    }
+
+
+def make_news(n=30):
+    body = "미국 연준의 금리 결정과 글로벌 증시 흐름에 대한 기사 본문입니다. " * 40
+    return {f"뉴스 제목 {i}": body for i in range(n)}
+
+
+def make_korea_bank(n=20):
+    return [{"type": "동향 분석", f"보고서 {i}": "해외 경제 동향 분석 자료 본문 " * 60} for i in range(n)]
+
+
+CASES = {
+    "get_finance_info": make_finance_info(),
+    "get_finance_analized": make_analized(),
+    "get_financial": make_financial(),
+    "bring_recent_news_naver_global": make_news(),
+    "Korea_Bank_News_Text": make_korea_bank(),
+}
+
+
+def measure(fn, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    print(f"{'tool':<32}{'before(tok)':>12}{'after(tok)':>12}{'ratio':>8}{'before(ms)':>12}{'after(ms)':>12}")
+    for name, output in CASES.items():
+        before, before_ms = measure(lambda: str(output))
+        after, after_ms = measure(lambda: serialize_tool_output(name, output))
+        before_tokens, after_tokens = count_tokens(before), count_tokens(after)
+        print(
+            f"{name:<32}{before_tokens:>12,}{after_tokens:>12,}{after_tokens / before_tokens:>8.1%}"
+            f"{before_ms:>12.2f}{after_ms:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
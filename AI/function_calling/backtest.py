@@ -0,0 +1,302 @@
+"""
+적립식(DCA) 백테스트 엔진
+사용자의 ETF별 투자 설정(cycle/day/amount)이 과거 시세에서 어떤 성과를 냈을지 계산
+- 단일 사용자: 매입 원금, 보유 수량, 평가금액 곡선, IRR
+- 배치: 전체 사용자 스케줄을 (주기, 투자일, 심볼) 조합 단위로 묶어 NumPy 한 번에 평가
+"""
+
+import math
+from datetime import date, timedelta
+from typing import Optional
+
+import numpy as np
+
+from function_calling.price_store import price_store
+
+# 투자 주기별 투자일 범위 (BE InvestmentETFSettings 기준: 요일 0~6, 일 1~28)
+WEEKDAYS = 7
+MONTH_DAYS = 28
+# 조합 인덱스: daily -> 0, weekly -> 1~7, monthly -> 8~35
+MASK_COUNT = 1 + WEEKDAYS + MONTH_DAYS
+
+DEFAULT_YEARS = 10
+
+# 배치 IRR 계산용 연수익률 격자 (log(1+r) 균등 간격, -80% ~ +200%)
+IRR_GRID = np.expm1(np.linspace(math.log(0.2), math.log(3.0), 801))
+# 배치 IRR 계산 시 한 번에 NPV 곡선을 합산할 사용자 수 (메모리 사용량 제한)
+IRR_USER_CHUNK = 5000
+
+
+def mask_index(cycle: str, day: int) -> int:
+    """(주기, 투자일)을 매수일 마스크 인덱스로 변환"""
+    if cycle == "daily":
+        return 0
+    if cycle == "weekly":
+        return 1 + int(day) % WEEKDAYS
+    if cycle == "monthly":
+        return 1 + WEEKDAYS + min(max(int(day), 1), MONTH_DAYS) - 1
+    raise ValueError(f"지원하지 않는 투자 주기: {cycle}")
+
+
+def buy_counts(dates: np.ndarray) -> np.ndarray:
+    """모든 (주기, 투자일) 조합의 거래일별 매수 횟수 행렬 (MASK_COUNT x T)
+
+    예정일이 휴장일이면 그 다음 첫 거래일에 매수한다.
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    counts = np.zeros((MASK_COUNT, len(dates)), dtype=np.float64)
+    if len(dates) == 0:
+        return counts
+
+    counts[0] = 1.0
+    first, last = dates[0], dates[-1]
+
+    # 매주 (1970-01-01은 목요일 -> 월요일=0 기준 요일로 보정)
+    first_weekday = (first.astype(np.int64) + 3) % WEEKDAYS
+    for weekday in range(WEEKDAYS):
+        offset = (weekday - first_weekday) % WEEKDAYS
+        targets = np.arange(first + offset, last + 1, 7)
+        idx = np.searchsorted(dates, targets, side="left")
+        counts[1 + weekday] = np.bincount(idx[idx < len(dates)], minlength=len(dates))
+
+    # 매월
+    months = np.arange(first.astype("datetime64[M]"), last.astype("datetime64[M]") + 1)
+    month_starts = months.astype("datetime64[D]")
+    for day in range(1, MONTH_DAYS + 1):
+        targets = month_starts + (day - 1)
+        targets = targets[(targets >= first) & (targets <= last)]
+        idx = np.searchsorted(dates, targets, side="left")
+        counts[WEEKDAYS + day] = np.bincount(idx[idx < len(dates)], minlength=len(dates))
+
+    return counts
+
+
+def year_fractions(dates: np.ndarray) -> np.ndarray:
+    """첫 거래일 기준 경과 연수"""
+    days = (np.asarray(dates, dtype="datetime64[D]") - dates[0]).astype(np.float64)
+    return days / 365.0
+
+
+def irr(flows: np.ndarray, tau: np.ndarray, lo: float = -0.99, hi: float = 10.0, iterations: int = 100) -> Optional[float]:
+    """현금흐름(음수: 매입, 양수: 평가금액)의 연환산 IRR (이분법, 구간 내 근이 없으면 None)"""
+    def npv(rate):
+        return float(np.dot(flows, np.power(1.0 + rate, -tau)))
+
+    f_lo, f_hi = npv(lo), npv(hi)
+    if np.isnan(f_lo) or np.isnan(f_hi) or f_lo * f_hi > 0:
+        return None
+
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        f_mid = npv(mid)
+        if f_lo * f_mid <= 0:
+            hi = mid
+        else:
+            lo, f_lo = mid, f_mid
+    return (lo + hi) / 2
+
+
+def grid_root(npv: np.ndarray) -> np.ndarray:
+    """IRR_GRID 위의 NPV 곡선(행별)에서 근을 선형 보간으로 찾음
+
+    매입 후 마지막에 평가금액을 받는 흐름의 NPV는 수익률에 대해 감소 함수이므로
+    처음으로 음수가 되는 격자점과 그 직전 격자점 사이를 보간한다.
+    """
+    negative = npv < 0
+    has_root = negative.any(axis=1) & ~negative[:, 0]
+    right = np.where(has_root, negative.argmax(axis=1), 1)
+    rows = np.arange(len(npv))
+    f_left, f_right = npv[rows, right - 1], npv[rows, right]
+    r_left, r_right = IRR_GRID[right - 1], IRR_GRID[right]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roots = r_left + (r_right - r_left) * f_left / (f_left - f_right)
+    return np.where(has_root, roots, np.nan)
+
+
+def backtest_range(years=None, start=None, end=None):
+    """백테스트 구간 [start, end) 결정 (기본: 최근 years년)"""
+    end = end or (date.today() + timedelta(days=1)).isoformat()
+    if not start:
+        start_date = date.fromisoformat(end) - timedelta(days=round(365.25 * (years or DEFAULT_YEARS)))
+        start = start_date.isoformat()
+    return start, end
+
+
+def load_prices(symbols, start, end):
+    """심볼별 종가를 공통 거래일 축으로 정렬 (상장 전 구간은 NaN)"""
+    panel = price_store.get_panel(symbols, start, end).ffill()
+    dates = panel.index.values.astype("datetime64[D]")
+    return dates, panel.to_numpy(dtype=np.float64).T  # (S x T)
+
+
+def month_end_indices(dates: np.ndarray) -> np.ndarray:
+    """월말 마지막 거래일 인덱스 (곡선 축약용)"""
+    months = dates.astype("datetime64[M]")
+    return np.append(np.flatnonzero(months[1:] != months[:-1]), len(dates) - 1)
+
+
+# ----------------------------------------------------------------------
+# 단일 사용자
+# ----------------------------------------------------------------------
+def backtest_dca(schedules, years=None, start=None, end=None):
+    """한 사용자의 ETF별 적립식 스케줄 백테스트
+
+    Args:
+        schedules: [{"symbol", "cycle", "day", "amount"}, ...]
+    """
+    print("backtest_dca")
+    start, end = backtest_range(years, start, end)
+    symbols = list(dict.fromkeys(s["symbol"].upper() for s in schedules))
+    dates, prices = load_prices(symbols, start, end)
+    if len(dates) == 0:
+        return {"start": start, "end": end, "etfs": [], "total": None, "curve": []}
+
+    counts = buy_counts(dates)
+    tau = year_fractions(dates)
+    total_cash = np.zeros(len(dates))
+    total_value = np.zeros(len(dates))
+    etfs = []
+
+    for schedule in schedules:
+        price = prices[symbols.index(schedule["symbol"].upper())]
+        buys = counts[mask_index(schedule["cycle"], schedule["day"])] * ~np.isnan(price)
+        cash = buys * float(schedule["amount"])
+        units = np.cumsum(np.divide(cash, price, out=np.zeros_like(cash), where=cash > 0))
+        value = units * np.nan_to_num(price)
+
+        invested = float(cash.sum())
+        flows = -cash
+        flows[-1] += value[-1]
+        etfs.append({
+            "symbol": schedule["symbol"].upper(),
+            "cycle": schedule["cycle"],
+            "day": schedule["day"],
+            "amount": schedule["amount"],
+            "buy_count": int(buys.sum()),
+            "invested": invested,
+            "units": float(units[-1]),
+            "avg_cost": invested / units[-1] if units[-1] > 0 else None,
+            "value": float(value[-1]),
+            "return": float(value[-1] / invested - 1) if invested > 0 else None,
+            "irr": irr(flows, tau),
+        })
+        total_cash += cash
+        total_value += value
+
+    invested = float(total_cash.sum())
+    flows = -total_cash
+    flows[-1] += total_value[-1]
+    cost_basis = np.cumsum(total_cash)
+    curve_idx = month_end_indices(dates)
+
+    return {
+        "start": str(dates[0]),
+        "end": str(dates[-1]),
+        "etfs": etfs,
+        "total": {
+            "invested": invested,
+            "value": float(total_value[-1]),
+            "profit": float(total_value[-1]) - invested,
+            "return": float(total_value[-1] / invested - 1) if invested > 0 else None,
+            "irr": irr(flows, tau),
+        },
+        "curve": [
+            {"date": str(dates[i]), "invested": float(cost_basis[i]), "value": float(total_value[i])}
+            for i in curve_idx
+        ],
+    }
+
+
+# ----------------------------------------------------------------------
+# 배치 (리포팅용)
+# ----------------------------------------------------------------------
+def evaluate_batch(dates, prices, user_idx, symbol_idx, mask_idx, amounts, user_count=None):
+    """전체 스케줄을 조합 단위 행렬 연산으로 평가
+
+    매입 금액과 평가금액은 금액에 선형이므로 (마스크, 심볼) 조합별 단위 금액 결과만 계산한 뒤
+    스케줄별 금액을 곱해 합산한다. 사용자 IRR은 조합별 NPV 격자를 금액 가중합한 뒤 grid_root로 구한다.
+
+    Args:
+        dates: 거래일 (T,)
+        prices: 심볼별 종가 (S x T)
+        user_idx, symbol_idx, mask_idx, amounts: 스케줄별 배열 (N,)
+    Returns:
+        사용자별 {"invested", "value", "irr"} 배열 딕셔너리
+    """
+    user_idx = np.asarray(user_idx, dtype=np.int64)
+    symbol_idx = np.asarray(symbol_idx, dtype=np.int64)
+    mask_idx = np.asarray(mask_idx, dtype=np.int64)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    user_count = user_count or (int(user_idx.max()) + 1 if len(user_idx) else 0)
+    if len(user_idx) == 0 or len(dates) == 0 or len(prices) == 0:
+        # 평가할 스케줄이나 시세가 없으면 빈 결과 (빈 배열의 stack/마지막 종가 조회 오류 방지)
+        return {"invested": np.zeros(user_count), "value": np.zeros(user_count), "irr": np.full(user_count, np.nan)}
+
+    valid = ~np.isnan(prices)  # (S x T)
+    inverse_price = np.where(valid, 1.0 / np.where(valid, prices, 1.0), 0.0)
+    last_price = np.nan_to_num(prices[:, -1])
+    counts = buy_counts(dates)  # (M x T)
+
+    # (M x S) 조합별 단위 금액당 매입 횟수, 보유 수량, 평가금액
+    unit_buys = counts @ valid.T.astype(np.float64)
+    unit_units = counts @ inverse_price.T
+    unit_value = unit_units * last_price[None, :]
+
+    # (M x S x R) 조합별 단위 금액 NPV 격자
+    tau = year_fractions(dates)
+    discount = np.power(1.0 + IRR_GRID[None, :], -tau[:, None])  # (T x R)
+    cash_npv = np.stack([(counts * valid[i]) @ discount for i in range(len(prices))], axis=1)
+    unit_npv = unit_value[:, :, None] * discount[-1][None, None, :] - cash_npv
+
+    invested = np.bincount(user_idx, weights=amounts * unit_buys[mask_idx, symbol_idx], minlength=user_count)
+    value = np.bincount(user_idx, weights=amounts * unit_value[mask_idx, symbol_idx], minlength=user_count)
+
+    # 사용자별 NPV 곡선 = 스케줄 NPV 격자의 합 (사용자 순으로 정렬 후 구간 합, 메모리 제한을 위해 나누어 처리)
+    user_irr = np.full(user_count, np.nan)
+    order = np.argsort(user_idx, kind="stable")
+    sorted_users = user_idx[order]
+    starts = np.flatnonzero(np.r_[True, sorted_users[1:] != sorted_users[:-1]]) if len(order) else np.array([], dtype=np.int64)
+
+    for lo in range(0, len(starts), IRR_USER_CHUNK):
+        segment = starts[lo:lo + IRR_USER_CHUNK]
+        first = segment[0]
+        last = starts[lo + IRR_USER_CHUNK] if lo + IRR_USER_CHUNK < len(starts) else len(order)
+        rows = order[first:last]
+        npv = np.add.reduceat(amounts[rows, None] * unit_npv[mask_idx[rows], symbol_idx[rows]], segment - first, axis=0)
+        user_irr[sorted_users[segment]] = grid_root(npv)
+
+    return {"invested": invested, "value": value, "irr": user_irr}
+
+
+def backtest_dca_batch(users, years=None, start=None, end=None):
+    """여러 사용자의 스케줄을 한 번에 백테스트
+
+    Args:
+        users: [{"user_id", "schedules": [{"symbol", "cycle", "day", "amount"}, ...]}, ...]
+    """
+    start, end = backtest_range(years, start, end)
+    symbols = sorted({s["symbol"].upper() for user in users for s in user["schedules"]})
+    dates, prices = load_prices(symbols, start, end)
+    symbol_pos = {symbol: i for i, symbol in enumerate(symbols)}
+
+    rows = [
+        (u, symbol_pos[s["symbol"].upper()], mask_index(s["cycle"], s["day"]), float(s["amount"]))
+        for u, user in enumerate(users)
+        for s in user["schedules"]
+    ]
+    user_idx, symbol_idx, mask_idx, amounts = (np.array(col) for col in zip(*rows)) if rows else ([], [], [], [])
+    result = evaluate_batch(dates, prices, user_idx, symbol_idx, mask_idx, amounts, user_count=len(users))
+
+    return {
+        "start": str(dates[0]) if len(dates) else start,
+        "end": str(dates[-1]) if len(dates) else end,
+        "users": [
+            {
+                "user_id": user.get("user_id"),
+                "invested": float(result["invested"][u]),
+                "value": float(result["value"][u]),
+                "irr": None if np.isnan(result["irr"][u]) else float(result["irr"][u]),
+            }
+            for u, user in enumerate(users)
+        ],
+    }
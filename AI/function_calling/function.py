@@ -5,34 +5,39 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from io import BytesIO
 from webdriver_manager.chrome import ChromeDriverManager
+from concurrent.futures import ThreadPoolExecutor
+from function_calling.price_store import price_store, FIELDS
 import fitz
+import numpy as np
 import yfinance as yf
+import os
 import re
 import warnings
 warnings.filterwarnings('ignore')
 
+# 분석가 의견, 재무제표 조회 시 심볼별 동시 호출 수.
+TICKER_FETCH_WORKERS = int(os.getenv("TICKER_FETCH_WORKERS", "6"))
+
 ########################################################################################################################################################################
 
 # 원하는 날짜의 종목 종가, 최고가, 최저가, 시가, 거래량 가져오는 함수.
+# 로컬 가격 저장소에서 구간을 잘라 응답하고, 빠진 날짜만 yfinance에서 수집함.
 def get_finance_info(symbols, start, end):
     print("get_finance_info")
-    df = yf.download(symbols, start, end)
+    prices = price_store.get_prices(symbols, start, end)
     infos = []
 
     for symbol in symbols:
-        close = df.Close[symbol].values.tolist()
-        high = df.High[symbol].values.tolist()
-        low = df.Low[symbol].values.tolist()
-        open = df.Open[symbol].values.tolist()
-        volume = df.Volume[symbol].values.tolist()
+        dates, values = prices[symbol]
 
         data = {
             f"{symbol}": {
-                "종가": close,
-                "최고가": high,
-                "최저가": low,
-                "시가": open,
-                "거래량": volume,
+                "날짜": np.datetime_as_string(dates).tolist(),
+                "종가": values[:, FIELDS.index("Close")].tolist(),
+                "최고가": values[:, FIELDS.index("High")].tolist(),
+                "최저가": values[:, FIELDS.index("Low")].tolist(),
+                "시가": values[:, FIELDS.index("Open")].tolist(),
+                "거래량": values[:, FIELDS.index("Volume")].tolist(),
             }
         }
 
@@ -42,15 +47,24 @@ def get_finance_info(symbols, start, end):
 
 ########################################################################################################################################################################
 
+# 심볼별 yfinance 호출을 스레드 풀에서 동시에 실행하는 함수. (입력 순서 유지)
+def fetch_concurrently(fetch, symbols):
+    if not symbols:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(len(symbols), TICKER_FETCH_WORKERS)) as executor:
+        return list(executor.map(fetch, symbols))
+
+########################################################################################################################################################################
+
 # 분석가들의 평가를 가져오는 함수.
 def get_finance_analized(symbols):
     print("get_finance_analized")
     infos = []
 
-    for symbol in symbols:
-        df = yf.Ticker(symbol)
-
-        recommendations = df.recommendations
+    for symbol, recommendations in zip(symbols, fetch_concurrently(lambda s: yf.Ticker(s).recommendations, symbols)):
+        if recommendations is None:
+            continue
 
         recommendations.dropna(inplace=True)
 
@@ -84,21 +98,13 @@ def get_financial(symbols):
     print("get_financial")
     infos = {}
 
-    for symbol in symbols:
-        data = {}
-        df = yf.Ticker(symbol).financials
-        if df.empty:
+    for symbol, df in zip(symbols, fetch_concurrently(lambda s: yf.Ticker(s).financials, symbols)):
+        if df is None or df.empty:
             continue
-        columns = df.columns.tolist()
-        indexes = df.index.tolist()
-
-        for column in columns:
-            col = str(column.year) + '-' + str(column.month) + '-' + str(column.day)
-            data[col] = {}
-            for index in indexes:
-                data[col][index] = df.loc[index, column]
 
-        infos[symbol] = data
+        # 셀 단위 순회 대신 컬럼명만 바꿔 한 번에 {기준일: {항목: 값}} 형태로 변환
+        df = df.set_axis([f"{column.year}-{column.month}-{column.day}" for column in df.columns], axis=1)
+        infos[symbol] = df.to_dict()
 
     return infos
 
@@ -0,0 +1,113 @@
+"""
+기술적 지표 엔진
+로컬 가격 저장소의 종가 패널(날짜 x 심볼) 한 장으로 카탈로그 ETF 전체의 지표를 한 번에 계산
+"""
+
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from function_calling.price_store import price_store, CATALOG_SYMBOLS
+from function_calling.serializer import serialize_indicators
+
+TRADING_DAYS = 252
+
+# 지표 계산에 필요한 과거 구간 (200일 이동평균, 12개월 모멘텀 + 여유분)
+LOOKBACK_DAYS = 400
+
+# 이동평균 / 모멘텀 기간 (거래일 기준)
+SMA_WINDOWS = (20, 50, 200)
+MOMENTUM_WINDOWS = {"1m": 21, "3m": 63, "6m": 126, "12m": 252}
+RSI_WINDOW = 14
+VOLATILITY_WINDOWS = (20, 60)
+
+
+def compute_indicators(panel: pd.DataFrame) -> pd.DataFrame:
+    """종가 패널에서 심볼별 최신 지표를 계산 (행: 심볼, 열: 지표)"""
+    panel = panel.ffill()
+    last = panel.iloc[-1]
+    result = {"close": last}
+
+    # 이동평균 및 이격도
+    for window in SMA_WINDOWS:
+        sma = panel.rolling(window, min_periods=window).mean().iloc[-1]
+        result[f"sma_{window}"] = sma
+        result[f"vs_sma_{window}"] = last / sma - 1
+
+    # 모멘텀 (기간 수익률)
+    for name, window in MOMENTUM_WINDOWS.items():
+        result[f"ret_{name}"] = panel.pct_change(window, fill_method=None).iloc[-1]
+
+    # RSI (Wilder 방식 지수평활)
+    delta = panel.diff()
+    avg_gain = delta.clip(lower=0).ewm(alpha=1 / RSI_WINDOW, adjust=False, min_periods=RSI_WINDOW).mean()
+    avg_loss = (-delta.clip(upper=0)).ewm(alpha=1 / RSI_WINDOW, adjust=False, min_periods=RSI_WINDOW).mean()
+    result[f"rsi_{RSI_WINDOW}"] = (100 - 100 / (1 + avg_gain / avg_loss)).iloc[-1]
+
+    # 연환산 변동성
+    log_returns = np.log(panel).diff()
+    for window in VOLATILITY_WINDOWS:
+        result[f"vol_{window}d"] = log_returns.rolling(window, min_periods=window).std().iloc[-1] * np.sqrt(TRADING_DAYS)
+
+    # 고점 대비 낙폭 (최근 1년)
+    recent = panel.iloc[-TRADING_DAYS:]
+    drawdown = recent / recent.cummax() - 1
+    result["drawdown"] = drawdown.iloc[-1]
+    result["max_drawdown_1y"] = drawdown.min()
+
+    return pd.DataFrame(result)
+
+
+def panel_range(as_of=None):
+    """지표 계산에 필요한 [start, end) 구간 (as_of 당일 포함)"""
+    as_of = as_of or date.today()
+    return (as_of - timedelta(days=LOOKBACK_DAYS)).isoformat(), (as_of + timedelta(days=1)).isoformat()
+
+
+def load_close_panel(symbols=None, as_of=None) -> pd.DataFrame:
+    """지표 계산용 종가 패널 조회"""
+    return price_store.get_panel(symbols or CATALOG_SYMBOLS, *panel_range(as_of))
+
+
+# 카탈로그 전체 지표 캐시 (가격 저장소가 갱신되거나 날짜가 바뀌면 다시 계산)
+_snapshot_cache = {"key": None, "frame": None}
+_snapshot_lock = threading.Lock()
+
+
+def catalog_indicators() -> pd.DataFrame:
+    """카탈로그 ETF 전체 지표 (가격 데이터가 바뀌지 않았으면 캐시 사용)"""
+    price_store.ensure(CATALOG_SYMBOLS, *panel_range())
+    with _snapshot_lock:
+        key = (date.today(), price_store.version)
+        if _snapshot_cache["key"] != key:
+            _snapshot_cache["frame"] = compute_indicators(load_close_panel(CATALOG_SYMBOLS))
+            _snapshot_cache["key"] = key
+        return _snapshot_cache["frame"]
+
+
+# 기술적 지표를 가져오는 함수. (tool)
+def get_technical_indicators(symbols):
+    print("get_technical_indicators")
+    symbols = [symbol.upper() for symbol in symbols] or CATALOG_SYMBOLS
+
+    if set(symbols) <= set(CATALOG_SYMBOLS):
+        frame = catalog_indicators().loc[symbols]
+    else:
+        frame = compute_indicators(load_close_panel(symbols))
+
+    return {
+        symbol: {name: (None if pd.isna(value) else round(float(value), 4)) for name, value in row.items()}
+        for symbol, row in frame.iterrows()
+    }
+
+
+def market_snapshot() -> dict:
+    """분석 실행 단위로 공유하는 카탈로그 시장 지표 스냅샷"""
+    indicators = get_technical_indicators(CATALOG_SYMBOLS)
+    return {
+        "as_of": date.today().isoformat(),
+        "indicators": indicators,
+        "text": serialize_indicators(indicators),
+    }
@@ -0,0 +1,253 @@
+"""
+로컬 OHLCV 가격 저장소
+카탈로그 ETF의 일별 시세를 심볼별 NumPy memmap 파일로 보관하고, 비어 있는 날짜 구간만 yfinance에서 증분 수집
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from datetime import date
+from contextlib import ExitStack
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from data import ETF
+
+logger = logging.getLogger(__name__)
+
+# 저장 위치 및 갱신 정책 (환경 변수로 조정 가능)
+PRICE_CACHE_DIR = os.getenv("PRICE_CACHE_DIR", os.path.join(".cache", "prices"))
+PRICE_REFRESH_INTERVAL = int(os.getenv("PRICE_REFRESH_INTERVAL", "3600"))  # 같은 심볼의 최신 구간 재수집 최소 간격(초)
+PRICE_HISTORY_START = os.getenv("PRICE_HISTORY_START", "2010-01-01")  # 최초 수집 시 확보할 과거 시작일
+PRICE_RETRY_INTERVAL = int(os.getenv("PRICE_RETRY_INTERVAL", "300"))  # 수집 실패/빈 응답 구간 재시도 최소 간격(초)
+
+# 저장 컬럼 순서 (values 배열의 열 순서)
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+# 카탈로그 ETF 심볼 ("미국s&p500(SPY)" -> "SPY")
+CATALOG_SYMBOLS = [i[i.find("(")+1:i.find(")")] for i in ETF]
+
+# 허용 심볼 문자 (심볼이 파일 이름이 되므로 경로 문자는 거부)
+SYMBOL_PATTERN = re.compile(r"^[A-Z0-9.\-^=]+$")
+
+_DAY = np.timedelta64(1, "D")
+
+
+def normalize_symbol(symbol: str) -> str:
+    """대문자로 정규화한 심볼 (허용 문자 외에는 ValueError)"""
+    normalized = str(symbol).strip().upper()
+    if not SYMBOL_PATTERN.fullmatch(normalized):
+        raise ValueError(f"잘못된 심볼: {symbol!r}")
+    return normalized
+
+
+class PriceStore:
+    """심볼별 (dates, values) 배열을 memmap으로 열어두고 구간 조회를 배열 슬라이스로 처리"""
+
+    def __init__(self, cache_dir: str = PRICE_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._series = {}  # symbol -> (dates[datetime64[D]], values[N x 5])
+        self._meta = {}  # symbol -> {"covered_from": "YYYY-MM-DD", "fetched_at": epoch}
+        self._retry_at = {}  # (symbol, 구간) -> 수집 실패/빈 응답 후 다시 시도할 시각 (메모리에만 보관, 지나면 _plan에서 삭제)
+        self._symbol_locks = {}  # symbol -> 수집 잠금
+        self._lock = threading.Lock()  # 위 사전들과 version 보호 (네트워크 대기 중에는 잡지 않음)
+        self.version = 0  # 저장 내용이 바뀔 때마다 증가 (파생 캐시 무효화용)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # 파일 입출력
+    # ------------------------------------------------------------------
+    def _paths(self, symbol: str):
+        base = os.path.join(self.cache_dir, normalize_symbol(symbol))
+        return f"{base}.dates.npy", f"{base}.ohlcv.npy", f"{base}.meta.json"
+
+    def _load(self, symbol: str):
+        """디스크에 저장된 시세를 memmap으로 연다 (없으면 빈 배열)"""
+        if symbol in self._series:
+            return self._series[symbol]
+
+        dates_path, values_path, meta_path = self._paths(symbol)
+        if os.path.exists(dates_path) and os.path.exists(values_path):
+            dates = np.load(dates_path, mmap_mode="r")
+            values = np.load(values_path, mmap_mode="r")
+            try:
+                with open(meta_path, encoding="utf-8") as f:
+                    self._meta[symbol] = json.load(f)
+            except (OSError, ValueError):
+                self._meta[symbol] = {}
+        else:
+            dates = np.empty(0, dtype="datetime64[D]")
+            values = np.empty((0, len(FIELDS)), dtype=np.float64)
+            self._meta[symbol] = {}
+
+        self._series[symbol] = (dates, values)
+        return dates, values
+
+    def _save(self, symbol: str, dates: np.ndarray, values: np.ndarray, meta: dict):
+        """임시 파일에 쓰고 교체하여 읽는 쪽이 깨진 파일을 보지 않도록 함"""
+        dates_path, values_path, meta_path = self._paths(symbol)
+        for path, array in ((dates_path, dates), (values_path, values)):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+        series = (np.load(dates_path, mmap_mode="r"), np.load(values_path, mmap_mode="r"))
+        with self._lock:
+            self._meta[symbol] = meta
+            self._series[symbol] = series
+            self.version += 1
+
+    # ------------------------------------------------------------------
+    # 증분 수집
+    # ------------------------------------------------------------------
+    def _missing_ranges(self, symbol: str, start: np.datetime64, end: np.datetime64, now: float):
+        """요청 구간 [start, end) 중 아직 수집하지 않은 구간 목록"""
+        dates, _ = self._load(symbol)
+        meta = self._meta.get(symbol, {})
+        today_end = np.datetime64(date.today()) + _DAY
+
+        if "covered_from" not in meta:
+            history_start = min(start, np.datetime64(PRICE_HISTORY_START, "D"))
+            return [(history_start, today_end)]
+
+        ranges = []
+        covered_from = np.datetime64(meta["covered_from"], "D")
+        if start < covered_from:
+            ranges.append((start, covered_from))
+
+        # 수집 이력은 있지만 데이터가 없는 심볼은 covered_from 직전을 마지막 날짜로 간주
+        last_date = dates[-1] if len(dates) else covered_from - _DAY
+        is_stale = now - meta.get("fetched_at", 0) >= PRICE_REFRESH_INTERVAL
+        if end > last_date + _DAY and last_date + _DAY < today_end and is_stale:
+            ranges.append((last_date + _DAY, today_end))
+
+        return ranges
+
+    def _download(self, symbols: list, start: np.datetime64, end: np.datetime64) -> dict:
+        """여러 심볼을 한 번의 yf.download 호출로 수집하여 심볼별 배열로 변환"""
+        df = yf.download(symbols, str(start), str(end), progress=False)
+        frames = {}
+        if df is None or df.empty:
+            return frames
+
+        for symbol in symbols:
+            if isinstance(df.columns, pd.MultiIndex):
+                if symbol not in df.columns.get_level_values(1):
+                    continue
+                sub = df.xs(symbol, axis=1, level=1)
+            else:
+                sub = df
+            sub = sub.reindex(columns=list(FIELDS)).dropna(subset=["Close"])
+            if sub.empty:
+                continue
+            dates = sub.index.values.astype("datetime64[D]")
+            values = sub.to_numpy(dtype=np.float64)
+            frames[symbol] = (dates, values)
+
+        return frames
+
+    @staticmethod
+    def _merge(old_dates, old_values, new_dates, new_values):
+        """기존 배열과 새 배열을 날짜 기준으로 병합 (중복 날짜는 새 값 우선)"""
+        keep = ~np.isin(old_dates, new_dates)
+        dates = np.concatenate([np.asarray(old_dates)[keep], new_dates])
+        values = np.concatenate([np.asarray(old_values)[keep], new_values])
+        order = np.argsort(dates, kind="stable")
+        return dates[order], values[order]
+
+    def _symbol_lock(self, symbol: str) -> threading.Lock:
+        with self._lock:
+            return self._symbol_locks.setdefault(symbol, threading.Lock())
+
+    def _plan(self, symbols: list, start: np.datetime64, end: np.datetime64, now: float) -> dict:
+        """같은 구간이 필요한 심볼끼리 묶은 수집 계획 {(구간 시작, 구간 끝): [심볼]} (재시도 대기 중인 구간 제외)"""
+        with self._lock:
+            # 구간 끝이 날마다 바뀌어 키가 계속 늘어나므로, 재시도 시각이 지난 기록은 여기서 지움
+            for key in [key for key, retry_at in self._retry_at.items() if retry_at <= now]:
+                del self._retry_at[key]
+        pending = {}
+        for symbol in symbols:
+            for missing in self._missing_ranges(symbol, start, end, now):
+                if (symbol, missing) not in self._retry_at:
+                    pending.setdefault(missing, []).append(symbol)
+        return pending
+
+    def ensure(self, symbols: list, start: str, end: str):
+        """
+        요청 구간에 필요한 데이터가 로컬에 있도록 빠진 구간만 수집
+        - 수집이 필요한 심볼만 심볼별로 잠그므로(정렬된 순서), 다른 심볼의 조회/수집은 기다리지 않음
+        - 수집 범위(covered_from/fetched_at)는 실제로 시세가 온 심볼만 갱신하고, 실패/빈 응답은 재시도 간격 뒤 다시 수집
+        """
+        start = np.datetime64(start, "D")
+        end = np.datetime64(end, "D")
+        symbols = sorted({normalize_symbol(symbol) for symbol in symbols})
+        stale = sorted({symbol for range_symbols in self._plan(symbols, start, end, time.time()).values() for symbol in range_symbols})
+        if not stale:
+            return
+
+        with ExitStack() as stack:
+            for symbol in stale:
+                stack.enter_context(self._symbol_lock(symbol))
+
+            # 잠금을 기다리는 동안 다른 요청이 채웠을 수 있으므로 다시 계획
+            now = time.time()
+            for (range_start, range_end), range_symbols in self._plan(stale, start, end, now).items():
+                logger.info(f"🔄 시세 증분 수집: {range_symbols} {range_start} ~ {range_end}")
+                try:
+                    frames = self._download(range_symbols, range_start, range_end)
+                except Exception as e:
+                    logger.error(f"❌ 시세 수집 실패 ({range_symbols}): {e}")
+                    frames = {}
+
+                for symbol in range_symbols:
+                    if symbol not in frames:
+                        # 수집한 것으로 기록하지 않음 (다음 요청에서 다시 수집, 재시도 간격만 둠)
+                        with self._lock:
+                            self._retry_at[(symbol, (range_start, range_end))] = now + PRICE_RETRY_INTERVAL
+                        continue
+
+                    dates, values = self._load(symbol)
+                    meta = dict(self._meta.get(symbol, {}))
+                    covered_from = meta.get("covered_from")
+                    if covered_from is None or str(range_start) < covered_from:
+                        meta["covered_from"] = str(range_start)
+                    meta["fetched_at"] = now
+
+                    dates, values = self._merge(dates, values, *frames[symbol])
+                    self._save(symbol, np.asarray(dates), np.asarray(values), meta)
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+    def get_range(self, symbol: str, start: str, end: str):
+        """[start, end) 구간의 (dates, values) 슬라이스 (복사 없이 memmap view 반환)"""
+        dates, values = self._load(normalize_symbol(symbol))
+        lo = np.searchsorted(dates, np.datetime64(start, "D"), side="left")
+        hi = np.searchsorted(dates, np.datetime64(end, "D"), side="left")
+        return dates[lo:hi], values[lo:hi]
+
+    def get_prices(self, symbols: list, start: str, end: str) -> dict:
+        """빠진 구간을 채운 뒤 심볼별 구간 슬라이스 반환"""
+        self.ensure(symbols, start, end)
+        return {symbol: self.get_range(symbol, start, end) for symbol in symbols}
+
+    def get_panel(self, symbols: list, start: str, end: str, field: str = "Close") -> pd.DataFrame:
+        """여러 심볼의 한 필드를 날짜 x 심볼 DataFrame으로 정렬하여 반환"""
+        column = FIELDS.index(field)
+        series = {}
+        for symbol, (dates, values) in self.get_prices(symbols, start, end).items():
+            series[symbol] = pd.Series(np.asarray(values[:, column]), index=pd.DatetimeIndex(dates))
+        return pd.DataFrame(series, columns=symbols).sort_index()
+
+
+# 전역 가격 저장소 인스턴스
+price_store = PriceStore()
@@ -0,0 +1,209 @@
+"""
+tool 실행 결과 직렬화
+LLM에 다시 넣는 tool 메시지를 str(output) 대신 tool별 압축 텍스트(요약 통계 + 축약 표)로 변환
+"""
+
+import os
+import math
+import json
+import numpy as np
+
+# 출력 크기 제한 (환경 변수로 조정 가능)
+TOOL_OUTPUT_MAX_CHARS = int(os.getenv("TOOL_OUTPUT_MAX_CHARS", "6000"))  # tool 메시지 하나의 최대 글자 수
+TOOL_PRICE_MAX_ROWS = int(os.getenv("TOOL_PRICE_MAX_ROWS", "12"))  # 심볼별 시세 표의 최대 행 수
+TOOL_FINANCIAL_MAX_ROWS = int(os.getenv("TOOL_FINANCIAL_MAX_ROWS", "15"))  # 재무제표 항목 최대 개수
+TOOL_NEWS_MAX_ITEMS = int(os.getenv("TOOL_NEWS_MAX_ITEMS", "15"))  # 뉴스 최대 기사 수
+TOOL_NEWS_ITEM_CHARS = int(os.getenv("TOOL_NEWS_ITEM_CHARS", "300"))  # 기사 하나의 최대 글자 수
+TOOL_REPORT_ITEM_CHARS = int(os.getenv("TOOL_REPORT_ITEM_CHARS", "500"))  # 한국은행 자료 하나의 최대 글자 수
+
+TRADING_DAYS = 252
+
+
+def truncate(text, limit):
+    """글자 수 제한을 넘으면 잘라내고 생략 표시를 붙임"""
+    text = str(text).strip()
+    if len(text) <= limit:
+        return text
+    return text[:max(limit - 1, 0)] + "…"
+
+
+def format_number(value):
+    """큰 수는 K/M/B/T 단위로, 작은 수는 유효숫자 4자리로 표시"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "-"
+    value = float(value)
+    for unit, scale in (("T", 1e12), ("B", 1e9), ("M", 1e6), ("K", 1e3)):
+        if abs(value) >= scale:
+            return f"{value / scale:.2f}{unit}"
+    return f"{value:.4g}"
+
+
+def price_summary(close):
+    """종가 배열의 기간 수익률, 연환산 변동성, 최대 낙폭 (NumPy 벡터 연산)"""
+    close = np.asarray(close, dtype=np.float64)
+    close = close[~np.isnan(close)]
+    if len(close) < 2:
+        return None
+
+    log_returns = np.diff(np.log(close))
+    running_max = np.maximum.accumulate(close)
+    return {
+        "return": close[-1] / close[0] - 1,
+        "volatility": log_returns.std(ddof=1) * math.sqrt(TRADING_DAYS) if len(log_returns) > 1 else 0.0,
+        "max_drawdown": (close / running_max - 1).min(),
+    }
+
+
+def sample_rows(n, max_rows):
+    """n개 행 중 처음과 마지막을 포함하여 고르게 max_rows개 인덱스 선택"""
+    if n <= max_rows:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, max_rows).round().astype(int))
+
+
+# ----------------------------------------------------------------------
+# tool별 직렬화 함수
+# ----------------------------------------------------------------------
+def serialize_finance_info(output):
+    lines = []
+    for item in output:
+        for symbol, data in item.items():
+            close = np.asarray(data.get("종가", []), dtype=np.float64)
+            dates = data.get("날짜", [])
+            if len(close) == 0:
+                lines.append(f"[{symbol}] 데이터 없음")
+                continue
+
+            period = f"{dates[0]}~{dates[-1]}, " if dates else ""
+            header = f"[{symbol}] {period}{len(close)}거래일"
+            summary = price_summary(close)
+            if summary:
+                header += (
+                    f" | 수익률 {summary['return'] * 100:+.2f}%"
+                    f" | 연변동성 {summary['volatility'] * 100:.1f}%"
+                    f" | 최대낙폭 {summary['max_drawdown'] * 100:.1f}%"
+                )
+            header += f" | 최고 {np.nanmax(data['최고가']):.2f} | 최저 {np.nanmin(data['최저가']):.2f}"
+            lines.append(header)
+
+            lines.append("날짜,시가,최고,최저,종가,거래량")
+            for i in sample_rows(len(close), TOOL_PRICE_MAX_ROWS):
+                date = dates[i] if dates else str(i)
+                lines.append(
+                    f"{date},{data['시가'][i]:.2f},{data['최고가'][i]:.2f},{data['최저가'][i]:.2f},"
+                    f"{close[i]:.2f},{format_number(data['거래량'][i])}"
+                )
+    return "\n".join(lines)
+
+
+def serialize_finance_analized(output):
+    lines = ["심볼: 기간별(최근→과거) strongBuy/buy/hold/sell/strongSell"]
+    for item in output:
+        for symbol, data in item.items():
+            columns = [data.get(key, []) for key in ("strongBuy", "buy", "hold", "sell", "strongSell")]
+            periods = ["/".join(str(int(col[i])) for col in columns) for i in range(min(len(c) for c in columns))]
+            lines.append(f"{symbol}: {' | '.join(periods)}")
+    return "\n".join(lines)
+
+
+def serialize_financial(output):
+    lines = []
+    for symbol, data in output.items():
+        columns = list(data.keys())
+        lines.append(f"[{symbol}] 항목," + ",".join(columns))
+        indexes = list(data[columns[0]].keys()) if columns else []
+        for index in indexes[:TOOL_FINANCIAL_MAX_ROWS]:
+            lines.append(f"{index}," + ",".join(format_number(data[col].get(index)) for col in columns))
+    return "\n".join(lines)
+
+
+def serialize_news(output):
+    items = list(output.items())[:TOOL_NEWS_MAX_ITEMS]
+    return "\n".join(f"- {title}: {truncate(content, TOOL_NEWS_ITEM_CHARS)}" for title, content in items)
+
+
+def serialize_korea_bank(output):
+    lines = []
+    for info in output:
+        report_type = info.get("type", "")
+        for title, text in info.items():
+            if title == "type":
+                continue
+            lines.append(f"- [{report_type}] {title}: {truncate(text, TOOL_REPORT_ITEM_CHARS)}")
+    return "\n".join(lines)
+
+
+def serialize_indicators(output):
+    def pct(value):
+        return "-" if value is None else f"{value * 100:+.1f}%"
+
+    def ratio(value):
+        return "-" if value is None else f"{value * 100:.1f}%"
+
+    def num(value, fmt):
+        return "-" if value is None else format(value, fmt)
+
+    lines = ["심볼,종가,1M,3M,6M,12M,SMA200이격,RSI14,변동성20D,고점대비,1년최대낙폭"]
+    for symbol, row in output.items():
+        lines.append(
+            f"{symbol},{num(row.get('close'), '.2f')},{pct(row.get('ret_1m'))},{pct(row.get('ret_3m'))},"
+            f"{pct(row.get('ret_6m'))},{pct(row.get('ret_12m'))},{pct(row.get('vs_sma_200'))},"
+            f"{num(row.get('rsi_14'), '.0f')},{ratio(row.get('vol_20d'))},{pct(row.get('drawdown'))},"
+            f"{pct(row.get('max_drawdown_1y'))}"
+        )
+    return "\n".join(lines)
+
+
+def serialize_backtest(output):
+    def pct(value):
+        return "-" if value is None else f"{value * 100:+.2f}%"
+
+    total = output.get("total")
+    if not total:
+        return f"{output.get('start')}~{output.get('end')} 백테스트 데이터 없음"
+
+    lines = [
+        f"기간 {output['start']}~{output['end']} | 매입원금 {total['invested']:,.0f}만원 | 평가금액 {total['value']:,.0f}만원"
+        f" | 수익률 {pct(total['return'])} | IRR {pct(total['irr'])}",
+        "심볼,주기,투자일,회당금액,매수횟수,매입원금,평균단가,평가금액,수익률,IRR",
+    ]
+    for etf in output["etfs"]:
+        avg_cost = "-" if etf["avg_cost"] is None else f"{etf['avg_cost']:.2f}"
+        lines.append(
+            f"{etf['symbol']},{etf['cycle']},{etf['day']},{etf['amount']},{etf['buy_count']},"
+            f"{etf['invested']:,.0f},{avg_cost},{etf['value']:,.0f},{pct(etf['return'])},{pct(etf['irr'])}"
+        )
+
+    curve = output.get("curve", [])
+    if curve:
+        lines.append("날짜,누적원금,평가금액")
+        for i in sample_rows(len(curve), TOOL_PRICE_MAX_ROWS):
+            lines.append(f"{curve[i]['date']},{curve[i]['invested']:,.0f},{curve[i]['value']:,.0f}")
+    return "\n".join(lines)
+
+
+SERIALIZERS = {
+    "get_finance_info": serialize_finance_info,
+    "get_finance_analized": serialize_finance_analized,
+    "get_financial": serialize_financial,
+    "bring_recent_news_naver_global": serialize_news,
+    "bring_recent_news_naver_korea": serialize_news,
+    "Korea_Bank_News_Text": serialize_korea_bank,
+    "get_technical_indicators": serialize_indicators,
+    "backtest_dca": serialize_backtest,
+}
+
+
+def serialize_tool_output(function_name, output):
+    """tool 결과를 LLM 입력용 압축 텍스트로 변환 (최대 글자 수 제한 적용)"""
+    if isinstance(output, str):
+        text = output
+    else:
+        serializer = SERIALIZERS.get(function_name)
+        try:
+            text = serializer(output) if serializer else json.dumps(output, ensure_ascii=False, default=str)
+        except Exception:
+            # 예상과 다른 형태의 결과는 JSON으로라도 전달
+            text = json.dumps(output, ensure_ascii=False, default=str)
+
+    return truncate(text, TOOL_OUTPUT_MAX_CHARS)
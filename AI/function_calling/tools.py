@@ -129,5 +129,74 @@ tools = [
             },
             "strict": True
         }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_technical_indicators",
+            "description": "입력된 야후 finance 심볼들의 기술적 지표(이동평균 이격도, 1/3/6/12개월 수익률, RSI, 변동성, 고점 대비 낙폭)를 한 번에 가져오는 함수야. 원시 시세 대신 이 함수를 먼저 사용하는 것이 좋아.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "symbols": {
+                        "type": "array",
+                        "items": {
+                            "type": "string"
+                        },
+                        "description": "야후 finance 심볼 리스트. 빈 리스트면 서비스 카탈로그 ETF 전체"
+                    },
+                },
+                "required": ["symbols"],
+                "additionalProperties": False,
+            },
+            "strict": True
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "backtest_dca",
+            "description": "ETF별 적립식 투자 스케줄(주기, 투자일, 금액)을 과거 시세에 적용했을 때의 매입 원금, 평가금액, 수익률, IRR을 계산하는 함수야. 사용자의 적립식 투자 성과를 물어보면 사용해.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "schedules": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "symbol": {
+                                    "type": "string",
+                                    "description": "야후 finance 심볼"
+                                },
+                                "cycle": {
+                                    "type": "string",
+                                    "enum": ["daily", "weekly", "monthly"],
+                                    "description": "투자 주기"
+                                },
+                                "day": {
+                                    "type": "number",
+                                    "description": "투자일. weekly면 요일(0=월요일 ~ 6=일요일), monthly면 일(1~28), daily면 0"
+                                },
+                                "amount": {
+                                    "type": "number",
+                                    "description": "회당 투자 금액(만원)"
+                                },
+                            },
+                            "required": ["symbol", "cycle", "day", "amount"],
+                            "additionalProperties": False,
+                        },
+                        "description": "ETF별 적립식 투자 스케줄 리스트"
+                    },
+                    "years": {
+                        "type": "number",
+                        "description": "최근 몇 년 동안의 성과를 볼지 입력받는 변수. 예를 들어 10이면 최근 10년."
+                    },
+                },
+                "required": ["schedules", "years"],
+                "additionalProperties": False,
+            },
+            "strict": True
+        }
     }
 ]
\ No newline at end of file
@@ -1,14 +1,22 @@
 from fastapi import FastAPI, Request, BackgroundTasks
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
-from model.model import create_response, analyze_sentiment
+from model.model import create_response, analyze_sentiment, record_usage, submit_tool, tool_queue_depth, TOOL_WORKERS
+from model.client_pool import client_registry
+from model.admission import admission, Overloaded, INTERACTIVE, BATCH, MAX_BATCH_SIZE
+from model.response_cache import response_cache, CHAT_CACHE_ENABLED
+from model.cancellation import cancellations, watch_disconnect, QUEUED, PREPARING, STREAMING
 import uvicorn
 import json
 import asyncio
 import time
-from typing import List, Dict, Any
-from tunning.instructions import instructions
-from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+from tunning.instructions import persona_templates, render_persona, PERSONA_VERSION
+from function_calling.price_store import price_store, CATALOG_SYMBOLS, PRICE_HISTORY_START
+from function_calling.indicators import market_snapshot
+from function_calling.backtest import backtest_dca, backtest_dca_batch
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
 import logging
 import os
 
@@ -16,15 +24,50 @@ import os
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="ETF AI Analysis Service", version="1.0.0")
+# 블로킹/CPU 작업은 tool 실행과 같은 스레드 풀에서 실행 (submit_tool, TOOL_WORKERS로 크기 조정)
+# LLM 호출은 비동기 클라이언트로 이벤트 루프에서 처리하므로 이 풀의 크기에 묶이지 않음
 
-# 병렬 처리를 위한 스레드 풀
-executor = ThreadPoolExecutor(max_workers=10)
+# 캐시된 채팅 답변을 보낼 때 chunk 하나의 글자 수
+CACHED_CHUNK_CHARS = 64
+
+# 서버 시작 시 카탈로그 ETF 시세를 로컬 저장소에 미리 채울지 여부
+PRICE_WARMUP = os.getenv("PRICE_WARMUP", "true").lower() == "true"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if PRICE_WARMUP:
+        # 요청 처리를 막지 않도록 스레드 풀에서 백그라운드로 수집
+        tomorrow = (date.today() + timedelta(days=1)).isoformat()
+        warmup = submit_tool(price_store.ensure, CATALOG_SYMBOLS, PRICE_HISTORY_START, tomorrow)
+        warmup.add_done_callback(
+            lambda f: logger.warning(f"⚠️ 카탈로그 시세 사전 수집 실패: {f.exception()}") if f.exception() else logger.info("✅ 카탈로그 시세 사전 수집 완료")
+        )
+    yield
+    await client_registry.aclose()
+
+app = FastAPI(title="ETF AI Analysis Service", version="1.0.0", lifespan=lifespan)
+
+def overloaded_response(e: Overloaded) -> JSONResponse:
+    """부하로 거절한 요청 응답 (클라이언트는 Retry-After 이후 재시도)"""
+    logger.warning(f"🚦 요청 거절: {e.reason}")
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "error": f"AI 서비스 과부하: {e.reason}", "retry_after": e.retry_after},
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+class ChatContext(BaseModel):
+    user_name: Optional[str] = None
+    symbols: List[str] = []
+    risk_level: Optional[int] = None
 
 class ChatRequest(BaseModel):
     messages: List[dict]  # 전체 대화 히스토리
     api_key: str
     model_type: str
+    structured: bool = False  # 분석 결과를 JSON schema로 받을지 (지원 모델만)
+    tools: bool = True  # False면 tool 없이 한 번만 호출 (공유 분석 개인화 등)
+    context: Optional[ChatContext] = None  # 채팅 응답 캐시 문맥 (없으면 캐시 사용 안 함)
 
 class PersonaRequest(BaseModel):
     name: str
@@ -34,26 +77,126 @@ class PersonaRequest(BaseModel):
 class BatchAnalyzeRequest(BaseModel):
     requests: List[ChatRequest]  # 여러 분석 요청을 한 번에 처리
 
+class BacktestSchedule(BaseModel):
+    symbol: str
+    cycle: str  # daily/weekly/monthly
+    day: int    # 요일(0~6) 또는 일(1~28)
+    amount: float
+
+class BacktestRequest(BaseModel):
+    schedules: List[BacktestSchedule]
+    years: Optional[float] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+
+class BacktestUser(BaseModel):
+    user_id: Optional[int] = None
+    schedules: List[BacktestSchedule]
+
+class BatchBacktestRequest(BaseModel):
+    users: List[BacktestUser]
+    years: Optional[float] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+
 @app.post("/chat/stream")
-async def chat_stream_endpoint(req: ChatRequest):
-    """스트리밍 응답을 위한 엔드포인트"""
+async def chat_stream_endpoint(req: ChatRequest, request: Request):
+    """
+    스트리밍 응답을 위한 엔드포인트 (대화형 우선순위로 수용)
+    - CHAT_CACHE_ENABLED이고 context가 있으면 응답 캐시를 먼저 조회 (X-Cache-Bypass: 1이면 건너뜀)
+    """
+    user_name = req.context.user_name if req.context and req.context.user_name else ""
+    cache_key = question = None
+    if CHAT_CACHE_ENABLED and req.context is not None:
+        question = response_cache.question_of(req.messages)
+        if question and request.headers.get("X-Cache-Bypass") == "1":
+            response_cache.bypass()
+            question = None
+        if question:
+            cache_key = response_cache.context_key(req.model_type, req.context.model_dump())
+            cached = await submit_tool(response_cache.lookup, cache_key, question, user_name)
+            if cached is not None:
+                logger.info(f"⚡ 채팅 응답 캐시 적중: {question}")
+                return StreamingResponse(
+                    cached_stream(cached),
+                    media_type="text/event-stream",
+                    headers={
+                        "Cache-Control": "no-cache",
+                        "Connection": "keep-alive",
+                        "X-Cache": "HIT",
+                    }
+                )
+
+    try:
+        admission.check(INTERACTIVE)
+    except Overloaded as e:
+        return overloaded_response(e)
     
-    async def generate_stream():
+    async def generate_reply(queue: asyncio.Queue, progress: dict):
+        """답변 생성 (연결이 끊기면 취소되어 제공자 스트림과 대기 중인 tool 실행을 중단)"""
+        start_time = time.time()
+        first_token_time = None
+        usage = None
         try:
-            # 백엔드에서 전송한 전체 대화 히스토리 사용
-            stream, updated_messages = create_response(req.messages, req.api_key, req.model_type)
+            async with admission.slot(INTERACTIVE):
+                progress["stage"] = PREPARING
+                # 백엔드에서 전송한 전체 대화 히스토리 사용
+                stream, updated_messages = await create_response(req.messages, req.api_key, req.model_type)
+                
+                progress["stage"] = STREAMING
+                try:
+                    async for chunk in stream:
+                        # usage만 담긴 마지막 chunk는 choices가 비어 있음
+                        usage = getattr(chunk, "usage", None) or usage
+                        if not chunk.choices:
+                            continue
+                        delta = getattr(chunk.choices[0], "delta", None)
+                        if delta and hasattr(delta, "content") and delta.content:
+                            if first_token_time is None:
+                                first_token_time = time.time() - start_time
+                            progress["chunks"] += 1
+                            progress["answer"].append(delta.content)
+                            queue.put_nowait(f"data: {json.dumps({'content': delta.content})}\n\n")
+                finally:
+                    # 취소/오류로 중단되면 제공자 HTTP 스트림을 바로 닫아 더 이상 토큰이 생성되지 않게 함
+                    await stream.close()
             
-            for chunk in stream:
-                delta = getattr(chunk.choices[0], "delta", None)
-                if delta and hasattr(delta, "content") and delta.content:
-                    yield f"data: {json.dumps({'content': delta.content})}\n\n"
+            usage_stats = {}
+            if usage is not None:
+                record_usage(usage_stats, usage)
+                logger.info(f"💬 채팅 응답 (첫 토큰 {first_token_time or 0:.2f}초, 프롬프트 {usage_stats['prompt_tokens']} 토큰 중 캐시 {usage_stats['cached_tokens']})")
+            cancellations.record_completed(usage_stats.get("completion_tokens") or progress["chunks"])
             
-            yield "data: [DONE]\n\n"
+            progress["completed"] = True
+            queue.put_nowait("data: [DONE]\n\n")
             
+        except asyncio.CancelledError:
+            cancellations.record_cancelled(progress["stage"], progress["chunks"])
+            logger.info(f"🛑 채팅 생성 취소 (연결 끊김, 단계 {progress['stage']}, 생성 {progress['chunks']} chunk)")
+            raise
         except Exception as e:
             error_message = f"AI 서비스 오류: {str(e)}"
-            yield f"data: {json.dumps({'content': error_message})}\n\n"
-            yield "data: [DONE]\n\n"
+            queue.put_nowait(f"data: {json.dumps({'content': error_message})}\n\n")
+            queue.put_nowait("data: [DONE]\n\n")
+        finally:
+            queue.put_nowait(None)
+    
+    async def generate_stream():
+        # 생성은 별도 태스크에서 실행하고, 연결이 끊기면(감시 태스크 또는 응답 중단) 취소
+        queue = asyncio.Queue()
+        progress = {"stage": QUEUED, "chunks": 0, "answer": [], "completed": False}
+        generation = asyncio.create_task(generate_reply(queue, progress))
+        watcher = asyncio.create_task(watch_disconnect(request, generation))
+        try:
+            while (event := await queue.get()) is not None:
+                yield event
+        finally:
+            watcher.cancel()
+            generation.cancel()
+
+        # 정상 완료된 답변만 캐시에 저장 ([DONE] 전송 후 처리)
+        if cache_key is not None and progress["completed"]:
+            await submit_tool(response_cache.store, cache_key, question, "".join(progress["answer"]), user_name)
     
     return StreamingResponse(
         generate_stream(),
@@ -61,38 +204,62 @@ async def chat_stream_endpoint(req: ChatRequest):
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
+            "X-Cache": "MISS" if cache_key is not None else "BYPASS",
         }
     )
 
+async def cached_stream(answer: str):
+    """캐시된 답변을 스트리밍 응답과 같은 형식으로 전송"""
+    for start in range(0, len(answer), CACHED_CHUNK_CHARS):
+        yield f"data: {json.dumps({'content': answer[start:start + CACHED_CHUNK_CHARS]})}\n\n"
+    yield "data: [DONE]\n\n"
+
 @app.post("/persona")
 async def get_persona(req: PersonaRequest):
-    persona = instructions(req.name, req.invest_type, req.interest)
-    return {"persona": persona}
+    """
+    페르소나 생성
+    - persona: 이름/오늘 날짜를 채운 전체 문자열 (기존 호환)
+    - template_id/template: 이름과 날짜 자리 표시자를 남긴 템플릿 (저장 후 전송 시점에 채움)
+    """
+    template_id, template = persona_templates.get(req.invest_type, req.interest)
+    return {
+        "persona": render_persona(template, req.name),
+        "template_id": template_id,
+        "template": template,
+        "version": PERSONA_VERSION
+    }
 
 @app.post("/analyze")
 async def analyze_endpoint(req: ChatRequest):
     """투자 분석을 위한 엔드포인트 - analyze_sentiment 함수 사용 (병렬 처리 지원)"""
     start_time = time.time()
+    try:
+        admission.check(BATCH)
+    except Overloaded as e:
+        return overloaded_response(e)
     
     try:
-        # 스레드 풀에서 동기 함수를 비동기로 실행
-        loop = asyncio.get_event_loop()
-        analysis_result, updated_messages = await loop.run_in_executor(
-            executor, 
-            analyze_sentiment, 
-            req.messages, 
-            req.api_key, 
-            req.model_type
-        )
+        # 비동기 LLM 호출 (tool 실행만 스레드 풀 사용)
+        call_stats = {}
+        async with admission.slot(BATCH):
+            analysis_result, updated_messages = await analyze_sentiment(
+                req.messages, 
+                req.api_key, 
+                req.model_type,
+                req.structured,
+                call_stats,
+                req.tools
+            )
         
         processing_time = time.time() - start_time
-        logger.info(f"✅ AI 분석 완료 ({processing_time:.2f}초)")
+        logger.info(f"✅ AI 분석 완료 ({processing_time:.2f}초, LLM 호출 {call_stats['llm_calls']}회, tool 호출 {call_stats['tool_calls']}회, 캐시 토큰 {call_stats['cached_tokens']}/{call_stats['prompt_tokens']})")
         logger.info(f"✅ AI 분석 결과: {analysis_result}")
         
         return {
             "answer": analysis_result,
             "success": True,
-            "processing_time": processing_time
+            "processing_time": processing_time,
+            "call_stats": call_stats
         }
     except Exception as e:
         processing_time = time.time() - start_time
@@ -111,29 +278,44 @@ async def batch_analyze_endpoint(req: BatchAnalyzeRequest):
     start_time = time.time()
     logger.info(f"🔄 배치 분석 시작: {len(req.requests)}개 요청")
     
+    if len(req.requests) > MAX_BATCH_SIZE:
+        return JSONResponse(
+            status_code=413,
+            content={"success": False, "error": f"배치 요청 수 초과 ({len(req.requests)}/{MAX_BATCH_SIZE})"}
+        )
+    # 배치 전체를 받을 수 있을 때만 수용 (일부만 처리되지 않도록)
+    try:
+        admission.check(BATCH, len(req.requests))
+    except Overloaded as e:
+        return overloaded_response(e)
+    
     try:
         # 모든 분석 작업을 병렬로 실행
-        async def analyze_single(request: ChatRequest) -> Dict[str, Any]:
+        async def analyze_single(index: int, request: ChatRequest) -> Dict[str, Any]:
             single_start_time = time.time()
             
             try:
-                loop = asyncio.get_event_loop()
-                analysis_result, updated_messages = await loop.run_in_executor(
-                    executor,
-                    analyze_sentiment,
-                    request.messages,
-                    request.api_key,
-                    request.model_type
-                )
+                call_stats = {}
+                async with admission.slot(BATCH):
+                    analysis_result, updated_messages = await analyze_sentiment(
+                        request.messages,
+                        request.api_key,
+                        request.model_type,
+                        request.structured,
+                        call_stats,
+                        request.tools
+                    )
                 
                 single_processing_time = time.time() - single_start_time
-                logger.info(f"✅ 단일 분석 완료 ({single_processing_time:.2f}초)")
+                logger.info(f"✅ 단일 분석 완료 ({single_processing_time:.2f}초, LLM 호출 {call_stats['llm_calls']}회, tool 호출 {call_stats['tool_calls']}회, 캐시 토큰 {call_stats['cached_tokens']}/{call_stats['prompt_tokens']})")
                 logger.info(f"✅ AI 분석 결과: {analysis_result}")
                 
                 return {
                     "success": True,
                     "answer": analysis_result,
                     "processing_time": single_processing_time,
+                    "call_stats": call_stats,
+                    "index": index,  # 요청 순서 (응답과 요청 매칭용)
                     "request_id": id(request)  # 요청 식별용
                 }
                 
@@ -145,11 +327,12 @@ async def batch_analyze_endpoint(req: BatchAnalyzeRequest):
                     "success": False,
                     "error": str(e),
                     "processing_time": single_processing_time,
+                    "index": index,
                     "request_id": id(request)
                 }
         
         # 모든 요청을 병렬로 처리
-        tasks = [analyze_single(request) for request in req.requests]
+        tasks = [analyze_single(i, request) for i, request in enumerate(req.requests)]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # 결과 처리
@@ -169,8 +352,12 @@ async def batch_analyze_endpoint(req: BatchAnalyzeRequest):
                 failed_results.append(result)
         
         total_processing_time = time.time() - start_time
+        total_llm_calls = sum(result["call_stats"]["llm_calls"] for result in successful_results)
+        total_tool_calls = sum(result["call_stats"]["tool_calls"] for result in successful_results)
+        total_prompt_tokens = sum(result["call_stats"]["prompt_tokens"] for result in successful_results)
+        total_cached_tokens = sum(result["call_stats"]["cached_tokens"] for result in successful_results)
         
-        logger.info(f"✅ 배치 분석 완료: 성공 {len(successful_results)}개, 실패 {len(failed_results)}개 ({total_processing_time:.2f}초)")
+        logger.info(f"✅ 배치 분석 완료: 성공 {len(successful_results)}개, 실패 {len(failed_results)}개 ({total_processing_time:.2f}초, LLM 호출 {total_llm_calls}회)")
         
         return {
             "success": True,
@@ -184,7 +371,12 @@ async def batch_analyze_endpoint(req: BatchAnalyzeRequest):
                 "failed_count": len(failed_results),
                 "success_rate": len(successful_results) / len(req.requests) if req.requests else 0,
                 "total_processing_time": total_processing_time,
-                "avg_processing_time": total_processing_time / len(req.requests) if req.requests else 0
+                "avg_processing_time": total_processing_time / len(req.requests) if req.requests else 0,
+                "total_llm_calls": total_llm_calls,
+                "total_tool_calls": total_tool_calls,
+                "total_prompt_tokens": total_prompt_tokens,
+                "total_cached_tokens": total_cached_tokens,
+                "cached_token_ratio": total_cached_tokens / total_prompt_tokens if total_prompt_tokens else 0
             }
         }
         
@@ -198,6 +390,96 @@ async def batch_analyze_endpoint(req: BatchAnalyzeRequest):
             "processing_time": total_processing_time
         }
 
+@app.get("/market/snapshot")
+async def market_snapshot_endpoint():
+    """카탈로그 ETF 전체의 기술적 지표 스냅샷 (스케줄러 실행 단위로 공유)"""
+    start_time = time.time()
+
+    try:
+        snapshot = await submit_tool(market_snapshot)
+
+        processing_time = time.time() - start_time
+        logger.info(f"✅ 시장 지표 스냅샷 생성 완료 ({processing_time:.3f}초)")
+
+        return {
+            "success": True,
+            "snapshot": snapshot,
+            "processing_time": processing_time
+        }
+    except Exception as e:
+        processing_time = time.time() - start_time
+        logger.error(f"❌ 시장 지표 스냅샷 생성 실패 ({processing_time:.3f}초): {e}")
+
+        return {
+            "success": False,
+            "error": str(e),
+            "processing_time": processing_time
+        }
+
+@app.post("/backtest")
+async def backtest_endpoint(req: BacktestRequest):
+    """한 사용자의 ETF별 적립식 스케줄 백테스트"""
+    start_time = time.time()
+
+    try:
+        result = await submit_tool(
+            backtest_dca,
+            [schedule.model_dump() for schedule in req.schedules],
+            req.years,
+            req.start,
+            req.end
+        )
+
+        processing_time = time.time() - start_time
+        logger.info(f"✅ 적립식 백테스트 완료 ({processing_time:.3f}초)")
+
+        return {
+            "success": True,
+            "result": result,
+            "processing_time": processing_time
+        }
+    except Exception as e:
+        processing_time = time.time() - start_time
+        logger.error(f"❌ 적립식 백테스트 실패 ({processing_time:.3f}초): {e}")
+
+        return {
+            "success": False,
+            "error": str(e),
+            "processing_time": processing_time
+        }
+
+@app.post("/backtest/batch")
+async def batch_backtest_endpoint(req: BatchBacktestRequest):
+    """여러 사용자의 적립식 스케줄을 한 번에 백테스트 (리포팅용)"""
+    start_time = time.time()
+
+    try:
+        result = await submit_tool(
+            backtest_dca_batch,
+            [user.model_dump() for user in req.users],
+            req.years,
+            req.start,
+            req.end
+        )
+
+        processing_time = time.time() - start_time
+        logger.info(f"✅ 배치 백테스트 완료: {len(req.users)}명 ({processing_time:.2f}초)")
+
+        return {
+            "success": True,
+            "result": result,
+            "processing_time": processing_time
+        }
+    except Exception as e:
+        processing_time = time.time() - start_time
+        logger.error(f"❌ 배치 백테스트 실패 ({processing_time:.2f}초): {e}")
+
+        return {
+            "success": False,
+            "error": str(e),
+            "processing_time": processing_time
+        }
+
 @app.get("/")
 async def root():
     """Railway 헬스체크용 루트 엔드포인트"""
@@ -215,7 +497,22 @@ async def health_check():
         "status": "healthy",
         "service": "ETF AI Analysis Service",
         "timestamp": time.time(),
-        "thread_pool_size": executor._max_workers
+        "thread_pool_size": TOOL_WORKERS,
+        "tool_queue_depth": tool_queue_depth(),
+        "admission": admission.metrics(),
+        "llm_clients": client_registry.stats()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """수용 제어 대기열 / LLM 클라이언트 / tool 스레드 풀 / 채팅 캐시 / 채팅 생성 취소 지표"""
+    return {
+        "timestamp": time.time(),
+        "admission": admission.metrics(),
+        "llm_clients": client_registry.stats(),
+        "tool_queue_depth": tool_queue_depth(),
+        "chat_cache": response_cache.metrics(),
+        "chat_cancellation": cancellations.metrics()
     }
 
 if __name__ == "__main__":
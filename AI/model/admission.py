@@ -0,0 +1,156 @@
+"""
+요청 수용 제어 (admission control)
+- 대화형 채팅(interactive)이 예약 배치 분석(batch)보다 먼저 슬롯을 받고, batch는 interactive 몫을 남겨둔 만큼만 사용
+- 대기열 길이 / 예상 대기 시간 / 채팅 대기 지연이 한도를 넘으면 Overloaded(503 + Retry-After)로 거절
+"""
+
+import os
+import math
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)  # 앞쪽이 우선
+
+# 수용 제어 설정 (환경 변수로 조정 가능)
+ADMISSION_CAPACITY = int(os.getenv("ADMISSION_CAPACITY", "200"))  # 동시에 처리하는 분석/채팅 수
+INTERACTIVE_RESERVE = int(os.getenv("INTERACTIVE_RESERVE", "20"))  # batch가 사용할 수 없는 채팅 전용 슬롯
+MAX_QUEUE = {
+    INTERACTIVE: int(os.getenv("MAX_QUEUE_INTERACTIVE", "50")),
+    BATCH: int(os.getenv("MAX_QUEUE_BATCH", "2000")),
+}
+MAX_WAIT = {  # 예상 대기 시간(초)이 이보다 길면 거절
+    INTERACTIVE: float(os.getenv("MAX_WAIT_INTERACTIVE", "5")),
+    BATCH: float(os.getenv("MAX_WAIT_BATCH", "300")),
+}
+CHAT_TARGET_WAIT = float(os.getenv("CHAT_TARGET_WAIT", "1.0"))  # 채팅 대기 지연(EWMA)이 이를 넘으면 batch 거절
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "500"))  # /analyze/batch 한 번에 받는 요청 수
+EWMA_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    """수용 한도 초과 (retry_after초 후 재시도 권장)"""
+
+    def __init__(self, reason: str, retry_after: float):
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"{reason} (retry after {self.retry_after}s)")
+
+
+class AdmissionController:
+    """우선순위 대기열 + 부하 기반 거절 (이벤트 루프 하나에서만 사용)"""
+
+    def __init__(self, capacity: int = ADMISSION_CAPACITY, interactive_reserve: int = INTERACTIVE_RESERVE):
+        self.capacity = max(capacity, 1)
+        self.batch_capacity = max(self.capacity - interactive_reserve, 1)
+        self.in_flight = {priority: 0 for priority in PRIORITIES}
+        self.queues = {priority: deque() for priority in PRIORITIES}
+        self.wait_ewma = {priority: 0.0 for priority in PRIORITIES}
+        self.service_ewma = {INTERACTIVE: 10.0, BATCH: 20.0}  # 초기 추정치 (초)
+        self.counters = {priority: {"admitted": 0, "shed": 0, "completed": 0} for priority in PRIORITIES}
+
+    def _can_start(self, priority: str) -> bool:
+        total = sum(self.in_flight.values())
+        if priority == INTERACTIVE:
+            return total < self.capacity
+        # batch는 채팅 대기열이 비어 있고 예약분을 남길 때만 시작
+        return not self.queues[INTERACTIVE] and total < self.batch_capacity
+
+    def estimated_wait(self, priority: str, count: int = 1) -> float:
+        """지금 들어온 요청 count개 중 마지막 요청의 예상 대기 시간(초)"""
+        slots = self.capacity if priority == INTERACTIVE else self.batch_capacity
+        ahead = len(self.queues[INTERACTIVE]) if priority == INTERACTIVE else sum(len(queue) for queue in self.queues.values())
+        free = max(slots - sum(self.in_flight.values()), 0)
+        waiting = ahead + count - free
+        if waiting <= 0:
+            return 0.0
+        return math.ceil(waiting / slots) * self.service_ewma[priority]
+
+    def check(self, priority: str, count: int = 1):
+        """대기열에 count개를 더 받을 수 있는지 확인 (불가능하면 Overloaded)"""
+        queued = len(self.queues[priority])
+        wait = self.estimated_wait(priority, count)
+        reason = None
+        if queued + count > MAX_QUEUE[priority]:
+            reason = f"{priority} 대기열 초과 ({queued}/{MAX_QUEUE[priority]})"
+        elif wait > MAX_WAIT[priority]:
+            reason = f"{priority} 예상 대기 시간 초과 ({wait:.1f}초)"
+        elif priority == BATCH and self.queues[INTERACTIVE] and self.wait_ewma[INTERACTIVE] > CHAT_TARGET_WAIT:
+            # 채팅이 대기 중이고 채팅 지연이 목표를 넘으면 batch를 받지 않아 채팅에 자리를 양보
+            reason = f"채팅 대기 지연 {self.wait_ewma[INTERACTIVE]:.2f}초 (목표 {CHAT_TARGET_WAIT}초)"
+            wait = max(wait, self.service_ewma[BATCH])
+
+        if reason:
+            self.counters[priority]["shed"] += count
+            # 재시도 권장 시간은 해당 우선순위의 최대 대기 시간을 넘지 않게 제한
+            raise Overloaded(reason, min(wait or self.service_ewma[priority], MAX_WAIT[priority]))
+
+    async def acquire(self, priority: str):
+        if not self.queues[priority] and self._can_start(priority):
+            self.in_flight[priority] += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self.queues[priority].append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 슬롯을 받은 직후 취소됨
+                self.release(priority)
+            else:
+                self.queues[priority].remove(future)
+            raise
+
+    def release(self, priority: str):
+        self.in_flight[priority] -= 1
+        self._wake()
+
+    def _wake(self):
+        """우선순위 순서로 대기 중인 요청에 슬롯 배정"""
+        for priority in PRIORITIES:
+            queue = self.queues[priority]
+            while queue and self._can_start(priority):
+                future = queue.popleft()
+                if future.done():
+                    continue
+                self.in_flight[priority] += 1
+                future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: str):
+        """슬롯을 받을 때까지 대기하고, 대기/처리 시간을 EWMA로 기록"""
+        queued_at = time.monotonic()
+        await self.acquire(priority)
+        started_at = time.monotonic()
+        self.counters[priority]["admitted"] += 1
+        self.wait_ewma[priority] += EWMA_ALPHA * (started_at - queued_at - self.wait_ewma[priority])
+        try:
+            yield
+        finally:
+            self.service_ewma[priority] += EWMA_ALPHA * (time.monotonic() - started_at - self.service_ewma[priority])
+            self.counters[priority]["completed"] += 1
+            self.release(priority)
+
+    def metrics(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "batch_capacity": self.batch_capacity,
+            **{
+                priority: {
+                    "in_flight": self.in_flight[priority],
+                    "queued": len(self.queues[priority]),
+                    "wait_ewma": round(self.wait_ewma[priority], 3),
+                    "service_ewma": round(self.service_ewma[priority], 3),
+                    **self.counters[priority],
+                }
+                for priority in PRIORITIES
+            },
+        }
+
+
+# 프로세스 공용 수용 제어기
+admission = AdmissionController()
@@ -0,0 +1,68 @@
+"""
+채팅 생성 취소
+- 클라이언트(백엔드) 연결이 끊기면 생성 태스크를 취소해서 제공자 스트림을 닫고, 아직 시작하지 않은 tool 실행은 스레드 풀 대기열에서 제거
+- 취소된 생성 수와 단계, 취소 시점까지 생성한 토큰, 완료된 답변 길이(EWMA) 기준으로 아낀 토큰 추정치를 집계
+"""
+
+import os
+import asyncio
+
+# 연결 끊김 확인 주기(초)
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", "0.5"))
+EWMA_ALPHA = 0.2
+
+QUEUED = "queued"  # 수용 슬롯 대기 중
+PREPARING = "preparing"  # 첫 LLM 호출 / tool 실행 중
+STREAMING = "streaming"  # 답변 스트리밍 중
+STAGES = (QUEUED, PREPARING, STREAMING)
+
+
+async def watch_disconnect(request, task: asyncio.Task, interval: float = DISCONNECT_POLL_INTERVAL):
+    """요청 연결이 끊기면 task를 취소 (task가 끝나면 함께 종료)"""
+    while not task.done():
+        if await request.is_disconnected():
+            task.cancel()
+            return
+        await asyncio.sleep(interval)
+
+
+class CancellationTracker:
+    """채팅 생성 완료/취소 집계"""
+
+    def __init__(self):
+        self.completed = 0
+        self.cancelled = {stage: 0 for stage in STAGES}
+        self.tokens_generated_before_cancel = 0
+        self.estimated_tokens_saved = 0
+        self.completion_tokens_ewma = None
+
+    def record_completed(self, completion_tokens: int):
+        self.completed += 1
+        if self.completion_tokens_ewma is None:
+            self.completion_tokens_ewma = float(completion_tokens)
+        else:
+            self.completion_tokens_ewma += EWMA_ALPHA * (completion_tokens - self.completion_tokens_ewma)
+
+    def record_cancelled(self, stage: str, tokens_generated: int):
+        """취소 시점까지 생성한 토큰 수(스트림 chunk 수로 근사)와 평균 답변 길이로 아낀 토큰 추정"""
+        self.cancelled[stage] += 1
+        self.tokens_generated_before_cancel += tokens_generated
+        if self.completion_tokens_ewma is not None:
+            self.estimated_tokens_saved += max(int(self.completion_tokens_ewma) - tokens_generated, 0)
+
+    def metrics(self) -> dict:
+        cancelled = sum(self.cancelled.values())
+        total = self.completed + cancelled
+        return {
+            "completed": self.completed,
+            "cancelled": cancelled,
+            "cancelled_by_stage": dict(self.cancelled),
+            "cancel_rate": cancelled / total if total else 0.0,
+            "tokens_generated_before_cancel": self.tokens_generated_before_cancel,
+            "estimated_tokens_saved": self.estimated_tokens_saved,
+            "avg_completion_tokens": round(self.completion_tokens_ewma or 0.0, 1),
+        }
+
+
+# 프로세스 공용 취소 집계
+cancellations = CancellationTracker()
@@ -0,0 +1,276 @@
+"""
+LLM 클라이언트 풀
+- (base URL, API 키)별 AsyncOpenAI 클라이언트를 LRU로 재사용하고, HTTP 연결 풀은 base URL(OpenAI / Clova)별로 공유
+- 동시 호출 수는 제공자(base URL)별 / API 키별 세마포어로 제한
+- API 키별 토큰 버킷으로 요청 속도를 제한하고, 429 응답의 retry-after 동안 해당 키의 요청을 멈춘 뒤 재시도
+- 스트리밍 호출은 스트림을 끝까지 읽거나 닫을 때까지 동시성 슬롯을 점유
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import AsyncExitStack
+from email.utils import parsedate_to_datetime
+
+import httpx
+from openai import AsyncOpenAI, RateLimitError
+
+logger = logging.getLogger(__name__)
+
+CLOVA_BASE_URL = "https://clovastudio.stream.ntruss.com/v1/openai"
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+# 클라이언트 풀 / 속도 제한 설정 (환경 변수로 조정 가능)
+CLIENT_POOL_SIZE = int(os.getenv("CLIENT_POOL_SIZE", "64"))  # 유지할 (base URL, API 키) 클라이언트 수
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "200"))  # base URL별 최대 연결 수
+RATE_LIMIT_RPM = float(os.getenv("RATE_LIMIT_RPM", "60"))  # API 키별 분당 요청 수
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "10"))  # API 키별 순간 최대 요청 수
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3"))  # 429 응답 재시도 횟수
+
+# 동시 호출 수 제한 (제공자별 / API 키별)
+PROVIDER_CONCURRENCY = {
+    OPENAI_BASE_URL: int(os.getenv("OPENAI_CONCURRENCY", "200")),
+    CLOVA_BASE_URL: int(os.getenv("CLOVA_CONCURRENCY", "50")),
+}
+KEY_CONCURRENCY = int(os.getenv("KEY_CONCURRENCY", "20"))
+
+
+def key_id(api_key: str) -> str:
+    """로그/키 식별용 API 키 해시 (원문 키는 보관하지 않음)"""
+    return hashlib.sha1(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+def retry_after_seconds(error: RateLimitError, attempt: int) -> float:
+    """429 응답 헤더(retry-after-ms / retry-after)의 대기 시간, 없으면 지수 백오프"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            value = headers["retry-after"]
+            try:
+                return float(value)
+            except ValueError:
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        pass
+    return float(2 ** attempt)
+
+
+class TokenBucket:
+    """API 키별 토큰 버킷 (대기는 이벤트 루프에서 asyncio.sleep으로 처리)"""
+
+    def __init__(self, rate_per_minute: float = RATE_LIMIT_RPM, capacity: int = RATE_LIMIT_BURST):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """토큰이 생길 때까지(또는 retry-after가 끝날 때까지) 대기 후 하나 사용"""
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self.blocked_until and self.tokens >= 1:
+                self.tokens -= 1
+                return
+            wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate if self.rate > 0 else 1.0)
+            await asyncio.sleep(min(max(wait, 0.01), 5.0))
+
+    def block(self, seconds: float):
+        """429 응답을 받으면 retry-after 동안 해당 키의 모든 요청을 멈추고 버킷을 비움"""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class CallGate:
+    """세마포어 + 대기/실행 수 집계 (/health의 큐 길이 보고용)"""
+
+    def __init__(self, limit: int):
+        self.limit = max(limit, 1)
+        self.semaphore = asyncio.Semaphore(self.limit)
+        self.waiting = 0
+        self.running = 0
+
+    async def __aenter__(self):
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.running -= 1
+        self.semaphore.release()
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "waiting": self.waiting, "running": self.running}
+
+
+class KeyState:
+    """API 키별 속도 제한 상태 (클라이언트가 LRU에서 밀려나도 호출 중이거나 429 대기 중이면 유지)"""
+
+    def __init__(self):
+        self.bucket = TokenBucket()
+        self.gate = CallGate(KEY_CONCURRENCY)
+
+    def idle(self) -> bool:
+        """대기/실행 중인 호출과 retry-after 대기가 없으면 True (제거해도 잃는 제한 상태가 없음)"""
+        return self.gate.waiting == 0 and self.gate.running == 0 and self.bucket.blocked_until <= time.monotonic()
+
+
+class GatedStream:
+    """스트리밍 응답 래퍼: 끝까지 읽거나 close()할 때 점유한 동시성 슬롯을 반환"""
+
+    def __init__(self, stream, slots: AsyncExitStack):
+        self.stream = stream
+        self._slots = slots
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self.stream:
+                yield chunk
+        finally:
+            await self.release()
+
+    async def release(self):
+        slots, self._slots = self._slots, None
+        if slots is not None:
+            await slots.aclose()
+
+    async def close(self):
+        try:
+            await self.stream.close()
+        finally:
+            await self.release()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class PooledClient:
+    """공유 연결 풀을 쓰는 AsyncOpenAI 클라이언트 + 제공자/API 키별 동시성 및 속도 제한"""
+
+    def __init__(self, client: AsyncOpenAI, provider_gate: CallGate, key_state: KeyState, api_key: str):
+        self.client = client
+        self.provider_gate = provider_gate
+        self.key_state = key_state
+        self.key_id = key_id(api_key)
+
+    async def create(self, **kwargs):
+        """
+        chat.completions.create를 동시성 제한/속도 제한/429 재시도와 함께 호출
+        - stream=True면 GatedStream을 반환하고, 슬롯은 스트림을 끝까지 읽거나 닫을 때 반환
+        """
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            # 속도 제한 대기 중에는 제공자 슬롯을 점유하지 않도록 키 게이트 -> 토큰 버킷 -> 제공자 게이트 순서로 획득
+            async with AsyncExitStack() as slots:
+                await slots.enter_async_context(self.key_state.gate)
+                await self.key_state.bucket.acquire()
+                try:
+                    await slots.enter_async_context(self.provider_gate)
+                    response = await self.client.chat.completions.create(**kwargs)
+                    if kwargs.get("stream"):
+                        return GatedStream(response, slots.pop_all())
+                    return response
+                except RateLimitError as e:
+                    wait = retry_after_seconds(e, attempt)
+                    self.key_state.bucket.block(wait)
+                    if attempt == RATE_LIMIT_MAX_RETRIES:
+                        raise
+                    logger.warning(f"⏳ API 키 {self.key_id} 속도 제한(429): {wait:.1f}초 후 재시도 ({attempt + 1}/{RATE_LIMIT_MAX_RETRIES})")
+
+
+class ClientRegistry:
+    """(base URL, API 키)별 클라이언트 LRU 레지스트리"""
+
+    def __init__(self, max_size: int = CLIENT_POOL_SIZE):
+        self.max_size = max_size
+        self._clients = OrderedDict()  # (base_url, sha1(api_key)) -> PooledClient
+        self._keys = {}  # sha1(api_key) -> KeyState (클라이언트가 없고 유휴 상태면 제거)
+        self._providers = {}  # base_url -> (httpx.AsyncClient, CallGate)
+        self._lock = threading.Lock()
+
+    def _provider(self, base_url: str):
+        if base_url not in self._providers:
+            http_client = httpx.AsyncClient(
+                base_url=base_url,
+                timeout=httpx.Timeout(600.0, connect=5.0),
+                limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+            )
+            gate = CallGate(PROVIDER_CONCURRENCY.get(base_url, PROVIDER_CONCURRENCY[OPENAI_BASE_URL]))
+            self._providers[base_url] = (http_client, gate)
+        return self._providers[base_url]
+
+    def get(self, api_key: str, base_url: str = OPENAI_BASE_URL) -> PooledClient:
+        key = (base_url, hashlib.sha1(api_key.encode("utf-8")).hexdigest())
+        with self._lock:
+            pooled = self._clients.get(key)
+            if pooled is not None:
+                self._clients.move_to_end(key)
+                return pooled
+
+            http_client, provider_gate = self._provider(base_url)
+            key_state = self._keys.setdefault(key[1], KeyState())
+            # 속도 제한은 PooledClient에서 처리하므로 SDK 자체 재시도는 끔
+            client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=http_client,
+                max_retries=0,
+            )
+            pooled = PooledClient(client, provider_gate, key_state, api_key)
+            self._clients[key] = pooled
+
+            # 공유 연결 풀을 닫지 않도록 close()는 호출하지 않고 참조만 제거
+            if len(self._clients) > self.max_size:
+                while len(self._clients) > self.max_size:
+                    self._clients.popitem(last=False)
+                self._evict_idle_keys()
+            return pooled
+
+    def _evict_idle_keys(self):
+        """
+        클라이언트가 모두 밀려난 키 중 유휴 상태인 키의 속도 제한 상태 제거 (_lock 안에서 호출)
+        - 밀려날 때 호출 중이던 키는 다음 제거 때 다시 확인
+        """
+        in_use = {digest for _, digest in self._clients}
+        for digest in [digest for digest, state in self._keys.items() if digest not in in_use and state.idle()]:
+            del self._keys[digest]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "api_keys": len(self._keys),
+                "providers": {base_url: gate.stats() for base_url, (_, gate) in self._providers.items()},
+                "key_waiting": sum(state.gate.waiting for state in self._keys.values()),
+            }
+
+    async def aclose(self):
+        """서버 종료 시 공유 연결 풀 정리"""
+        for http_client, _ in list(self._providers.values()):
+            await http_client.aclose()
+
+
+# 프로세스 공용 클라이언트 레지스트리
+client_registry = ClientRegistry()
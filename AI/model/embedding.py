@@ -0,0 +1,108 @@
+"""
+문장 임베딩 서비스
+프로세스당 SentenceTransformer 모델 하나를 처음 사용할 때 로드하고, 여러 문장을 한 번의 encode 호출로 처리
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 임베딩 설정 (환경 변수로 조정 가능)
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "paraphrase-MiniLM-L6-v2")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()  # torch / onnx
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "")  # 양자화 모델 파일 (예: onnx/model_qint8_avx512.onnx)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))  # 문장 해시 기준 LRU 캐시 크기
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingService:
+    """지연 로드 + 배치 인코딩 + LRU 캐시를 갖춘 임베딩 제공자"""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, backend: str = EMBEDDING_BACKEND):
+        self.model_name = model_name
+        self.backend = backend
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._cache = OrderedDict()  # sha1(text) -> 정규화된 벡터
+        self._cache_lock = threading.Lock()
+
+    def _load(self):
+        """처음 호출될 때만 모델을 로드 (ONNX 로드에 실패하면 torch로 대체)"""
+        if self._model is not None:
+            return self._model
+
+        with self._load_lock:
+            if self._model is not None:
+                return self._model
+
+            from sentence_transformers import SentenceTransformer
+
+            if self.backend == "onnx":
+                try:
+                    model_kwargs = {"file_name": EMBEDDING_ONNX_FILE} if EMBEDDING_ONNX_FILE else None
+                    self._model = SentenceTransformer(self.model_name, backend="onnx", model_kwargs=model_kwargs)
+                    logger.info(f"✅ 임베딩 모델 로드 성공 (ONNX): {self.model_name}")
+                    return self._model
+                except Exception as e:
+                    logger.warning(f"⚠️ ONNX 임베딩 모델 로드 실패, torch 백엔드 사용: {e}")
+
+            self._model = SentenceTransformer(self.model_name, device="cpu")
+            logger.info(f"✅ 임베딩 모델 로드 성공: {self.model_name}")
+            return self._model
+
+    def encode(self, texts) -> np.ndarray:
+        """문장 리스트를 정규화된 벡터 행렬(N x D)로 변환 (캐시에 없는 문장만 한 번에 인코딩)"""
+        texts = [str(text) for text in texts]
+        keys = [text_key(text) for text in texts]
+
+        vectors = {}
+        with self._cache_lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    vectors[key] = self._cache[key]
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+
+        if missing:
+            encoded = self._load().encode(
+                list(missing.values()),
+                batch_size=EMBEDDING_BATCH_SIZE,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            ).astype(np.float32)
+
+            with self._cache_lock:
+                for key, vector in zip(missing.keys(), encoded):
+                    vectors[key] = vector
+                    self._cache[key] = vector
+                    self._cache.move_to_end(key)
+                while len(self._cache) > EMBEDDING_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys])
+
+    def similarity(self, sent1: str, sent2: str) -> float:
+        """두 문장의 코사인 유사도 (정규화된 벡터의 내적)"""
+        vectors = self.encode([sent1, sent2])
+        return float(vectors[0] @ vectors[1])
+
+
+# 전역 임베딩 서비스 인스턴스 (모델은 첫 encode 호출 시 로드)
+embedding_service = EmbeddingService()
@@ -1,24 +1,52 @@
-from openai import OpenAI
 from function_calling.function import *
 from function_calling.tools import *
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from function_calling.serializer import serialize_tool_output
+from function_calling.indicators import get_technical_indicators
+from function_calling.backtest import backtest_dca
+from model.embedding import embedding_service
+from model.client_pool import client_registry, CLOVA_BASE_URL
+from model.structured_output import analysis_response_format
+from concurrent.futures import ThreadPoolExecutor
 import warnings
+import asyncio
 import json
+import os
 warnings.filterwarnings('ignore')
 
+# 분석 한 번에 허용하는 tool 호출 라운드 수 (초과 시 tools 없이 최종 응답)
+MAX_TOOL_ROUNDS = int(os.getenv("MAX_TOOL_ROUNDS", "3"))
+
+# 블로킹/CPU 작업(tool 실행, 백테스트, 시세 수집) 전용 스레드 풀. LLM 호출은 이벤트 루프에서 비동기로 처리.
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "10"))
+tool_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+tool_in_flight = 0  # tool_executor에 제출했지만 끝나지 않은 작업 수 (이벤트 루프에서만 갱신)
+
+def _tool_done(future):
+    global tool_in_flight
+    tool_in_flight -= 1
+
+# tool_executor에 작업을 제출하는 함수. (이벤트 루프에서만 호출)
+# 제출/완료 수를 직접 세어 스레드 풀 내부 속성 없이 대기열 깊이를 보고함.
+def submit_tool(func, *args):
+    global tool_in_flight
+    future = asyncio.get_running_loop().run_in_executor(tool_executor, func, *args)
+    tool_in_flight += 1
+    future.add_done_callback(_tool_done)
+    return future
+
+# 워커를 기다리는 작업 수. (실행 중인 작업은 제외)
+def tool_queue_depth():
+    return max(tool_in_flight - TOOL_WORKERS, 0)
+
 # client 생성.
+# (base URL, API 키)별 비동기 클라이언트를 재사용하고 제공자/API 키별 동시성 제한, 속도 제한/429 재시도를 적용함.
 def create_client(api_key, model_type):
-    # 클라이언트 설정 (기존 코드와 동일)
     # Clova의 경우 OpenAI API Client 설정이 다름.
     if model_type == "clova-x":
         model_type = "HCX-005"
-        client = OpenAI(
-            api_key=api_key,
-            base_url="https://clovastudio.stream.ntruss.com/v1/openai"
-        )
+        client = client_registry.get(api_key, CLOVA_BASE_URL)
     else:
-        client = OpenAI(api_key=api_key)
+        client = client_registry.get(api_key)
     
     return client, model_type
 
@@ -35,16 +63,82 @@ def function_calling(function_name, args):
         output = bring_recent_news_naver_korea(args["top_n"])
     elif function_name == "Korea_Bank_News_Text":
         output = Korea_Bank_News_Text()
+    elif function_name == "get_technical_indicators":
+        output = get_technical_indicators(args["symbols"])
+    elif function_name == "backtest_dca":
+        output = backtest_dca(args["schedules"], args["years"])
     else:
         output = None
     
     return output
 
+# API usage의 토큰 수(프롬프트 캐시 적중 포함)를 stats에 누적하는 함수.
+def record_usage(stats, usage):
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    stats["prompt_tokens"] = stats.get("prompt_tokens", 0) + (usage.prompt_tokens or 0)
+    stats["completion_tokens"] = stats.get("completion_tokens", 0) + (usage.completion_tokens or 0)
+    stats["cached_tokens"] = stats.get("cached_tokens", 0) + (getattr(details, "cached_tokens", None) or 0)
+
+# tool 하나를 실행하고 결과를 직렬화하는 함수. (워커 스레드에서 실행)
+def execute_tool(function_name, args):
+    output = None
+    try:
+        # Function Calling
+        output = function_calling(function_name, args)
+    except Exception as e:
+        output = f"⚠️ 함수 실행 중 오류 발생: {str(e)}"
+
+    return serialize_tool_output(function_name, output) if output else None
+
+# tool_calls를 실행하고 결과를 messages에 추가하는 함수.
+# 시세 조회/지표 계산 등 블로킹 tool은 tool_executor에서 동시에 실행함.
+# 생성이 취소되면 아직 시작하지 않은 tool은 스레드 풀 대기열에서 빠지고, 실행 중인 tool의 결과는 버림.
+# 반환: 실행한 tool 호출 수
+async def run_tool_calls(messages, tool_calls):
+    tool_calls = list(tool_calls or [])
+    calls = [(tool, json.loads(tool.function.arguments)) for tool in tool_calls]
+
+    outputs = await asyncio.gather(*[
+        submit_tool(execute_tool, tool.function.name, args)
+        for tool, args in calls
+    ])
+
+    # 함수 결과가 있을 경우 messages에 추가 (호출 순서 유지)
+    for (tool, args), output in zip(calls, outputs):
+        if output:
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [
+                        {
+                            "id": tool.id,
+                            "type": "function",
+                            "function": {
+                                "name": tool.function.name,
+                                "arguments": json.dumps(args, ensure_ascii=False)
+                            }
+                        }
+                    ]
+                }
+            )
+            messages.append(
+                {
+                    "role": "tool",
+                    "tool_call_id": tool.id, 
+                    "content": output
+                }
+            )
+
+    return len(calls)
+
 # 고객의 금융 관련 질문에 대한 응답을 제공하는 함수.(chat bot)
-def create_response(messages, api_key, model_type):
+async def create_response(messages, api_key, model_type):
     client, model_type = create_client(api_key, model_type)
 
-    response = client.chat.completions.create(
+    response = await client.create(
         messages=messages,
         model=model_type,
         temperature=0.9,
@@ -53,50 +147,17 @@ def create_response(messages, api_key, model_type):
 
     # 모델이 함수를 호출하면 실행.
     if response.choices[0].finish_reason == "tool_calls":
-        for tool in response.choices[0].message.tool_calls or []:
-            args = json.loads(tool.function.arguments)
-
-            # 각 tool에 대한 처리 (함수 호출 후 메시지 업데이트)
-            output = None
-            try:
-                # Function Calling
-                output = function_calling(tool.function.name, args)
-            except Exception as e:
-                output = f"⚠️ 함수 실행 중 오류 발생: {str(e)}"
-
-            # 함수 결과가 있을 경우 messages에 추가
-            if output:
-                messages.append(
-                    {
-                        "role": "assistant",
-                        "content": None,
-                        "tool_calls": [
-                            {
-                                "id": tool.id,
-                                "type": "function",
-                                "function": {
-                                    "name": tool.function.name,
-                                    "arguments": str(args)
-                                }
-                            }
-                        ]
-                    }
-                )
-                messages.append(
-                    {
-                        "role": "tool",
-                        "tool_call_id": tool.id, 
-                        "content": str(output) if output else "정보를 가져올 수 없음."
-                    }
-                )
+        await run_tool_calls(messages, response.choices[0].message.tool_calls)
 
     # 스트리밍을 활성화한 호출.
-    # tools를 기입하지 않음.
-    response = client.chat.completions.create(
+    # tools를 기입하지 않음. OpenAI는 마지막 chunk로 usage(캐시 토큰 포함)를 받음.
+    options = {} if model_type == "HCX-005" else {"stream_options": {"include_usage": True}}
+    response = await client.create(
         messages=messages,
         model=model_type,
         temperature=0.9,
-        stream=True
+        stream=True,
+        **options
     )
     
     # value == tool_calls => 응답 안됨. value != tool_calls => 응답 됨.
@@ -105,78 +166,57 @@ def create_response(messages, api_key, model_type):
     return response, messages
 
 # 실시간으로 고객이 투자하는 ETF 상품 및 추가로 투자할 만한 가치가 있는 ETF 추천하는 모델 생성.(chat alarm)
-def analyze_sentiment(messages, api_key, model_type):
+# structured=True이고 모델이 지원하면 최종 응답을 JSON schema(종목별 행동/비율/이유 + 종합 의견)로 받음.
+# tool을 호출하지 않은 응답은 그대로 반환하고(1회 호출), tool을 호출하면 MAX_TOOL_ROUNDS까지 반복한 뒤
+# 한도에 도달하면 tools 없이 최종 응답을 받음.
+# stats(dict)를 넘기면 요청별 호출 수(llm_calls, tool_calls, tool_rounds)와 토큰 수(prompt/completion/cached)를 기록함.
+# use_tools=False면 tools 없이 한 번만 호출함 (공유 분석 개인화처럼 입력만으로 답할 수 있는 요청).
+async def analyze_sentiment(messages, api_key, model_type, structured=False, stats=None, use_tools=True):
+    response_format = analysis_response_format(model_type, structured)
     client, model_type = create_client(api_key, model_type)
-
-    response = client.chat.completions.create(
-        messages=messages,
-        model=model_type,
-        temperature=0.65,
-        tools=tools
-    )
-
-    # tool_calls가 있는 경우 이를 처리
-    if response.choices[0].finish_reason == "tool_calls":
-        for tool in response.choices[0].message.tool_calls or []:
-            args = json.loads(tool.function.arguments)
-
-            # 각 tool에 대한 처리 (함수 호출 후 메시지 업데이트)
-            output = None
-            try:
-                # Function Calling
-                output = function_calling(tool.function.name, args)
-            except Exception as e:
-                output = f"⚠️ 함수 실행 중 오류 발생: {str(e)}"
-
-            # 함수 결과가 있을 경우 messages에 추가
-            if output:
-                messages.append(
-                    {
-                        "role": "assistant",
-                        "content": None,
-                        "tool_calls": [
-                            {
-                                "id": tool.id,
-                                "type": "function",
-                                "function": {
-                                    "name": tool.function.name,
-                                    "arguments": str(args)
-                                }
-                            }
-                        ]
-                    }
-                )
-                messages.append(
-                    {
-                        "role": "tool",
-                        "tool_call_id": tool.id, 
-                        "content": str(output) if output else "정보를 가져올 수 없음."
-                    }
-                )
-
-    # 스트리밍을 활성화한 호출.
-    # tools를 기입하지 않음.
-    response = client.chat.completions.create(
-        messages=messages,
-        model=model_type,
-        temperature=0.9,
-    )
-
-    response = response.choices[0].message.content
+    stats = stats if stats is not None else {}
+    stats.update({"llm_calls": 0, "tool_calls": 0, "tool_rounds": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0})
+
+    options = {"response_format": response_format} if response_format else {}
+    tool_rounds = MAX_TOOL_ROUNDS if use_tools else 0
+    for depth in range(tool_rounds + 1):
+        if depth < tool_rounds:
+            response = await client.create(
+                messages=messages,
+                model=model_type,
+                temperature=0.65,
+                tools=tools,
+                **options
+            )
+        else:
+            # 최종 응답 호출.
+            # tool 호출 한도에 도달했거나 tools를 쓰지 않는 요청이므로 tools를 기입하지 않음.
+            response = await client.create(
+                messages=messages,
+                model=model_type,
+                temperature=0.9,
+                **options
+            )
+        stats["llm_calls"] += 1
+        record_usage(stats, response.usage)
+
+        choice = response.choices[0]
+        # tool을 호출하지 않았으면 이 응답이 최종 응답
+        if choice.finish_reason != "tool_calls" or not choice.message.tool_calls:
+            break
+
+        # tool_calls가 있는 경우 이를 처리하고 다음 호출에서 결과를 반영
+        stats["tool_calls"] += await run_tool_calls(messages, choice.message.tool_calls)
+        stats["tool_rounds"] += 1
+
+    response = choice.message.content
 
     return response, messages
 
 # 두 문장의 코사인 유사도 확인하는 함수.
-# 허깅페이스 API를 이용함.
+# 프로세스 공용 임베딩 서비스로 두 문장을 한 번에 인코딩함.
 def cosine_sim(sent1, sent2):
-    model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
-
-    # 각 문장 인코딩
-    sent1_encode = model.encode([sent1])
-    sent2_encode = model.encode([sent2])
-
-    # 코사인 유사도 확인.
-    similarity = cosine_similarity(sent1_encode, sent2_encode)
+    similarity = embedding_service.similarity(sent1, sent2)
     print(similarity)
 
-    return similarity[0][0]
\ No newline at end of file
+    return similarity
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+채팅 응답 시맨틱 캐시 (opt-in)
+- 같은 날짜 / 보유 ETF / 위험 성향 구간 / 모델 조합 안에서, 정규화한 짧은 질문의 임베딩이 임계값 이상으로 가까우면 이전 답변 재사용
+- 항목은 TTL이 지나거나 시세 저장소(price_store) 내용이 바뀌면 무효
+- 이전 대화나 관련 과거 대화 문맥이 함께 온 요청은 답변이 그 문맥에 따라 달라지므로 캐시하지 않음
+- 답변 속 사용자 이름은 단어 단위로만 자리 표시자로 바꿔 저장하고 응답할 때 현재 사용자 이름으로 채움
+"""
+
+import os
+import re
+import time
+import threading
+from datetime import date
+from collections import OrderedDict
+
+import numpy as np
+
+from model.embedding import embedding_service
+from function_calling.price_store import price_store
+
+# 캐시 설정 (환경 변수로 조정 가능)
+CHAT_CACHE_ENABLED = os.getenv("CHAT_CACHE_ENABLED", "false").lower() == "true"
+CHAT_CACHE_THRESHOLD = float(os.getenv("CHAT_CACHE_THRESHOLD", "0.97"))  # 코사인 유사도 하한 (엄격하게)
+CHAT_CACHE_TTL = int(os.getenv("CHAT_CACHE_TTL", "600"))  # 초
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "2000"))
+CHAT_CACHE_MAX_QUESTION_CHARS = int(os.getenv("CHAT_CACHE_MAX_QUESTION_CHARS", "80"))  # 짧은 질문만 캐시
+
+USER_NAME_SLOT = "{user_name}"
+NORMALIZE_PATTERN = re.compile(r"[^\w%]+")
+INSTRUCTION_ROLES = ("developer", "system")  # 질문 앞에 올 수 있는 지시문(페르소나) 역할
+NAME_SUFFIX = r"(?:님|씨)"  # 이름 뒤에 붙여 쓰는 호칭
+
+
+def name_pattern(user_name: str) -> re.Pattern:
+    """단어로 쓰인 사용자 이름 (다른 단어의 일부는 제외, 호칭이 붙은 경우는 포함)"""
+    return re.compile(rf"(?<!\w){re.escape(user_name)}(?=\W|$|{NAME_SUFFIX})")
+
+
+def normalize_question(question: str) -> str:
+    """소문자 변환, 문장 부호/공백 정리"""
+    return NORMALIZE_PATTERN.sub(" ", question.lower()).strip()
+
+
+def risk_bucket(risk_level) -> str:
+    """위험 성향(0~10)을 보수/중립/공격 구간으로 묶음"""
+    if risk_level is None:
+        return "unknown"
+    risk_level = int(risk_level)
+    return "conservative" if risk_level <= 3 else "neutral" if risk_level <= 6 else "aggressive"
+
+
+class ResponseCache:
+    """문맥 키별로 질문 임베딩 행렬을 두고 최근접 이웃을 찾는 응답 캐시"""
+
+    def __init__(self, threshold: float = CHAT_CACHE_THRESHOLD, ttl: int = CHAT_CACHE_TTL, max_entries: int = CHAT_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # 문맥 키 -> {"vectors": (N x D), "entries": [(answer, 저장 시각, price_store.version)]}
+        self._partitions = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "bypassed": 0, "stored": 0, "skipped": 0}
+
+    @staticmethod
+    def context_key(model_type: str, context: dict) -> tuple:
+        symbols = tuple(sorted({symbol.upper() for symbol in context.get("symbols") or []}))
+        return (date.today().isoformat(), model_type, symbols, risk_bucket(context.get("risk_level")))
+
+    @staticmethod
+    def question_of(messages: list):
+        """
+        캐시 대상 질문 (지시문 하나와 짧은 마지막 user 메시지만 있을 때)
+        - 앞선 user/assistant 턴이나 관련 과거 대화 같은 추가 문맥이 있으면 None
+        """
+        if not messages or messages[-1].get("role") != "user":
+            return None
+        preceding = messages[:-1]
+        if len(preceding) > 1 or any(message.get("role") not in INSTRUCTION_ROLES for message in preceding):
+            return None
+        question = normalize_question(str(messages[-1].get("content") or ""))
+        if not question or len(question) > CHAT_CACHE_MAX_QUESTION_CHARS:
+            return None
+        return question
+
+    def _expired(self, entry, now: float) -> bool:
+        _, stored_at, version = entry
+        return now - stored_at > self.ttl or version != price_store.version
+
+    def lookup(self, key: tuple, question: str, user_name: str = ""):
+        """가장 가까운 유효 항목이 임계값 이상이면 답변(현재 사용자 이름으로 채움), 없으면 None"""
+        vector = embedding_service.encode([question])[0]
+        now = time.time()
+        with self._lock:
+            partition = self._partitions.get(key)
+            if partition is not None:
+                self._partitions.move_to_end(key)
+                scores = partition["vectors"] @ vector
+                for index in np.argsort(-scores):
+                    if scores[index] < self.threshold:
+                        break
+                    entry = partition["entries"][index]
+                    if not self._expired(entry, now):
+                        self.counters["hits"] += 1
+                        return entry[0].replace(USER_NAME_SLOT, user_name)
+            self.counters["misses"] += 1
+        return None
+
+    def store(self, key: tuple, question: str, answer: str, user_name: str = ""):
+        """
+        답변 저장 (단어로 쓰인 사용자 이름은 자리 표시자로 치환)
+        - 치환 후에도 이름이 남으면(조사가 붙은 경우 등) 다른 사용자에게 이름이 보일 수 있으므로 저장하지 않음
+        """
+        template = name_pattern(user_name).sub(USER_NAME_SLOT, answer) if user_name else answer
+        if not answer.strip() or (user_name and user_name in template.replace(USER_NAME_SLOT, "")):
+            self.counters["skipped"] += 1
+            return
+        vector = embedding_service.encode([question])[0]
+        now = time.time()
+        with self._lock:
+            partition = self._partitions.setdefault(key, {"vectors": np.empty((0, vector.shape[0]), dtype=np.float32), "entries": []})
+            self._partitions.move_to_end(key)
+            # 만료된 항목은 저장할 때 정리
+            keep = [i for i, entry in enumerate(partition["entries"]) if not self._expired(entry, now)]
+            self._size -= len(partition["entries"]) - len(keep)
+            partition["vectors"] = np.vstack([partition["vectors"][keep], vector[None, :]])
+            partition["entries"] = [partition["entries"][i] for i in keep] + [(template, now, price_store.version)]
+            self._size += 1
+            self.counters["stored"] += 1
+
+            # 한 문맥이 전체 크기를 넘지 않도록 가장 오래된 항목부터 제거
+            overflow = len(partition["entries"]) - self.max_entries
+            if overflow > 0:
+                partition["vectors"] = partition["vectors"][overflow:]
+                partition["entries"] = partition["entries"][overflow:]
+                self._size -= overflow
+
+            # 전체 크기를 넘으면 가장 오래 쓰지 않은 문맥부터 제거
+            while self._size > self.max_entries and len(self._partitions) > 1:
+                _, evicted = self._partitions.popitem(last=False)
+                self._size -= len(evicted["entries"])
+
+    def bypass(self):
+        self.counters["bypassed"] += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "enabled": CHAT_CACHE_ENABLED,
+                "entries": self._size,
+                "partitions": len(self._partitions),
+                "hit_rate": self.counters["hits"] / lookups if lookups else 0.0,
+                **self.counters,
+            }
+
+
+# 프로세스 공용 응답 캐시
+response_cache = ResponseCache()
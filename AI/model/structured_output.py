@@ -0,0 +1,60 @@
+"""
+포트폴리오 분석 구조화 출력 (JSON schema)
+response_format을 지원하는 모델에서만 사용하고, 지원하지 않는 모델(Clova)은 기존 마크다운 응답 유지
+"""
+
+import os
+
+# response_format(json_schema)을 지원하지 않는 model_type 목록 (쉼표 구분)
+# BE(config/notification_config.py)와 같은 기본값/환경 변수를 사용해야 BE의 파싱 방식과 응답 형식이 일치함
+STRUCTURED_OUTPUT_UNSUPPORTED = {
+    model.strip() for model in os.getenv("STRUCTURED_OUTPUT_UNSUPPORTED", "clova-x,HCX-005").split(",") if model.strip()
+}
+
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "etfs": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "symbol": {"type": "string", "description": "ETF 심볼 (예: SPY)"},
+                    "name": {"type": "string", "description": "ETF 이름 (예: 미국 S&P500)"},
+                    "action": {
+                        "type": "string",
+                        "enum": ["maintain", "increase", "decrease"],
+                        "description": "권고 행동 (비중 유지 / 증가 / 감소)"
+                    },
+                    "delta_pct": {"type": "number", "description": "비중 조정 비율(%). maintain이면 0"},
+                    "reason": {"type": "string", "description": "권고 이유"},
+                },
+                "required": ["symbol", "name", "action", "delta_pct", "reason"],
+                "additionalProperties": False,
+            },
+        },
+        "summary": {"type": "string", "description": "종합 의견"},
+    },
+    "required": ["etfs", "summary"],
+    "additionalProperties": False,
+}
+
+ANALYSIS_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "portfolio_analysis",
+        "strict": True,
+        "schema": ANALYSIS_SCHEMA,
+    },
+}
+
+
+def supports_structured_output(model_type: str) -> bool:
+    return model_type not in STRUCTURED_OUTPUT_UNSUPPORTED
+
+
+def analysis_response_format(model_type: str, structured: bool):
+    """구조화 출력을 요청했고 모델이 지원하면 response_format, 아니면 None"""
+    if structured and supports_structured_output(model_type):
+        return ANALYSIS_RESPONSE_FORMAT
+    return None
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from function_calling import backtest
+from function_calling.backtest import evaluate_batch, backtest_dca, backtest_dca_batch
+
+EMPTY_DATES = np.empty(0, dtype="datetime64[D]")
+
+
+def synthetic_prices():
+    """두 심볼의 1년치 거래일 종가 (두 번째 심볼은 중간에 상장)"""
+    dates = np.arange(np.datetime64("2023-01-02"), np.datetime64("2024-01-01"))
+    dates = dates[np.is_busday(dates)]
+    steps = np.arange(len(dates))
+    prices = np.vstack([100 * 1.0005 ** steps, 50 + 5 * np.sin(steps / 20)])
+    prices[1, :60] = np.nan
+    return dates, prices
+
+
+def test_evaluate_batch_without_schedules():
+    result = evaluate_batch(*synthetic_prices(), [], [], [], [], user_count=2)
+    assert result["invested"].tolist() == [0.0, 0.0]
+    assert result["value"].tolist() == [0.0, 0.0]
+    assert np.isnan(result["irr"]).all()
+
+
+def test_evaluate_batch_without_prices():
+    result = evaluate_batch(EMPTY_DATES, np.empty((1, 0)), [0], [0], [0], [100.0], user_count=1)
+    assert result["invested"].tolist() == [0.0]
+    assert np.isnan(result["irr"]).all()
+
+
+@pytest.mark.parametrize("users", [
+    [],
+    [{"user_id": 1, "schedules": []}],
+])
+def test_backtest_batch_without_schedules(users):
+    result = backtest_dca_batch(users, start="2023-01-01", end="2024-01-01")
+    assert [user["invested"] for user in result["users"]] == [0.0] * len(users)
+
+
+def test_backtest_batch_without_prices(monkeypatch):
+    monkeypatch.setattr(backtest, "load_prices", lambda symbols, start, end: (EMPTY_DATES, np.empty((len(symbols), 0))))
+    users = [{"user_id": 7, "schedules": [{"symbol": "SPY", "cycle": "monthly", "day": 1, "amount": 100}]}]
+    result = backtest_dca_batch(users, start="2023-01-01", end="2024-01-01")
+    assert result["users"] == [{"user_id": 7, "invested": 0.0, "value": 0.0, "irr": None}]
+
+
+def test_evaluate_batch_matches_single_user(monkeypatch):
+    dates, prices = synthetic_prices()
+    symbols = ["AAA", "BBB"]
+    monkeypatch.setattr(backtest, "load_prices", lambda s, start, end: (dates, prices[[symbols.index(x) for x in s]]))
+    schedules = [
+        {"symbol": "AAA", "cycle": "weekly", "day": 2, "amount": 50},
+        {"symbol": "BBB", "cycle": "monthly", "day": 15, "amount": 200},
+    ]
+
+    single = backtest_dca(schedules, start="2023-01-01", end="2024-01-01")["total"]
+    batch = backtest_dca_batch([{"user_id": 1, "schedules": schedules}], start="2023-01-01", end="2024-01-01")["users"][0]
+
+    assert batch["invested"] == pytest.approx(single["invested"])
+    assert batch["value"] == pytest.approx(single["value"])
+    assert batch["irr"] == pytest.approx(single["irr"], abs=1e-2)
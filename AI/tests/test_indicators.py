@@ -0,0 +1,114 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from function_calling.indicators import compute_indicators, RSI_WINDOW
+
+
+def make_panel(**columns) -> pd.DataFrame:
+    """거래일 인덱스의 종가 패널 (열: 심볼)"""
+    length = max(len(values) for values in columns.values())
+    index = pd.bdate_range("2023-01-02", periods=length)
+    return pd.DataFrame({
+        symbol: [np.nan] * (length - len(values)) + list(values) for symbol, values in columns.items()
+    }, index=index)
+
+
+def wilder_rsi(prices: list, window: int = RSI_WINDOW) -> float:
+    """첫 변화량에서 시작하는 지수평활(alpha = 1/window) RSI를 직접 계산"""
+    deltas = [b - a for a, b in zip(prices, prices[1:])]
+    avg_gain = avg_loss = None
+    for delta in deltas:
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        if avg_gain is None:
+            avg_gain, avg_loss = gain, loss
+        else:
+            avg_gain += (gain - avg_gain) / window
+            avg_loss += (loss - avg_loss) / window
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def test_linear_series():
+    """100, 101, ..., 359: 이동평균/모멘텀은 산술로 바로 계산되고 하락이 없어 RSI 100, 낙폭 0"""
+    frame = compute_indicators(make_panel(LIN=[100.0 + t for t in range(260)]))
+    row = frame.loc["LIN"]
+
+    assert row["close"] == 359
+    assert row["sma_20"] == pytest.approx(349.5)  # 340..359 평균
+    assert row["sma_50"] == pytest.approx(334.5)  # 310..359 평균
+    assert row["sma_200"] == pytest.approx(259.5)  # 160..359 평균
+    assert row["vs_sma_20"] == pytest.approx(359 / 349.5 - 1)
+    assert row["ret_1m"] == pytest.approx(359 / 338 - 1)
+    assert row["ret_3m"] == pytest.approx(359 / 296 - 1)
+    assert row["ret_6m"] == pytest.approx(359 / 233 - 1)
+    assert row["ret_12m"] == pytest.approx(359 / 107 - 1)
+    assert row[f"rsi_{RSI_WINDOW}"] == 100
+    assert row["drawdown"] == 0
+    assert row["max_drawdown_1y"] == 0
+
+
+def test_constant_growth_has_zero_volatility():
+    frame = compute_indicators(make_panel(GEO=[100 * 1.01 ** t for t in range(70)]))
+    assert frame.loc["GEO", "vol_20d"] == pytest.approx(0, abs=1e-12)
+    assert frame.loc["GEO", "vol_60d"] == pytest.approx(0, abs=1e-12)
+
+
+def test_volatility_of_alternating_returns():
+    """로그 수익률이 +r, -r로 번갈아 나오면 표본 표준편차는 r * sqrt(n / (n - 1))"""
+    r = 0.01
+    prices = [100.0]
+    for t in range(20):
+        prices.append(prices[-1] * math.exp(r if t % 2 == 0 else -r))
+
+    frame = compute_indicators(make_panel(ALT=prices))
+
+    expected = r * math.sqrt(20 / 19) * math.sqrt(252)
+    assert frame.loc["ALT", "vol_20d"] == pytest.approx(expected)
+    assert np.isnan(frame.loc["ALT", "vol_60d"])
+
+
+def test_rsi_matches_hand_computation():
+    prices = [44.34, 44.09, 44.15, 43.61, 44.33, 44.83, 45.10, 45.42,
+              45.84, 46.08, 45.89, 46.03, 45.61, 46.28, 46.28, 46.00]
+    frame = compute_indicators(make_panel(RSI=prices))
+    assert frame.loc["RSI", f"rsi_{RSI_WINDOW}"] == pytest.approx(wilder_rsi(prices))
+
+
+def test_drawdown_from_recent_peak():
+    frame = compute_indicators(make_panel(DD=[100, 110, 99, 104.5]))
+    assert frame.loc["DD", "drawdown"] == pytest.approx(104.5 / 110 - 1)
+    assert frame.loc["DD", "max_drawdown_1y"] == pytest.approx(99 / 110 - 1)
+
+
+def test_drawdown_ignores_peaks_older_than_one_year():
+    frame = compute_indicators(make_panel(OLD=[1000.0] + [100.0] * 252))
+    assert frame.loc["OLD", "drawdown"] == 0
+    assert frame.loc["OLD", "max_drawdown_1y"] == 0
+
+
+def test_series_shorter_than_windows():
+    """창보다 짧은 구간의 지표는 NaN (0이나 부분 평균으로 채우지 않음)"""
+    frame = compute_indicators(make_panel(SHORT=[100.0 + t for t in range(30)], TINY=[10.0, 11.0, 12.0]))
+
+    short = frame.loc["SHORT"]
+    assert short["sma_20"] == pytest.approx(119.5)  # 110..129 평균
+    assert short["ret_1m"] == pytest.approx(129 / 108 - 1)
+    for name in ["sma_50", "sma_200", "vs_sma_50", "ret_3m", "ret_12m", "vol_60d"]:
+        assert np.isnan(short[name]), name
+
+    tiny = frame.loc["TINY"]
+    assert tiny["close"] == 12
+    assert tiny["drawdown"] == 0
+    for name in ["sma_20", "ret_1m", f"rsi_{RSI_WINDOW}", "vol_20d"]:
+        assert np.isnan(tiny[name]), name
+
+
+def test_gaps_are_forward_filled():
+    prices = [100.0 + t for t in range(25)]
+    prices[-3] = np.nan  # 휴장/누락된 날은 직전 종가로 채움
+    frame = compute_indicators(make_panel(GAP=prices))
+
+    filled = prices[:-3] + [prices[-4]] + prices[-2:]
+    assert frame.loc["GAP", "sma_20"] == pytest.approx(np.mean(filled[-20:]))
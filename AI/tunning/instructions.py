@@ -1,43 +1,86 @@
 from datetime import datetime
+import hashlib
+import threading
 
-# 현재 날짜.
-now = datetime.now()
-today_date = f"{now.year}년 {now.month}월 {now.day}일"
 
+# 현재 날짜. (import 시점이 아니라 호출할 때마다 계산)
+def current_date():
+    now = datetime.now()
+    return f"{now.year}년 {now.month}월 {now.day}일"
 
-# assistant 페르소나 생성.
-def instructions(user_name, invest_type, interest, today_date=today_date):
-    # ETF
-    ETF = [
-        "SPY",
-        "QQQ",
-        "EWY",
-        "EWJ",
-        "MCHI",
-        "VGK"
-    ]
 
-    return f"너의 이름은 금융 Agent야. 사용자를 '{user_name} 고객님'이라고 불러야 해.\
+# 페르소나 템플릿 버전 (정적 앞부분 문구를 바꾸면 올림)
+PERSONA_VERSION = "persona-v3"
+
+# 전송 시점에 채우는 자리 표시자 (BE services/persona_service.py와 같아야 함)
+USER_NAME_SLOT = "{user_name}"
+TODAY_DATE_SLOT = "{today_date}"
+
+# ETF
+ETF = [
+    "SPY",
+    "QQQ",
+    "EWY",
+    "EWJ",
+    "MCHI",
+    "VGK"
+]
+
+# 모든 사용자에게 같은 앞부분. 제공자 측 프롬프트 프리픽스 캐시가 적중하도록 사용자별 내용/날짜보다 앞에 둠.
+PERSONA_STATIC_PREFIX = f"너의 이름은 금융 Agent야.\
     너가 해야하는 주요 업무는 사용자의 성향과 최근 뉴스 및 한국 은행에서 제공하는 해외 동향분석, 현지정보 자료를 기반으로 사용자에게 적립식 투자를 줄여야 할지 늘려야 할지를 실시간으로 알려줘야해.\
     '잠시만 기다려 주세요'대신 '조사해 드릴까요?'라고 해줘.\
-    오늘 날짜는 {today_date}야.\
     가장 중요한건 정확한 정보라는 걸 명심하고, 단계적으로 설명해줘야해.\
+    너가 주의 깊게 봐야하는 ETF는 {ETF}야."
+
+
+# 페르소나 템플릿 생성. (정적 앞부분 -> 사용자별 내용 -> 날짜 순서)
+# 이름과 날짜는 자리 표시자로 남겨두고 전송할 때 채움.
+def persona_template(invest_type, interest):
+    return f"{PERSONA_STATIC_PREFIX}\
+    사용자를 '{USER_NAME_SLOT} 고객님'이라고 불러야 해.\
     사용자의 투자 성향은 0(보수적) ~ 10(공격적)이라고 할 때, {invest_type}이야.\
     사용자가 현재 투자하고 있는 ETF는 {interest}가 있어.\
-    너가 주의 깊게 봐야하는 ETF는 {ETF}야."
+    오늘 날짜는 {TODAY_DATE_SLOT}야."
+
+
+# 템플릿에 이름과 날짜를 채우는 함수.
+def render_persona(template, user_name, today_date=None):
+    # 이름에 자리 표시자가 들어 있어도 다시 치환되지 않도록 날짜를 먼저 채움
+    return template.replace(TODAY_DATE_SLOT, today_date or current_date()).replace(USER_NAME_SLOT, user_name)
+
+
+class PersonaTemplateRegistry:
+    """(투자 성향, 관심 ETF 집합)별 페르소나 템플릿을 한 번만 만들어 재사용"""
+
+    def __init__(self):
+        self._templates = {}  # (invest_type, frozenset(interest)) -> (template_id, template)
+        self._lock = threading.Lock()
+
+    def get(self, invest_type, interest):
+        key = (invest_type, frozenset(interest))
+        with self._lock:
+            if key not in self._templates:
+                template = persona_template(invest_type, sorted(interest))
+                # 버전과 내용 기준 해시를 id로 사용 (같은 내용이면 어느 프로세스에서 만들어도 같은 id)
+                template_id = hashlib.sha1(f"{PERSONA_VERSION}\n{template}".encode("utf-8")).hexdigest()[:16]
+                self._templates[key] = (template_id, template)
+            return self._templates[key]
+
+
+# 프로세스 공용 페르소나 템플릿 레지스트리
+persona_templates = PersonaTemplateRegistry()
+
+
+# assistant 페르소나 생성.
+def instructions(user_name, invest_type, interest, today_date=None):
+    _, template = persona_templates.get(invest_type, interest)
+    return render_persona(template, user_name, today_date)
 
 # 실시간 분석 assistant 페르소나 생성.
-def analyze_instructions(user_name, invest_type, interest, invest_price, invest_infos, today_date=today_date):
+def analyze_instructions(user_name, invest_type, interest, invest_price, invest_infos, today_date=None):
     print(invest_infos)
-    # ETF
-    ETF = [
-        "SPY",
-        "QQQ",
-        "EWY",
-        "EWJ",
-        "MCHI",
-        "VGK"
-    ]
+    today_date = today_date or current_date()
 
     interest_ETF = [i[i.find("(")+1:i.find(")")]for i in interest]
     invest_price = [i for i in invest_price]
@@ -0,0 +1,52 @@
+"""
+AI 분석 응답 파서 벤치마크
+기존 정규식 파서(legacy_parse)와 단일 패스 파서(parse_analysis)의 응답당 파싱 시간을 비교하고,
+정상/변형/손상된 응답 코퍼스의 파싱 결과를 표로 출력
+(두 파서의 결과 일치와 무작위 변형(fuzz)에 대한 불변 조건은 tests/test_analysis_parser.py에서 확인)
+
+실행: BE 디렉토리에서 `python -m benchmarks.bench_parser`
+"""
+
+import random
+import time
+
+from services.analysis_parser import parse_analysis, AnalysisParseError
+from tests.test_analysis_parser import ETFS, CORPUS, legacy_parse, make_response, make_json_response
+
+
+def measure(fn, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) / (repeat * len(texts)) * 1e6
+
+
+def main():
+    print(f"{'사례':<16}{'legacy ETF':>12}{'new ETF':>10}{'요약 일치':>10}{'구조 오류':>10}  strict")
+    for name, text in CORPUS.items():
+        legacy = legacy_parse(text)
+        parsed, errors = parse_analysis(text)
+        try:
+            parse_analysis(text, strict=True)
+            strict = "통과"
+        except AnalysisParseError as e:
+            strict = f"오류 {len(e.errors)}건"
+        print(
+            f"{name:<16}{len(legacy['etfs']):>12}{len(parsed['etfs']):>10}"
+            f"{str(legacy['summary'] == parsed['summary']):>10}{len(errors):>10}  {strict}"
+        )
+
+    rng = random.Random(42)
+    texts = [make_response(ETFS[:rng.randint(1, 6)], rng) for _ in range(200)]
+    legacy_us = measure(legacy_parse, texts, 20)
+    new_us = measure(parse_analysis, texts, 20)
+    print(f"\n응답당 파싱 시간: legacy {legacy_us:.1f}µs -> single-pass {new_us:.1f}µs ({legacy_us / new_us:.2f}x)")
+
+    json_texts = [make_json_response(ETFS[:rng.randint(1, 6)], rng) for _ in range(200)]
+    json_us = measure(parse_analysis, json_texts, 20)
+    print(f"구조화 출력(JSON) 응답당 파싱 시간: {json_us:.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+채팅 SSE 중계 벤치마크
+기존 중계(줄마다 json.loads + 문자열 += + json.dumps)와 parse 모드, raw 모드(합치기 끔/켬)의
+이벤트당 CPU 시간과 메모리 할당량을 비교하고, 전달된 본문/저장 본문이 모두 같은지 확인
+
+실행: BE 디렉토리에서 `python -m benchmarks.bench_sse_relay [답변 길이(글자)]`
+"""
+
+import sys
+import json
+import time
+import random
+import asyncio
+import tracemalloc
+
+from services.sse_relay import relay_raw, relay_parsed
+
+WORDS = ["시장", "금리", "동결", "기술주", "강세", "변동성", "확대", "비중", "유지", "권고", "S&P500", "나스닥", "\"ETF\"", "10%"]
+
+
+def make_events(length: int, rng: random.Random) -> list:
+    """AI 서비스가 보내는 형식의 SSE 이벤트 목록 (토큰 1~3개 단위 delta)"""
+    events, total = [], 0
+    while total < length:
+        content = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))) + " "
+        total += len(content)
+        events.append(f"data: {json.dumps({'content': content})}\n\n".encode("ascii"))
+    events.append(b"data: [DONE]\n\n")
+    return events
+
+
+def make_reads(events: list, rng: random.Random) -> list:
+    """네트워크에서 읽히는 단위로 나눈 바이트 (이벤트 경계와 무관하게 1~4개 이벤트 분량씩)"""
+    data = b"".join(events)
+    reads, start = [], 0
+    while start < len(data):
+        size = rng.randint(1, 4) * len(events[0])
+        reads.append(data[start:start + size])
+        start += size
+    return reads
+
+
+class FakeResponse:
+    """httpx 스트리밍 응답 대역 (aiter_raw / aiter_lines)"""
+
+    def __init__(self, reads: list):
+        self.reads = reads
+
+    async def aiter_raw(self):
+        for chunk in self.reads:
+            yield chunk
+
+    async def aiter_lines(self):
+        buffer = ""
+        for chunk in self.reads:
+            buffer += chunk.decode("utf-8")
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                yield line
+        if buffer:
+            yield buffer
+
+
+async def relay_legacy(response, publish):
+    """변경 전 send_message_stream의 중계 루프 (비교 기준)"""
+    full_response = ""
+    async for line in response.aiter_lines():
+        if line.startswith('data: '):
+            data = line[6:]
+            if data == '[DONE]':
+                break
+            try:
+                parsed = json.loads(data)
+                if 'content' in parsed:
+                    full_response += parsed['content']
+                    publish(f"data: {json.dumps({'content': parsed['content']})}\n\n")
+            except json.JSONDecodeError:
+                publish(f"data: {json.dumps({'content': data})}\n\n")
+    return full_response
+
+
+def delivered_text(published: list) -> str:
+    """클라이언트가 받는 본문 (전달된 이벤트를 디코딩해서 이어 붙임)"""
+    parts = []
+    for item in published:
+        data = item[6:].strip() if isinstance(item, str) else item.decode("ascii")
+        parts.append(json.loads(data)["content"])
+    return "".join(parts)
+
+
+def run(relay, reads: list):
+    published = []
+    text = asyncio.run(relay(FakeResponse(reads), published.append))
+    return text, published
+
+
+def measure(relay, reads: list, events: int, repeat: int):
+    """이벤트당 시간과 중계 중 최대 메모리 (전달한 이벤트는 보관하지 않고 버림)"""
+    discard = lambda event: None
+    asyncio.run(relay(FakeResponse(reads), discard))  # 워밍업
+    start = time.perf_counter()
+    for _ in range(repeat):
+        asyncio.run(relay(FakeResponse(reads), discard))
+    cpu_us = (time.perf_counter() - start) / (repeat * events) * 1e6
+
+    tracemalloc.start()
+    asyncio.run(relay(FakeResponse(reads), discard))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu_us, peak
+
+
+def main():
+    length = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(7)
+    events = make_events(length, rng)
+    reads = make_reads(events, rng)
+    event_count = len(events) - 1
+
+    relays = {
+        "legacy": relay_legacy,
+        "parse": relay_parsed,
+        "raw": lambda response, publish: relay_raw(response, publish, coalesce=False),
+        "raw+coalesce": lambda response, publish: relay_raw(response, publish, coalesce=True),
+    }
+
+    # 모든 방식이 같은 본문을 전달하고 저장해야 함
+    expected, _ = run(relay_legacy, reads)
+    for name, relay in relays.items():
+        text, published = run(relay, reads)
+        assert text == expected, name
+        assert delivered_text(published) == expected, name
+
+    repeat = max(1, 200000 // max(length, 1))
+    print(f"답변 {len(expected)}글자, 이벤트 {event_count}개, 읽기 {len(reads)}회 (반복 {repeat}회)")
+    print(f"{'방식':<14}{'이벤트당 µs':>12}{'전달 이벤트':>12}{'최대 메모리':>14}")
+    baseline = None
+    for name, relay in relays.items():
+        cpu_us, peak = measure(relay, reads, event_count, repeat)
+        _, published = run(relay, reads)
+        baseline = baseline or cpu_us
+        print(f"{name:<14}{cpu_us:>12.2f}{len(published):>12}{peak / 1024:>12.1f}KB  ({baseline / cpu_us:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
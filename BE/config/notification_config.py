@@ -2,7 +2,7 @@
 알림 시스템 전역 설정
 """
 import os
-from typing import List
+from typing import List, Optional, Tuple
 
 # AI 분석 임계값 (모든 사용자 동일)
 AI_ANALYSIS_THRESHOLD = float(os.getenv("AI_ANALYSIS_THRESHOLD", "0.7"))
@@ -13,6 +13,56 @@ NOTIFICATION_TIME = int(os.getenv("NOTIFICATION_TIME", "1"))
 # 스케줄러 간격 (1시간마다 실행)
 SCHEDULER_INTERVAL = int(os.getenv("SCHEDULER_INTERVAL", "3600"))
 
+# 분석 결과 유사도 임계값 (이전 종합 의견과의 유사도가 이 값 미만이면 알림 전송)
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.95"))
+
+# 알림 판단 방식
+# - structured: ETF별 권고 행동(유지/증가/감소)을 먼저 비교하고, 판단할 수 없을 때만 종합 의견 임베딩 비교
+# - embedding: 종합 의견 임베딩 유사도만 사용 (기존 방식)
+NOTIFICATION_DIFF_MODE = os.getenv("NOTIFICATION_DIFF_MODE", "structured").lower()
+
+# 같은 증가/감소 권고에서 비율 차이가 이 값(%p) 이하이면 변화 없음으로 간주
+RECOMMENDATION_PCT_TOLERANCE = float(os.getenv("RECOMMENDATION_PCT_TOLERANCE", "5"))
+
+# AI 분석 응답 파싱 모드 (true면 [출력 포맷]과 다른 응답을 경고로 남기고 lenient 모드로 다시 파싱)
+ANALYSIS_PARSER_STRICT = os.getenv("ANALYSIS_PARSER_STRICT", "false").lower() == "true"
+
+# 구조화 출력(JSON schema) 분석 사용 여부 (opt-in, response_format을 지원하는 모델만 적용)
+STRUCTURED_ANALYSIS = os.getenv("STRUCTURED_ANALYSIS", "false").lower() == "true"
+
+# response_format(json_schema)을 지원하지 않는 model_type (마크다운 응답 + 파서 사용)
+# - AI 서비스(AI/model/structured_output.py)와 같은 기본값/환경 변수를 사용해야 두 서비스의 응답 형식 판단이 일치함
+STRUCTURED_OUTPUT_UNSUPPORTED = [
+    model.strip() for model in os.getenv("STRUCTURED_OUTPUT_UNSUPPORTED", "clova-x,HCX-005").split(",") if model.strip()
+]
+
+# 포트폴리오 분석 공유 여부 (true면 (정렬된 심볼, 위험 성향, 날짜)가 같은 사용자는 실행마다 분석 하나를 공유)
+# - 공유 분석은 서비스 키가 설정되어 있으면 서비스 키로, 없으면 API 키가 같은 사용자끼리만 공유해 그 키로 요청
+#   (서비스 키가 없으면 API 키가 사용자마다 달라 대부분 공유되지 않으므로 ANALYSIS_SHARED_API_KEY 설정 권장)
+# - 같은 키의 사용자가 한 명뿐이면 공유하지 않고 기존처럼 사용자별 통합 분석을 요청
+# - 공유 결과는 사용자 이름/금액/주기를 종합 의견에 채워 넣어 개인화 (LLM 호출 없음)
+# - ANALYSIS_LLM_PERSONALIZATION=true면 대신 사용자 본인 키로 한 번 더 요청해 다시 작성 (사용자마다 호출이 늘어남)
+ANALYSIS_DEDUP = os.getenv("ANALYSIS_DEDUP", "false").lower() == "true"
+ANALYSIS_SHARED_API_KEY = os.getenv("ANALYSIS_SHARED_API_KEY", "")  # 공유 분석용 서비스 API 키
+ANALYSIS_SHARED_MODEL_TYPE = os.getenv("ANALYSIS_SHARED_MODEL_TYPE", "clova-x")  # 서비스 키로 요청할 모델
+ANALYSIS_LLM_PERSONALIZATION = os.getenv("ANALYSIS_LLM_PERSONALIZATION", "false").lower() == "true"
+
+# 스케줄러 실행 방식
+# - local: 프로세스마다 전체 사용자를 처리 (단일 인스턴스용, 기존 방식)
+# - distributed: 사용자를 user_id % SCHEDULER_SHARDS 샤드로 나누고, 인스턴스들이 DB 임대(lease)로 샤드를 나눠 처리
+SCHEDULER_MODE = os.getenv("SCHEDULER_MODE", "local").lower()
+SCHEDULER_SHARDS = int(os.getenv("SCHEDULER_SHARDS", "8"))  # 동시에 처리할 수 있는 최대 인스턴스 수
+SCHEDULER_LEASE_TTL = int(os.getenv("SCHEDULER_LEASE_TTL", "300"))  # 샤드 임대 시간(초), 처리 중에는 주기적으로 연장
+SCHEDULER_SWEEP_INTERVAL = int(os.getenv("SCHEDULER_SWEEP_INTERVAL", "300"))  # 중단된 샤드를 찾아 이어받는 주기(초)
+
+# 스케줄러 실행 위치
+# - true: API 서버(uvicorn) 프로세스에서 스케줄러도 실행 (기존 방식)
+# - false: API 서버에서는 실행하지 않음 (별도 워커 `python -m services.worker`로 실행)
+ENABLE_IN_PROCESS_SCHEDULER = os.getenv("ENABLE_IN_PROCESS_SCHEDULER", "true").lower() == "true"
+SCHEDULER_WORKER_THREADS = int(os.getenv("SCHEDULER_WORKER_THREADS", "4"))  # 스케줄러의 블로킹/CPU 작업(DB 조회, 알림 판단) 스레드 수
+NOTIFICATION_SEND_WORKERS = int(os.getenv("NOTIFICATION_SEND_WORKERS", "4"))  # 동시에 처리하는 알림 전송(이메일 렌더링/SendGrid 호출/저장) 수
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))  # 워커 실행 지표 HTTP 포트 (0이면 사용 안 함)
+
 # 알림 타입 정의
 NOTIFICATION_TYPES = {
     "INVESTMENT_REMINDER": "investment_reminder",
@@ -64,6 +114,40 @@ def get_ai_analysis_threshold() -> float:
     """AI 분석 임계값 반환"""
     return AI_ANALYSIS_THRESHOLD
 
+def uses_structured_analysis(model_type: str) -> bool:
+    """해당 모델로 구조화 출력 분석을 요청할지 여부"""
+    return STRUCTURED_ANALYSIS and model_type not in STRUCTURED_OUTPUT_UNSUPPORTED
+
+def uses_analysis_dedup() -> bool:
+    """동일 포트폴리오 분석 공유 여부 반환"""
+    return ANALYSIS_DEDUP
+
+def uses_llm_personalization() -> bool:
+    """공유 분석 결과를 LLM으로 다시 작성할지 여부 반환 (기본은 템플릿 개인화)"""
+    return ANALYSIS_LLM_PERSONALIZATION
+
+def get_shared_analysis_credentials() -> Optional[Tuple[str, str]]:
+    """공유 분석용 서비스 (API 키, 모델) 반환 (설정되지 않았으면 None)"""
+    if not ANALYSIS_SHARED_API_KEY:
+        return None
+    return ANALYSIS_SHARED_API_KEY, ANALYSIS_SHARED_MODEL_TYPE
+
+def uses_distributed_scheduler() -> bool:
+    """샤드/임대 기반 분산 스케줄링 사용 여부 반환"""
+    return SCHEDULER_MODE == "distributed"
+
+def get_scheduler_shards() -> int:
+    """분산 스케줄링 샤드 수 반환"""
+    return max(SCHEDULER_SHARDS, 1)
+
+def uses_in_process_scheduler() -> bool:
+    """API 서버 프로세스에서 스케줄러를 실행할지 여부 반환"""
+    return ENABLE_IN_PROCESS_SCHEDULER
+
+def get_worker_metrics_port() -> int:
+    """워커 실행 지표 HTTP 포트 반환 (0이면 사용 안 함)"""
+    return max(WORKER_METRICS_PORT, 0)
+
 def get_notification_time() -> int:
     """알림 시간 반환 (투자일 몇 시간 전)"""
     return NOTIFICATION_TIME
@@ -0,0 +1,46 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from models.analysis import AnalysisEmbedding
+from typing import List, Dict
+import json
+
+def get_analysis_embeddings_by_setting_ids(db: Session, setting_ids: List[int]) -> Dict[int, AnalysisEmbedding]:
+    """여러 투자 설정의 분석 임베딩을 한 번의 쿼리로 조회 (setting_id -> 레코드)"""
+    try:
+        if not setting_ids:
+            return {}
+        records = db.query(AnalysisEmbedding).filter(AnalysisEmbedding.setting_id.in_(setting_ids)).all()
+        return {record.setting_id: record for record in records}
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"분석 임베딩 목록 조회 실패: {str(e)}")
+
+def bulk_upsert_analysis_embeddings(db: Session, rows: List[dict]):
+    """
+    분석 임베딩 일괄 생성/교체 (커밋은 호출하는 쪽에서 처리)
+    rows: [{"setting_id", "source_hash", "parsed_analysis"(dict), "summary_embedding", "model_name"}]
+    """
+    try:
+        if not rows:
+            return
+        existing = {
+            setting_id: record_id
+            for record_id, setting_id in db.query(AnalysisEmbedding.id, AnalysisEmbedding.setting_id)
+            .filter(AnalysisEmbedding.setting_id.in_([row["setting_id"] for row in rows])).all()
+        }
+
+        updates, inserts = [], []
+        for row in rows:
+            mapping = dict(row, parsed_analysis=json.dumps(row["parsed_analysis"], ensure_ascii=False))
+            if row["setting_id"] in existing:
+                updates.append(dict(mapping, id=existing[row["setting_id"]]))
+            else:
+                inserts.append(mapping)
+
+        if updates:
+            db.bulk_update_mappings(AnalysisEmbedding, updates)
+        if inserts:
+            db.bulk_insert_mappings(AnalysisEmbedding, inserts)
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"분석 임베딩 일괄 저장 실패: {str(e)}")
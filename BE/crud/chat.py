@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from models.chat import ChatMessage
-from typing import List, Optional
+from models.chat import ChatMessage, ChatMessageEmbedding
+from typing import List, Optional, Tuple
 
 def save_message(db: Session, user_id: int, role: str, content: str) -> ChatMessage:
     """대화 메시지를 데이터베이스에 저장"""
@@ -31,13 +31,14 @@ def get_chat_history(db: Session, user_id: int, limit: int = 50) -> List[ChatMes
         raise Exception(f"대화 히스토리 조회 실패: {str(e)}")
 
 def get_chat_history_asc(db: Session, user_id: int, limit: int = 50) -> List[ChatMessage]:
-    """사용자의 대화 히스토리를 조회 (시간순) - AI 서버용"""
+    """사용자의 최근 대화 limit개를 시간순으로 조회 - AI 서버용"""
     try:
-        return db.query(ChatMessage)\
+        messages = db.query(ChatMessage)\
             .filter(ChatMessage.user_id == user_id)\
-            .order_by(ChatMessage.created_at.asc())\
+            .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())\
             .limit(limit)\
             .all()
+        return list(reversed(messages))
     except SQLAlchemyError as e:
         db.rollback()
         raise Exception(f"대화 히스토리 조회 실패: {str(e)}")
@@ -45,6 +46,9 @@ def get_chat_history_asc(db: Session, user_id: int, limit: int = 50) -> List[Cha
 def delete_chat_history(db: Session, user_id: int) -> bool:
     """사용자의 모든 대화 히스토리 삭제"""
     try:
+        db.query(ChatMessageEmbedding)\
+            .filter(ChatMessageEmbedding.user_id == user_id)\
+            .delete()
         deleted_count = db.query(ChatMessage)\
             .filter(ChatMessage.user_id == user_id)\
             .delete()
@@ -94,6 +98,9 @@ def delete_message(db: Session, message_id: int) -> bool:
         if not db_message:
             return False
         
+        db.query(ChatMessageEmbedding)\
+            .filter(ChatMessageEmbedding.message_id == message_id)\
+            .delete()
         db.delete(db_message)
         return True
     except SQLAlchemyError as e:
@@ -110,4 +117,51 @@ def get_recent_messages_by_role(db: Session, user_id: int, role: str, limit: int
             .all()
     except SQLAlchemyError as e:
         db.rollback()
-        raise Exception(f"역할별 메시지 조회 실패: {str(e)}") 
\ No newline at end of file
+        raise Exception(f"역할별 메시지 조회 실패: {str(e)}")
+
+def get_chat_messages_by_ids(db: Session, message_ids: List[int]) -> List[ChatMessage]:
+    """메시지 ID 목록으로 메시지 조회 (시간순)"""
+    try:
+        if not message_ids:
+            return []
+        return db.query(ChatMessage)\
+            .filter(ChatMessage.id.in_(message_ids))\
+            .order_by(ChatMessage.id.asc())\
+            .all()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"메시지 목록 조회 실패: {str(e)}")
+
+def get_message_embeddings(db: Session, user_id: int, model_name: str) -> List[Tuple[int, str, Optional[bytes]]]:
+    """
+    사용자의 모든 메시지와 임베딩을 시간순으로 조회 (내용은 읽지 않음)
+    반환: [(message_id, role, embedding bytes 또는 None)] - 임베딩이 없거나 모델이 다르면 None
+    """
+    try:
+        return db.query(ChatMessage.id, ChatMessage.role, ChatMessageEmbedding.embedding)\
+            .outerjoin(
+                ChatMessageEmbedding,
+                (ChatMessageEmbedding.message_id == ChatMessage.id) & (ChatMessageEmbedding.model_name == model_name)
+            )\
+            .filter(ChatMessage.user_id == user_id)\
+            .order_by(ChatMessage.id.asc())\
+            .all()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"메시지 임베딩 조회 실패: {str(e)}")
+
+def replace_message_embeddings(db: Session, rows: List[dict]):
+    """
+    메시지 임베딩 일괄 저장 (같은 메시지의 기존 임베딩은 교체, 커밋은 호출하는 쪽에서 처리)
+    rows: [{"message_id", "user_id", "model_name", "embedding"}]
+    """
+    try:
+        if not rows:
+            return
+        db.query(ChatMessageEmbedding)\
+            .filter(ChatMessageEmbedding.message_id.in_([row["message_id"] for row in rows]))\
+            .delete(synchronize_session=False)
+        db.bulk_insert_mappings(ChatMessageEmbedding, rows)
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"메시지 임베딩 저장 실패: {str(e)}")
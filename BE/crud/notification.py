@@ -90,8 +90,15 @@ def update_notification_settings(
     db.refresh(db_settings)
     return db_settings
 
-def get_users_with_notifications_enabled(db: Session) -> List[InvestmentSettings]:
-    """알림이 활성화된 사용자 목록 조회"""
-    return db.query(InvestmentSettings).filter(
+def get_users_with_notifications_enabled(
+    db: Session,
+    shard: Optional[int] = None,
+    shard_count: int = 1
+) -> List[InvestmentSettings]:
+    """알림이 활성화된 사용자 목록 조회 (shard를 주면 user_id % shard_count == shard인 사용자만)"""
+    query = db.query(InvestmentSettings).filter(
         InvestmentSettings.notification_enabled == True
-    ).all() 
\ No newline at end of file
+    )
+    if shard is not None:
+        query = query.filter(InvestmentSettings.user_id % shard_count == shard)
+    return query.all() 
\ No newline at end of file
@@ -0,0 +1,30 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from models.persona import PersonaTemplate
+from typing import Optional
+
+def get_persona_template(db: Session, template_id: str) -> Optional[PersonaTemplate]:
+    """페르소나 템플릿 조회"""
+    try:
+        return db.query(PersonaTemplate).filter(PersonaTemplate.id == template_id).first()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"페르소나 템플릿 조회 실패: {str(e)}")
+
+def get_or_create_persona_template(db: Session, template_id: str, content: str, version: str) -> PersonaTemplate:
+    """페르소나 템플릿을 id(내용 해시) 기준으로 한 번만 저장 (커밋은 호출하는 쪽에서 처리)"""
+    try:
+        template = db.query(PersonaTemplate).filter(PersonaTemplate.id == template_id).first()
+        if template:
+            return template
+        try:
+            # 다른 요청이 같은 템플릿을 동시에 저장해도 바깥 트랜잭션은 유지되도록 savepoint 사용
+            with db.begin_nested():
+                template = PersonaTemplate(id=template_id, content=content, version=version)
+                db.add(template)
+            return template
+        except IntegrityError:
+            return db.query(PersonaTemplate).filter(PersonaTemplate.id == template_id).first()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"페르소나 템플릿 저장 실패: {str(e)}")
@@ -0,0 +1,196 @@
+from sqlalchemy import or_, func
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from models.scheduler import SchedulerShardRun, NotificationSendClaim
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Tuple
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def acquire_shard_lease(db: Session, run_key: str, shard: int, owner: str, ttl_seconds: int) -> bool:
+    """
+    샤드 임대 획득 (즉시 커밋)
+    - 처음이면 진행 기록을 만들고, 이미 있으면 진행 중(running)이고 임대가 없거나 만료된 경우에만 가져옴 (미리 만든 샤드 / 중단된 샤드 이어받기)
+    - 내가 잡고 있는 임대의 연장은 renew_shard_lease 사용
+    """
+    try:
+        now = utc_now()
+        expires_at = now + timedelta(seconds=ttl_seconds)
+        updated = db.query(SchedulerShardRun)\
+            .filter(
+                SchedulerShardRun.run_key == run_key,
+                SchedulerShardRun.shard == shard,
+                SchedulerShardRun.status == "running",
+                or_(
+                    SchedulerShardRun.lease_expires_at.is_(None),
+                    SchedulerShardRun.lease_expires_at < now
+                )
+            )\
+            .update({"owner": owner, "lease_expires_at": expires_at}, synchronize_session=False)
+        if updated:
+            db.commit()
+            return True
+
+        exists = db.query(SchedulerShardRun.id)\
+            .filter(SchedulerShardRun.run_key == run_key, SchedulerShardRun.shard == shard)\
+            .first()
+        if exists:
+            db.rollback()
+            return False
+
+        try:
+            db.add(SchedulerShardRun(run_key=run_key, shard=shard, owner=owner, lease_expires_at=expires_at, status="running"))
+            db.commit()
+            return True
+        except IntegrityError:
+            # 다른 인스턴스가 같은 샤드를 먼저 만듦
+            db.rollback()
+            return False
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"샤드 임대 획득 실패: {str(e)}")
+
+def renew_shard_lease(db: Session, run_key: str, shard: int, owner: str, ttl_seconds: int) -> bool:
+    """내 임대 연장 (즉시 커밋, 다른 인스턴스가 가져갔거나 새 실행에 밀려났으면 False)"""
+    try:
+        updated = db.query(SchedulerShardRun)\
+            .filter(
+                SchedulerShardRun.run_key == run_key,
+                SchedulerShardRun.shard == shard,
+                SchedulerShardRun.owner == owner,
+                SchedulerShardRun.status == "running"
+            )\
+            .update({"lease_expires_at": utc_now() + timedelta(seconds=ttl_seconds)}, synchronize_session=False)
+        db.commit()
+        return updated > 0
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"샤드 임대 연장 실패: {str(e)}")
+
+def finish_shard_run(db: Session, run_key: str, shard: int, owner: str, users_total: int):
+    """샤드 처리 완료 기록 (즉시 커밋)"""
+    try:
+        db.query(SchedulerShardRun)\
+            .filter(
+                SchedulerShardRun.run_key == run_key,
+                SchedulerShardRun.shard == shard,
+                SchedulerShardRun.owner == owner,
+                SchedulerShardRun.status == "running"
+            )\
+            .update({
+                "status": "done",
+                "users_total": users_total,
+                "lease_expires_at": None,
+                "finished_at": utc_now()
+            }, synchronize_session=False)
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"샤드 완료 기록 실패: {str(e)}")
+
+def seed_shard_runs(db: Session, run_key: str, shard_count: int):
+    """
+    실행의 모든 샤드 진행 기록을 임대 없이 미리 생성 (즉시 커밋)
+    - 임대를 한 번도 얻지 못한 샤드도 만료된 샤드로 조회되어, 실행한 인스턴스가 중간에 죽어도 다른 인스턴스가 처리함
+    - 이전 실행의 미완료 샤드는 superseded로 바꿔 더 이상 이어받거나 연장하지 않음
+      (새 실행이 같은 사용자를 처리하므로, 이어받으면 실행 키가 달라 다시 분석/전송됨)
+    """
+    try:
+        db.query(SchedulerShardRun)\
+            .filter(SchedulerShardRun.run_key < run_key, SchedulerShardRun.status == "running")\
+            .update({"status": "superseded", "lease_expires_at": None}, synchronize_session=False)
+        existing = {shard for shard, in db.query(SchedulerShardRun.shard).filter(SchedulerShardRun.run_key == run_key).all()}
+        for shard in range(shard_count):
+            if shard in existing:
+                continue
+            try:
+                with db.begin_nested():
+                    db.add(SchedulerShardRun(run_key=run_key, shard=shard, status="running"))
+            except IntegrityError:
+                # 다른 인스턴스가 먼저 만듦
+                pass
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"샤드 진행 기록 생성 실패: {str(e)}")
+
+def get_expired_shard_runs(db: Session, run_key_prefix: str) -> List[Tuple[str, int]]:
+    """
+    run_key_prefix로 시작하는 가장 최근 실행에서 임대가 없거나 만료된 진행 중 샤드 목록 [(run_key, shard)]
+    - 이전 실행의 샤드는 이어받지 않음 (최근 실행이 같은 사용자를 이미 처리했거나 처리 중)
+    """
+    try:
+        run_key = db.query(func.max(SchedulerShardRun.run_key))\
+            .filter(SchedulerShardRun.run_key.like(f"{run_key_prefix}%"))\
+            .scalar()
+        if run_key is None:
+            return []
+        return db.query(SchedulerShardRun.run_key, SchedulerShardRun.shard)\
+            .filter(
+                SchedulerShardRun.run_key == run_key,
+                SchedulerShardRun.status == "running",
+                or_(SchedulerShardRun.lease_expires_at.is_(None), SchedulerShardRun.lease_expires_at < utc_now())
+            )\
+            .order_by(SchedulerShardRun.shard.asc())\
+            .all()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"중단된 샤드 조회 실패: {str(e)}")
+
+def get_send_claims(db: Session, run_key: str, user_ids: List[int]) -> Dict[int, NotificationSendClaim]:
+    """사용자별 알림 처리 기록 조회 (user_id -> 기록)"""
+    try:
+        if not user_ids:
+            return {}
+        claims = db.query(NotificationSendClaim)\
+            .filter(NotificationSendClaim.run_key == run_key, NotificationSendClaim.user_id.in_(user_ids))\
+            .all()
+        return {claim.user_id: claim for claim in claims}
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"알림 처리 기록 조회 실패: {str(e)}")
+
+def stage_send_decisions(db: Session, run_key: str, owner: str, rows: List[dict]):
+    """
+    알림 판단 결과를 세션에 추가 (커밋하지 않음, 호출한 쪽의 분석 결과 저장과 같은 트랜잭션으로 커밋)
+    - 이미 기록된 사용자는 그대로 두고, 다른 인스턴스와 동시에 기록하면 커밋 시 유일 제약 위반으로 전체가 롤백됨
+    rows: [{"user_id", "status"(skipped/pending), "payload"}]
+    """
+    try:
+        if not rows:
+            return
+        existing = set(get_send_claims(db, run_key, [row["user_id"] for row in rows]))
+        db.bulk_insert_mappings(NotificationSendClaim, [
+            dict(row, run_key=run_key, owner=owner) for row in rows if row["user_id"] not in existing
+        ])
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"알림 판단 기록 실패: {str(e)}")
+
+def claim_send(db: Session, run_key: str, user_id: int, owner: str) -> bool:
+    """pending -> sending 전환으로 전송 권한 획득 (즉시 커밋, 한 인스턴스만 성공)"""
+    try:
+        updated = db.query(NotificationSendClaim)\
+            .filter(
+                NotificationSendClaim.run_key == run_key,
+                NotificationSendClaim.user_id == user_id,
+                NotificationSendClaim.status == "pending"
+            )\
+            .update({"status": "sending", "owner": owner}, synchronize_session=False)
+        db.commit()
+        return updated == 1
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"알림 전송 권한 획득 실패: {str(e)}")
+
+def complete_send(db: Session, run_key: str, user_id: int, status: str):
+    """전송 결과 기록 (sent / failed, 즉시 커밋)"""
+    try:
+        db.query(NotificationSendClaim)\
+            .filter(NotificationSendClaim.run_key == run_key, NotificationSendClaim.user_id == user_id)\
+            .update({"status": status, "payload": None}, synchronize_session=False)
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"알림 전송 결과 기록 실패: {str(e)}")
@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from models.user import User
+from models.user import User, InvestmentSettings
 from utils.security import hash_password, verify_password
 from schemas.user import UserCreate
 from typing import Optional, List
@@ -126,6 +126,18 @@ def verify_user_credentials(db: Session, user_id: str, password: str) -> Optiona
         raise Exception(f"사용자 인증 실패: {str(e)}")
 
 
+def bulk_update_analysis_results(db: Session, rows: List[dict]):
+    """
+    여러 사용자의 최신 분석 결과를 한 번의 bulk UPDATE로 저장 (커밋은 호출하는 쪽에서 처리)
+    rows: [{"id": 투자 설정 ID, "last_analysis_result", "last_analysis_at"}]
+    """
+    try:
+        if rows:
+            db.bulk_update_mappings(InvestmentSettings, rows)
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"분석 결과 일괄 저장 실패: {str(e)}")
+
 def update_user_investment_settings(db: Session, user_id: int, settings_data: dict) -> Optional[User]:
     """사용자 투자 설정 정보 업데이트"""
     try:
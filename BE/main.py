@@ -15,6 +15,7 @@ from routers import user as user_router
 from routers import etf as etf_router
 from routers import chat as chat_router
 from database import engine, Base
+from config.notification_config import uses_in_process_scheduler
 from crud.etf import create_initial_etfs, get_all_etfs
 
 # 모델들을 명시적으로 import하여 순환 참조 문제 해결
@@ -81,13 +82,16 @@ async def lifespan(app: FastAPI):
         finally:
             db.close()
         
-        # 알림 스케줄러 시작
-        try:
-            from services.scheduler_service import start_notification_scheduler
-            start_notification_scheduler()
-            logger.info("✅ 알림 스케줄러 시작 완료")
-        except Exception as e:
-            logger.warning(f"⚠️ 알림 스케줄러 시작 실패: {e}")
+        # 알림 스케줄러 시작 (별도 워커에서 실행하면 API 서버에서는 시작하지 않음)
+        if uses_in_process_scheduler():
+            try:
+                from services.scheduler_service import start_notification_scheduler
+                start_notification_scheduler()
+                logger.info("✅ 알림 스케줄러 시작 완료")
+            except Exception as e:
+                logger.warning(f"⚠️ 알림 스케줄러 시작 실패: {e}")
+        else:
+            logger.info("ℹ️ 알림 스케줄러는 별도 워커(python -m services.worker)에서 실행")
             
     except Exception as e:
         logger.error(f"❌ 서버 초기화 중 오류 발생: {e}")
@@ -100,12 +104,16 @@ async def lifespan(app: FastAPI):
     logger.info("서버 종료 중...")
     
     # 알림 스케줄러 중지
-    try:
-        from services.scheduler_service import stop_notification_scheduler
-        stop_notification_scheduler()
-        logger.info("✅ 알림 스케줄러 중지 완료")
-    except Exception as e:
-        logger.warning(f"⚠️ 알림 스케줄러 중지 실패: {e}")
+    if uses_in_process_scheduler():
+        try:
+            from services.scheduler_service import stop_notification_scheduler
+            stop_notification_scheduler()
+            logger.info("✅ 알림 스케줄러 중지 완료")
+        except Exception as e:
+            logger.warning(f"⚠️ 알림 스케줄러 중지 실패: {e}")
+    
+    # AI 서비스 연결 풀 정리
+    await chat_router.close_ai_client()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -115,6 +123,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Stream-Id"],
 )
 
 # 헬스체크 엔드포인트 추가
@@ -128,6 +137,23 @@ async def health():
     """추가 헬스체크 엔드포인트"""
     return {"status": "ok"}
 
+@app.get("/metrics")
+async def metrics():
+    """
+    마지막 알림 스케줄러 실행 지표 (분석 요청 수, 공유율 등), 샤드 임대 현황과 채팅 스트림 현황
+    - 스케줄러를 별도 워커에서 실행하면 이 프로세스에는 실행 지표가 없으므로 external로 표시 (워커 지표는 WORKER_METRICS_PORT)
+    """
+    from services.scheduler_service import scheduler
+    from services.shard_coordinator import shard_coordinator
+    from services.chat_streams import chat_streams
+    in_process = uses_in_process_scheduler()
+    return {
+        "scheduler_mode": "in_process" if in_process else "external",
+        "scheduler": scheduler.last_run_metrics if in_process else None,
+        "scheduler_shards": shard_coordinator.metrics() if in_process else None,
+        "chat_streams": chat_streams.metrics()
+    }
+
 app.include_router(user_router.router)
 app.include_router(etf_router.router)
 app.include_router(chat_router.router)
@@ -2,7 +2,10 @@
 from .user import User, InvestmentSettings
 from .etf import ETF, InvestmentETFSettings
 from .notification import Notification
-from .chat import ChatMessage
+from .chat import ChatMessage, ChatMessageEmbedding
+from .analysis import AnalysisEmbedding
+from .persona import PersonaTemplate
+from .scheduler import SchedulerShardRun, NotificationSendClaim
 
 __all__ = [
     "User",
@@ -10,5 +13,10 @@ __all__ = [
     "ETF",
     "InvestmentETFSettings",
     "Notification",
-    "ChatMessage"
+    "ChatMessage",
+    "ChatMessageEmbedding",
+    "AnalysisEmbedding",
+    "PersonaTemplate",
+    "SchedulerShardRun",
+    "NotificationSendClaim"
 ] 
\ No newline at end of file
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, LargeBinary
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from database import Base
+
+class AnalysisEmbedding(Base):
+    __tablename__ = "analysis_embeddings"
+
+    id = Column(Integer, primary_key=True, index=True)
+    setting_id = Column(Integer, ForeignKey("investment_settings.id"), unique=True, nullable=False)
+    source_hash = Column(String(40), nullable=False)  # last_analysis_result 원문의 sha1 (원문이 바뀌면 무효)
+    parsed_analysis = Column(Text, nullable=False)  # 파싱된 분석 결과 (JSON)
+    model_name = Column(String, nullable=True)  # 임베딩 모델 이름
+    summary_embedding = Column(LargeBinary, nullable=True)  # 종합 의견 임베딩 (float16 bytes)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    setting = relationship("InvestmentSettings", back_populates="analysis_embedding")
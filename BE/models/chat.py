@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -13,5 +13,14 @@ class ChatMessage(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # 관계 설정
-    user = relationship("User", back_populates="chat_messages") 
-	
\ No newline at end of file
+    user = relationship("User", back_populates="chat_messages")
+
+class ChatMessageEmbedding(Base):
+    __tablename__ = "chat_message_embeddings"
+
+    id = Column(Integer, primary_key=True, index=True)
+    message_id = Column(Integer, ForeignKey("chat_messages.id"), unique=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    model_name = Column(String, nullable=True)  # 임베딩 모델 이름 (모델이 바뀌면 다시 인코딩)
+    embedding = Column(LargeBinary, nullable=False)  # 메시지 내용 임베딩 (float16 bytes)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
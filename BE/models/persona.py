@@ -0,0 +1,11 @@
+from sqlalchemy import Column, String, Text, DateTime
+from sqlalchemy.sql import func
+from database import Base
+
+class PersonaTemplate(Base):
+    __tablename__ = "persona_templates"
+
+    id = Column(String(16), primary_key=True, index=True)  # 버전 + 템플릿 내용의 sha1 앞 16자리 (AI 서비스가 발급)
+    version = Column(String(32), nullable=False)
+    content = Column(Text, nullable=False)  # 이름/날짜 자리 표시자({user_name}, {today_date})를 포함한 템플릿
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
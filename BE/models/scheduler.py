@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from database import Base
+
+class SchedulerShardRun(Base):
+    """알림 실행(run_key) 하나의 샤드별 임대(lease)와 진행 상태"""
+    __tablename__ = "scheduler_shard_runs"
+    __table_args__ = (UniqueConstraint("run_key", "shard", name="uq_scheduler_shard_run"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_key = Column(String(32), nullable=False, index=True)  # 실행 시각 단위 키 (KST 'YYYY-MM-DDTHH')
+    shard = Column(Integer, nullable=False)  # user_id % 샤드 수
+    owner = Column(String(128), nullable=True)  # 임대 중인 인스턴스 ID
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)  # 이 시각이 지나면 다른 인스턴스가 이어받음
+    status = Column(String(16), nullable=False, default="running")  # running / done / superseded (새 실행이 시작되어 이어받지 않음)
+    users_total = Column(Integer, nullable=True)
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class NotificationSendClaim(Base):
+    """실행별 사용자 알림 처리 기록 (run_key + user_id 유일 제약으로 중복 전송 방지)"""
+    __tablename__ = "notification_send_claims"
+    __table_args__ = (UniqueConstraint("run_key", "user_id", name="uq_notification_send_claim"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_key = Column(String(32), nullable=False, index=True)
+    user_id = Column(Integer, nullable=False)
+    status = Column(String(16), nullable=False)  # skipped / pending / sending / sent / failed
+    payload = Column(Text, nullable=True)  # pending일 때 전송할 파싱된 분석 결과 (JSON)
+    owner = Column(String(128), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
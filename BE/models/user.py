@@ -35,3 +35,4 @@ class InvestmentSettings(Base):
 
     user = relationship("User", back_populates="settings", uselist=False)
     etfs = relationship("InvestmentETFSettings", back_populates="setting")
+    analysis_embedding = relationship("AnalysisEmbedding", back_populates="setting", uselist=False)
@@ -1,22 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Header, WebSocket, WebSocketDisconnect, status
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-import json
 import httpx
+import asyncio
+from typing import Optional
+from types import SimpleNamespace
+from contextlib import aclosing
 import logging
 import os
-from database import get_db
+import json
+from database import get_db, SessionLocal
 from schemas.chat import ChatHistory, ChatResponse
 from crud.user import get_user_by_userId
-from crud.etf import get_investment_settings_by_user_id
+from crud.etf import get_investment_settings_by_user_id, get_etfs_by_setting_id
 from crud.chat import save_message, get_chat_history_asc, get_message_count
-from utils.auth import get_current_user
+from utils.auth import get_current_user, verify_token
+from services.persona_service import render_persona
+from services.chat_memory import chat_memory, CHAT_RECENT_MESSAGES
+from services.chat_streams import chat_streams, parse_last_event_id, StreamGone
+from services.sse_relay import relay_chat_stream
 
 # 로거 설정
 logger = logging.getLogger(__name__)
 
 # AI 서비스 URL 환경변수에서 가져오기 (기본값: localhost:8001)
 AI_SERVICE_URL = os.getenv("ETF_AI_SERVICE_URL", "http://localhost:8001")
+AI_SERVICE_KEEPALIVE = int(os.getenv("AI_SERVICE_KEEPALIVE", "50"))  # AI 서비스로 유지하는 연결 수
+CHAT_WS_AUTH_TIMEOUT = float(os.getenv("CHAT_WS_AUTH_TIMEOUT", "10"))  # WebSocket 인증 메시지 대기 시간(초)
+CHAT_WS_MAX_PENDING = int(os.getenv("CHAT_WS_MAX_PENDING", "5"))  # 연결 하나에 대기시킬 수 있는 질문 수
+
+# AI 서비스 연결 풀 (요청마다 새 연결을 맺지 않고 keep-alive 연결을 재사용)
+ai_client: Optional[httpx.AsyncClient] = None
+
+def get_ai_client() -> httpx.AsyncClient:
+    global ai_client
+    if ai_client is None or ai_client.is_closed:
+        ai_client = httpx.AsyncClient(
+            base_url=AI_SERVICE_URL,
+            timeout=60.0,
+            limits=httpx.Limits(max_keepalive_connections=AI_SERVICE_KEEPALIVE)
+        )
+    return ai_client
+
+async def close_ai_client():
+    """서버 종료 시 AI 서비스 연결 풀 정리"""
+    if ai_client is not None:
+        await ai_client.aclose()
 
 router = APIRouter()
 
@@ -45,14 +74,131 @@ def get_user_chat_history(
         logger.error(f"대화 히스토리 조회 실패: {str(e)}")
         raise HTTPException(status_code=500, detail="대화 히스토리 조회 중 오류가 발생했습니다.")
 
+def stream_response(stream, last_seq: int = -1) -> StreamingResponse:
+    """스트림 구독 SSE 응답 (클라이언트가 끊겨도 유예 시간 동안은 답변 생성을 계속해 이어받을 수 있음)"""
+    async def relay():
+        try:
+            # 응답이 중단되면 구독도 바로 닫아 구독자 수를 줄임 (마지막 구독자면 유예 후 생성 취소)
+            async with aclosing(stream.subscribe(last_seq)) as events:
+                async for event in events:
+                    yield event
+        except StreamGone:
+            chat_streams.counters["gone"] += 1
+    
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Stream-Id": stream.stream_id,
+        }
+    )
+
+def chat_context(db: Session, user, setting) -> dict:
+    """응답 캐시 문맥 (AI 서비스가 같은 날짜/보유 ETF/위험 성향 구간에서만 답변 재사용)"""
+    return {
+        "user_name": user.name,
+        "symbols": [etf.symbol for etf in get_etfs_by_setting_id(db, setting.id)],
+        "risk_level": setting.risk_level
+    }
+
+def recent_window(db: Session, user_id: int, exclude_id: Optional[int] = None) -> list:
+    """그대로 붙이는 최근 대화 (exclude_id: 방금 저장한 현재 메시지)"""
+    return [
+        {"id": msg.id, "role": msg.role, "content": msg.content}
+        for msg in get_chat_history_asc(db, user_id, limit=CHAT_RECENT_MESSAGES + 1)
+        if msg.id != exclude_id
+    ][-CHAT_RECENT_MESSAGES:]
+
+def memory_message(message) -> SimpleNamespace:
+    """스레드 풀로 넘길 메시지 값 (요청 세션에 묶인 ORM 객체를 다른 스레드에서 읽지 않도록 복사)"""
+    return SimpleNamespace(id=message.id, role=message.role, content=message.content)
+
+def add_memory(user_id: int, message) -> None:
+    """스레드 풀에서 실행: 요청 세션과 분리된 세션으로 대화 기억 인덱스에 메시지 추가"""
+    db = SessionLocal()
+    try:
+        chat_memory.add(db, user_id, [message])
+    finally:
+        db.close()
+
+def lookup_memory(user_id: int, message, exclude_ids: set) -> Optional[str]:
+    """스레드 풀에서 실행: 요청 세션과 분리된 세션으로 메시지 추가 후 관련 대화 검색"""
+    db = SessionLocal()
+    try:
+        chat_memory.add(db, user_id, [message])
+        return chat_memory.retrieve(db, user_id, message.content, exclude_ids)
+    finally:
+        db.close()
+
+async def retrieve_memory(user_id: int, user_message, recent_messages: list, current_user: str) -> Optional[str]:
+    """
+    현재 메시지를 대화 기억 인덱스에 추가하고, 최근 대화보다 오래된 내용 중 질문과 관련 있는 대화를 검색
+    (임베딩 계산은 스레드 풀에서 별도 세션으로, 실패해도 대화는 계속 / 취소돼도 스레드 작업은 자기 세션만 사용)
+    """
+    message = memory_message(user_message)
+    exclude_ids = {msg["id"] for msg in recent_messages} | {message.id}
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, lookup_memory, user_id, message, exclude_ids)
+    except Exception as e:
+        logger.warning(f"관련 대화 검색 실패 - 사용자: {current_user}, 오류: {str(e)}")
+        return None
+
+def build_ai_messages(persona: str, memory_context: Optional[str], recent_messages: list, question: str) -> list:
+    """AI 서버용 메시지: 페르소나 -> 관련 과거 대화 -> 최근 대화 -> 현재 질문"""
+    messages = [{"role": "developer", "content": persona}]
+    if memory_context:
+        messages.append({"role": "developer", "content": memory_context})
+    for msg in recent_messages:
+        messages.append({"role": msg["role"], "content": msg["content"]})
+    messages.append({"role": "user", "content": question})
+    return messages
+
+async def request_ai_reply(payload: dict, headers: dict, publish) -> str:
+    """AI 서버 채팅 스트림을 publish로 중계하고 저장용 답변 본문 반환 (취소되면 AI 서버 연결도 닫힘)"""
+    async with get_ai_client().stream("POST", "/chat/stream", json=payload, headers=headers) as response:
+        response.raise_for_status()
+        # 이벤트를 다시 직렬화하지 않고 중계 (본문은 저장용으로만 모음)
+        return await relay_chat_stream(response, publish)
+
+def ai_error_message(e: Exception, current_user: str) -> str:
+    """AI 서버 호출 오류를 로그로 남기고 사용자에게 보여줄 안내 문구 반환"""
+    if isinstance(e, httpx.TimeoutException):
+        logger.warning(f"AI 서비스 타임아웃 - 사용자: {current_user}")
+        return "AI 서비스 응답 시간이 초과되었습니다. 잠시 후 다시 시도해주세요."
+    if isinstance(e, httpx.HTTPStatusError):
+        logger.error(f"AI 서비스 HTTP 오류 - 사용자: {current_user}, 상태: {e.response.status_code}")
+        if e.response.status_code == 503:
+            # AI 서비스 과부하: Retry-After 이후 다시 시도하도록 안내
+            retry_after = e.response.headers.get("Retry-After")
+            wait_text = f"{retry_after}초" if retry_after else "잠시"
+            return f"AI 서비스 요청이 많습니다. {wait_text} 후 다시 시도해주세요."
+        return f"AI 서비스 오류 (HTTP {e.response.status_code})"
+    logger.error(f"AI 서비스 통신 오류 - 사용자: {current_user}, 오류: {str(e)}")
+    return "AI 서비스와의 통신 중 오류가 발생했습니다."
+
+async def save_reply(db: Session, user_id: int, full_response: str, current_user: str):
+    """AI 응답을 DB와 대화 기억 인덱스에 저장 (빈 응답은 저장하지 않음)"""
+    if not full_response.strip():
+        return None
+    assistant_message = save_message(db, user_id, "assistant", full_response)
+    db.commit()
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, add_memory, user_id, memory_message(assistant_message))
+    except Exception as e:
+        logger.warning(f"답변 임베딩 저장 실패 - 사용자: {current_user}, 오류: {str(e)}")
+    return assistant_message
+
 # 대화 스트리밍 전송
 @router.post("/chat/stream")
 async def send_message_stream(
     message: ChatResponse,
     current_user: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    x_cache_bypass: Optional[str] = Header(None)
 ):
-    """챗봇에 메시지 전송 (스트리밍 응답)"""
+    """챗봇에 메시지 전송 (스트리밍 응답, X-Cache-Bypass: 1이면 AI 서비스 응답 캐시를 사용하지 않음)"""
     try:
         # 1. 사용자 검증
         user = get_user_by_userId(db, current_user)
@@ -62,7 +208,7 @@ async def send_message_stream(
         user_id = getattr(user, 'id')
         
         # 2. 사용자 메시지를 DB에 저장
-        save_message(db, user_id, "user", message.content)
+        user_message = save_message(db, user_id, "user", message.content)
         db.commit()
         
         # 3. 사용자 설정 조회
@@ -70,90 +216,268 @@ async def send_message_stream(
         if not setting:
             raise HTTPException(status_code=404, detail="투자 설정을 찾을 수 없습니다.")
         
-        persona = setting.persona
-        api_key = setting.api_key
-        model_type = setting.model_type
-        
-        # 4. 최근 대화 히스토리 조회 (메모리 효율성을 위해 최근 20개만)
-        recent_messages = get_chat_history_asc(db, user_id, limit=20)
+        # 템플릿 참조면 이름과 오늘 날짜를 지금 채움 (기존 전체 문자열은 그대로)
+        persona = render_persona(db, setting.persona, user.name)
         
-        # 5. AI 서버용 메시지 형식으로 변환
-        messages = [{"role": "developer", "content": persona}]
-        for msg in recent_messages:
-            messages.append({"role": msg.role, "content": msg.content})
+        # 4. 최근 대화 + 질문과 관련 있는 과거 대화 조회
+        recent_messages = recent_window(db, user_id, exclude_id=user_message.id)
+        memory_context = await retrieve_memory(user_id, user_message, recent_messages, current_user)
         
-        # 6. 현재 메시지 추가
-        messages.append({"role": "user", "content": message.content})
+        # 5. AI 서버용 메시지 형식으로 변환 (현재 메시지 포함)
+        payload = {
+            "messages": build_ai_messages(persona, memory_context, recent_messages, message.content),
+            "api_key": setting.api_key,
+            "model_type": setting.model_type,
+            "context": chat_context(db, user, setting)
+        }
+        ai_headers = {"X-Cache-Bypass": "1"} if x_cache_bypass == "1" else {}
         
-        async def generate_stream():
+        async def generate_reply(stream):
+            # 클라이언트 연결과 별개로 끝까지 실행 (요청 세션은 응답 후 닫히므로 별도 세션 사용)
+            reply_db = SessionLocal()
             try:
-                # 7. AI 서버에 요청 전송
-                async with httpx.AsyncClient() as client:
-                    async with client.stream(
-                        "POST",
-                        f"{AI_SERVICE_URL}/chat/stream",
-                        json={
-                            "messages": messages,
-                            "api_key": api_key,
-                            "model_type": model_type
-                        },
-                        timeout=60.0
-                    ) as response:
-                        response.raise_for_status()
-                        
-                        full_response = ""
-                        async for line in response.aiter_lines():
-                            if line.startswith('data: '):
-                                data = line[6:]  # 'data: ' 제거
-                                if data == '[DONE]':
-                                    break
-                                try:
-                                    parsed = json.loads(data)
-                                    if 'content' in parsed:
-                                        full_response += parsed['content']
-                                        yield f"data: {json.dumps({'content': parsed['content']})}\n\n"
-                                except json.JSONDecodeError:
-                                    yield f"data: {json.dumps({'content': data})}\n\n"
-                        
-                        # 8. AI 응답을 DB에 저장
-                        if full_response.strip():  # 빈 응답이 아닌 경우만 저장
-                            save_message(db, user_id, "assistant", full_response)
-                            db.commit()
-                        
-                        yield "data: [DONE]\n\n"
-                                
-            except httpx.TimeoutException:
-                db.rollback()
-                error_message = "AI 서비스 응답 시간이 초과되었습니다. 잠시 후 다시 시도해주세요."
-                logger.warning(f"AI 서비스 타임아웃 - 사용자: {current_user}")
-                yield f"data: {json.dumps({'content': error_message})}\n\n"
-                yield "data: [DONE]\n\n"
-                
-            except httpx.HTTPStatusError as e:
-                db.rollback()
-                error_message = f"AI 서비스 오류 (HTTP {e.response.status_code})"
-                logger.error(f"AI 서비스 HTTP 오류 - 사용자: {current_user}, 상태: {e.response.status_code}")
-                yield f"data: {json.dumps({'content': error_message})}\n\n"
-                yield "data: [DONE]\n\n"
+                # 6. AI 서버에 요청 전송
+                full_response = await request_ai_reply(payload, ai_headers, stream.publish)
                 
+                # 7. AI 응답을 DB에 저장 (클라이언트가 끊겨도 저장)
+                await save_reply(reply_db, user_id, full_response, current_user)
             except Exception as e:
-                db.rollback()
-                error_message = "AI 서비스와의 통신 중 오류가 발생했습니다."
-                logger.error(f"AI 서비스 통신 오류 - 사용자: {current_user}, 오류: {str(e)}")
-                yield f"data: {json.dumps({'content': error_message})}\n\n"
-                yield "data: [DONE]\n\n"
+                reply_db.rollback()
+                stream.publish_content(ai_error_message(e, current_user))
+            finally:
+                reply_db.close()
         
-        return StreamingResponse(
-            generate_stream(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-            }
-        )
+        # 답변 생성은 백그라운드에서 시작하고, 이 요청은 스트림을 구독만 함 ([DONE]은 스트림 종료 시 전송)
+        stream = chat_streams.start(user_id, generate_reply)
+        return stream_response(stream)
         
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"채팅 스트림 처리 실패 - 사용자: {current_user}, 오류: {str(e)}")
-        raise HTTPException(status_code=500, detail="채팅 처리 중 오류가 발생했습니다.") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="채팅 처리 중 오류가 발생했습니다.") 
+
+# 끊긴 대화 스트림 이어받기
+@router.get("/chat/stream/{stream_id}")
+async def resume_message_stream(
+    stream_id: str,
+    current_user: str = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    last_event_id: Optional[str] = Header(None),
+    after: Optional[int] = None
+):
+    """Last-Event-ID(<stream_id>:<순번>) 또는 after(순번) 다음 이벤트부터 다시 전송"""
+    user = get_user_by_userId(db, current_user)
+    if not user:
+        raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다.")
+    
+    stream = chat_streams.get(stream_id, getattr(user, 'id'))
+    if not stream:
+        # 보관 시간이 지났으면 저장된 답변은 /chat/history에서 조회
+        raise HTTPException(status_code=404, detail="대화 스트림을 찾을 수 없습니다.")
+    
+    event_stream_id, last_seq = parse_last_event_id(last_event_id)
+    if event_stream_id != stream_id:
+        last_seq = after if after is not None else -1
+    if stream.events and last_seq + 1 < stream.events[0][0]:
+        chat_streams.counters["gone"] += 1
+        raise HTTPException(status_code=410, detail="이어받을 수 있는 범위를 벗어났습니다. 대화 히스토리를 조회해주세요.")
+    
+    chat_streams.counters["resumed"] += 1
+    return stream_response(stream, last_seq)
+
+class ChatSession:
+    """
+    채팅 WebSocket 연결 하나의 상태
+    - 인증/사용자/설정/페르소나/최근 대화는 연결 시 한 번만 조회하고 턴마다 갱신
+    - 질문(턴)은 순서대로 하나씩 처리하고, 수신 루프는 그동안에도 취소 요청을 받음
+    - 서버가 보내는 메시지는 모두 송신 큐 하나를 거쳐 순서대로 전송
+    """
+    
+    def __init__(self, websocket: WebSocket, db: Session, user, current_user: str):
+        self.websocket = websocket
+        self.db = db
+        self.user = user
+        self.user_id = getattr(user, 'id')
+        self.current_user = current_user
+        self.outgoing = asyncio.Queue()
+        self.turns = asyncio.Queue(maxsize=CHAT_WS_MAX_PENDING)
+        self.queued_ids = set()  # 대기 중인 턴 ID
+        self.cancelled_ids = set()  # 대기 중에 취소된 턴 ID
+        self.current_id = None
+        self.current_task = None
+        self.turn_count = 0
+    
+    def load(self) -> bool:
+        """설정/페르소나/응답 캐시 문맥/최근 대화 조회 (설정이 없으면 False)"""
+        setting = get_investment_settings_by_user_id(self.db, self.user_id)
+        if not setting:
+            return False
+        self.api_key = setting.api_key
+        self.model_type = setting.model_type
+        self.persona = render_persona(self.db, setting.persona, self.user.name)
+        self.context = chat_context(self.db, self.user, setting)
+        self.recent_messages = recent_window(self.db, self.user_id)
+        return True
+    
+    def send(self, event_type: str, turn_id: Optional[str] = None, **fields):
+        event = {"type": event_type, **({"id": turn_id} if turn_id is not None else {}), **fields}
+        self.outgoing.put_nowait(json.dumps(event))
+    
+    def remember(self, message):
+        """최근 대화 창에 메시지 추가"""
+        if message is None:
+            return
+        self.recent_messages.append({"id": message.id, "role": message.role, "content": message.content})
+        del self.recent_messages[:-CHAT_RECENT_MESSAGES]
+    
+    async def send_loop(self):
+        while True:
+            await self.websocket.send_text(await self.outgoing.get())
+    
+    async def turn_loop(self):
+        while True:
+            turn_id, content, cache_bypass = await self.turns.get()
+            self.queued_ids.discard(turn_id)
+            if turn_id in self.cancelled_ids:
+                self.cancelled_ids.discard(turn_id)
+                self.send("cancelled", turn_id)
+                continue
+            
+            self.current_id = turn_id
+            self.current_task = asyncio.create_task(self.run_turn(turn_id, content, cache_bypass))
+            # 턴 태스크가 취소돼도 이 루프는 계속되도록 예외 없이 완료만 기다림
+            await asyncio.wait({self.current_task})
+            if self.current_task.cancelled():
+                self.send("cancelled", turn_id)
+            self.current_id = None
+            self.current_task = None
+    
+    async def run_turn(self, turn_id: str, content: str, cache_bypass: bool):
+        # AI 서버 이벤트(JSON bytes)를 다시 파싱하지 않고 chunk 메시지의 data로 감싸서 전달
+        prefix = json.dumps({"type": "chunk", "id": turn_id})[:-1] + ', "data": '
+        publish = lambda data: self.outgoing.put_nowait(prefix + data.decode("ascii") + "}")
+        try:
+            user_message = save_message(self.db, self.user_id, "user", content)
+            self.db.commit()
+            
+            memory_context = await retrieve_memory(self.user_id, user_message, self.recent_messages, self.current_user)
+            payload = {
+                "messages": build_ai_messages(self.persona, memory_context, self.recent_messages, content),
+                "api_key": self.api_key,
+                "model_type": self.model_type,
+                "context": self.context
+            }
+            self.remember(user_message)
+            
+            full_response = await request_ai_reply(payload, {"X-Cache-Bypass": "1"} if cache_bypass else {}, publish)
+            self.remember(await save_reply(self.db, self.user_id, full_response, self.current_user))
+        except asyncio.CancelledError:
+            # 취소된 답변은 저장하지 않음 (AI 서버 연결은 request_ai_reply에서 닫힘)
+            self.db.rollback()
+            raise
+        except Exception as e:
+            self.db.rollback()
+            self.send("error", turn_id, detail=ai_error_message(e, self.current_user))
+        self.send("done", turn_id)
+    
+    def handle(self, data: dict):
+        """클라이언트 메시지 처리: message / cancel / refresh / ping"""
+        message_type = data.get("type")
+        if message_type == "message":
+            content = str(data.get("content") or "").strip()
+            self.turn_count += 1
+            turn_id = str(data.get("id") or self.turn_count)
+            if not content:
+                self.send("error", turn_id, detail="메시지 내용이 비어 있습니다.")
+                return
+            try:
+                self.turns.put_nowait((turn_id, content, bool(data.get("cache_bypass"))))
+                self.queued_ids.add(turn_id)
+                self.send("accepted", turn_id)
+            except asyncio.QueueFull:
+                self.send("error", turn_id, detail="대기 중인 질문이 너무 많습니다. 이전 답변이 끝난 뒤 다시 시도해주세요.")
+        elif message_type == "cancel":
+            # 턴 ID는 문자열로 저장하므로 숫자 ID도 문자열로 비교
+            turn_id = str(data["id"]) if data.get("id") is not None else None
+            if self.current_task is not None and turn_id in (None, self.current_id):
+                self.current_task.cancel()
+            elif turn_id in self.queued_ids:
+                # 대기 중인 턴만 기록 (모르는 ID는 연결이 끝날 때까지 쌓이지 않도록 무시)
+                self.cancelled_ids.add(turn_id)
+        elif message_type == "refresh":
+            # 투자 설정/페르소나를 바꾼 뒤 연결을 유지한 채 다시 읽음 (DB 세션을 공유하므로 답변 중에는 받지 않음)
+            if self.current_task is not None:
+                self.send("error", detail="답변이 끝난 뒤 다시 시도해주세요.")
+            elif self.load():
+                self.send("ready")
+            else:
+                self.send("error", detail="투자 설정을 찾을 수 없습니다.")
+        elif message_type == "ping":
+            self.send("pong")
+        else:
+            self.send("error", detail=f"알 수 없는 메시지 유형: {message_type}")
+    
+    async def run(self):
+        tasks = [asyncio.create_task(self.send_loop()), asyncio.create_task(self.turn_loop())]
+        self.send("ready")
+        try:
+            while True:
+                try:
+                    data = json.loads(await self.websocket.receive_text())
+                except json.JSONDecodeError:
+                    self.send("error", detail="JSON 형식이 아닙니다.")
+                    continue
+                if isinstance(data, dict):
+                    self.handle(data)
+        except WebSocketDisconnect:
+            logger.info(f"채팅 WebSocket 연결 종료 - 사용자: {self.current_user}")
+        finally:
+            # 연결이 끊기면 진행 중인 답변도 취소 (AI 서버 호출 중단)
+            if self.current_task is not None:
+                self.current_task.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, *([self.current_task] if self.current_task else []), return_exceptions=True)
+
+async def authenticate_websocket(websocket: WebSocket, token: Optional[str]) -> Optional[str]:
+    """쿼리 token 또는 첫 메시지 {"type": "auth", "token": ...}로 인증 (실패하면 4401로 닫고 None)"""
+    try:
+        if not token:
+            data = json.loads(await asyncio.wait_for(websocket.receive_text(), timeout=CHAT_WS_AUTH_TIMEOUT))
+            token = data.get("token") if isinstance(data, dict) and data.get("type") == "auth" else None
+        if token:
+            return verify_token(token)
+    except (HTTPException, asyncio.TimeoutError, json.JSONDecodeError):
+        pass
+    await websocket.close(code=4401)
+    return None
+
+# WebSocket 채팅 (연결 하나로 여러 질문/취소를 주고받음)
+@router.websocket("/chat/ws")
+async def chat_websocket(websocket: WebSocket, token: Optional[str] = None):
+    """
+    인증은 연결당 한 번, 질문마다 AI 서버 호출만 수행
+    - 클라이언트: {"type": "message", "id", "content", "cache_bypass"} / {"type": "cancel", "id"} / {"type": "refresh"} / {"type": "ping"}
+    - 서버: ready / accepted / chunk({"id", "data": {"content"}}) / done / cancelled / error / pong
+    """
+    await websocket.accept()
+    db = SessionLocal()
+    try:
+        current_user = await authenticate_websocket(websocket, token)
+        if current_user is None:
+            return
+        
+        user = get_user_by_userId(db, current_user)
+        session = ChatSession(websocket, db, user, current_user) if user else None
+        if session is None or not session.load():
+            await websocket.close(code=4404, reason="사용자 또는 투자 설정을 찾을 수 없습니다.")
+            return
+        
+        await session.run()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"채팅 WebSocket 처리 실패 - 오류: {str(e)}")
+    finally:
+        db.close()
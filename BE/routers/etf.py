@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
 from schemas.etf import (
     ETF, InvestmentSettingsUpdate, InvestmentSettingsResponse,
-    ETFInvestmentSettingUpdate, ETFInvestmentSetting, ETFInvestmentSettingsRequest, ETFInvestmentSettingsResponse
+    ETFInvestmentSettingUpdate, ETFInvestmentSetting, ETFInvestmentSettingsRequest, ETFInvestmentSettingsResponse,
+    BacktestResponse
 )
 from crud.etf import (
     get_all_etfs,
@@ -15,6 +16,8 @@ from crud.etf import (
     get_etf_by_id
 )
 from crud.user import get_user_by_userId
+from crud.persona import get_or_create_persona_template
+from services.persona_service import persona_reference
 from utils.auth import get_current_user
 import httpx
 import logging
@@ -109,7 +112,13 @@ async def upsert_my_settings(
                         }
                     )
                     response.raise_for_status()
-                    persona = response.json().get("persona")
+                    result = response.json()
+                    if result.get("template_id") and result.get("template"):
+                        # 템플릿은 한 번만 저장하고 설정에는 참조만 보관 (이름/날짜는 채팅 전송 시점에 채움)
+                        get_or_create_persona_template(db, result["template_id"], result["template"], result.get("version", ""))
+                        persona = persona_reference(result["template_id"])
+                    else:
+                        persona = result.get("persona")
                     settings.persona = persona
                     
             except httpx.TimeoutException:
@@ -321,3 +330,51 @@ def delete_my_etf_investment_setting(
         logger.error(f"ETF별 투자 설정 단건 삭제 실패: {str(e)}")
         raise HTTPException(status_code=500, detail="ETF별 투자 설정 단건 삭제에 실패했습니다.")
 
+# === 적립식 투자 백테스트 API ===
+@router.get("/users/me/backtest", response_model=BacktestResponse)
+async def get_my_backtest(
+    years: float = Query(10, gt=0, le=30, description="최근 몇 년 동안의 성과를 볼지"),
+    current_user: str = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """내 ETF별 적립식 투자 설정을 과거 시세에 적용한 성과 조회"""
+    try:
+        user = get_user_by_userId(db, current_user)
+        if not user:
+            raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다.")
+        settings = get_investment_settings_by_user_id(db, user.id)
+        if not settings:
+            raise HTTPException(status_code=404, detail="투자 설정을 찾을 수 없습니다.")
+        etf_settings = get_etf_investment_settings(db, settings.id)
+        if not etf_settings:
+            raise HTTPException(status_code=404, detail="ETF별 투자 설정을 찾을 수 없습니다.")
+
+        schedules = [
+            {
+                "symbol": etf_setting.etf.symbol,
+                "cycle": etf_setting.cycle,
+                "day": etf_setting.day,
+                "amount": etf_setting.amount
+            }
+            for etf_setting in etf_settings
+        ]
+
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            response = await client.post(
+                f"{AI_SERVICE_URL}/backtest",
+                json={"schedules": schedules, "years": years}
+            )
+            response.raise_for_status()
+            data = response.json()
+
+        if not data.get("success"):
+            raise Exception(data.get("error", "AI 서비스 백테스트 실패"))
+        return data["result"]
+    except HTTPException:
+        raise
+    except httpx.TimeoutException:
+        logger.error("적립식 백테스트 실패: AI 서비스 타임아웃")
+        raise HTTPException(status_code=504, detail="백테스트 계산 시간이 초과되었습니다.")
+    except Exception as e:
+        logger.error(f"적립식 백테스트 실패: {str(e)}")
+        raise HTTPException(status_code=500, detail="적립식 투자 백테스트에 실패했습니다.")
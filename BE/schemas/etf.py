@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Sequence
 from datetime import datetime
 from pydantic import ConfigDict
@@ -98,4 +98,41 @@ class InvestmentSettings(InvestmentSettingsBase):
 
 class InvestmentSettingsResponse(BaseModel):
     settings: Optional[InvestmentSettings] = None 
-    etfs: Optional[Sequence[ETF]] = None
\ No newline at end of file
+    etfs: Optional[Sequence[ETF]] = None
+
+# === 적립식 투자 백테스트 ===
+class BacktestETFResult(BaseModel):
+    symbol: str
+    cycle: str
+    day: int
+    amount: float
+    buy_count: int
+    invested: float
+    units: float
+    avg_cost: Optional[float] = None
+    value: float
+    return_: Optional[float] = Field(None, alias="return")
+    irr: Optional[float] = None
+
+    model_config = ConfigDict(populate_by_name=True)
+
+class BacktestTotal(BaseModel):
+    invested: float
+    value: float
+    profit: float
+    return_: Optional[float] = Field(None, alias="return")
+    irr: Optional[float] = None
+
+    model_config = ConfigDict(populate_by_name=True)
+
+class BacktestCurvePoint(BaseModel):
+    date: str
+    invested: float
+    value: float
+
+class BacktestResponse(BaseModel):
+    start: str
+    end: str
+    etfs: List[BacktestETFResult]
+    total: Optional[BacktestTotal] = None
+    curve: List[BacktestCurvePoint] = []
@@ -7,17 +7,22 @@ import httpx
 import logging
 from typing import Dict, Optional
 from datetime import datetime, timezone, timedelta
+import re
 import json
 import numpy as np
 from config.timezone_config import get_kst_now
 
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from services.embedding_service import embedding_service, text_key, vector_to_bytes, bytes_to_vector
 
-from config.notification_config import NOTIFICATION_TYPES
+from config.notification_config import NOTIFICATION_TYPES, SIMILARITY_THRESHOLD, NOTIFICATION_DIFF_MODE, ANALYSIS_PARSER_STRICT
+from services.analysis_diff import classify_change, CHANGED, UNDETERMINED
+from services.analysis_parser import parse_analysis, AnalysisParseError
+from services.prompt_builder import build_analysis_messages, build_personalization_messages, build_personal_note
+from services.persona_service import describe_persona
 from models import User, InvestmentSettings
 from crud.notification import get_notifications_by_user_id_and_type
-from crud.user import update_user_investment_settings # crud 추가
+from crud.user import bulk_update_analysis_results
+from crud.analysis import get_analysis_embeddings_by_setting_ids, bulk_upsert_analysis_embeddings
 
 logger = logging.getLogger(__name__)
 
@@ -27,77 +32,119 @@ import os
 AI_SERVICE_URL = os.getenv("ETF_AI_SERVICE_URL", "http://localhost:8001")
 MAX_RETRIES = int(os.getenv("AI_SERVICE_MAX_RETRIES", "3"))
 RETRY_DELAY = int(os.getenv("AI_SERVICE_RETRY_DELAY", "5"))
-
-# 문장 임베딩 모델 로드
-try:
-    embedding_model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
-    logger.info("✅ Sentence Transformer 모델 로드 성공")
-except Exception as e:
-    embedding_model = None
-    logger.error(f"❌ Sentence Transformer 모델 로드 실패: {e}")
+AI_RETRY_AFTER_MAX = int(os.getenv("AI_RETRY_AFTER_MAX", "120"))  # 503 Retry-After 최대 대기 시간(초)
+AI_BATCH_CHUNK_SIZE = int(os.getenv("AI_BATCH_CHUNK_SIZE", "100"))  # /analyze/batch 한 번에 보내는 요청 수
 
 def create_integrated_analysis_messages(
     user: User,
     user_setting: InvestmentSettings,
     etf_data_list: list,
+    market_snapshot: Optional[str] = None,
+    structured: bool = False,
 ) -> list:
     """
     사용자의 모든 ETF를 포함한 통합 분석 메시지 생성 (구조적/구체적 프롬프트)
+    - market_snapshot: 스케줄러 실행마다 한 번 받아온 카탈로그 ETF 기술적 지표 표
+    - structured: True면 마크다운 대신 JSON schema 응답을 요청 (AI 서비스가 response_format 지정)
     """
     try:
-        # 1. 사용자 정보
-        user_info = f"""[사용자 정보]\n- 이름: {user.name}\n- 위험 성향(0~10): {user_setting.risk_level}\n- 투자 목표/페르소나: {user_setting.persona or '미입력'}"""
-        
-        # 2. ETF 정보
-        etf_info = "[보유 ETF 목록]\n" + "\n".join([
-            f"- {etf_data['etf'].symbol}: {etf_data['etf_setting'].amount:,}만원, 주기: {etf_data['etf_setting'].cycle}, 이름: {etf_data['etf'].name}"
-            for etf_data in etf_data_list
-        ])
-        
-        # 3. 새로운 출력 포맷 및 규칙
-        output_format_and_rules = (
-            "[출력 포맷]\n"
-            "### ETF 분석 결과\n\n"
-            "#### SPY (미국 S&P500)\n"
-            "- **권고 사항**: 비중 유지 (시장 안정, 추가 매수 불필요)\n"
-            "- **이유**: ECB의 주요 정책금리 동결로 인한 글로벌 금융시장의 안정세가 유지되고 있습니다.\n\n"
-            "#### QQQ (미국 나스닥)\n"
-            "- **권고 사항**: 비중 10% 증가 권고 (기술주 강세, 성장 기대)\n"
-            "- **이유**: 기술주 중심의 나스닥 시장은 최근 긍정적인 경제 신호들로 강세를 보입니다.\n\n"
-            "### 종합 의견:\n"
-            "이번 주는 전반적으로 안정된 시장 모습을 보였습니다. 현 상황에서는 점진적이고 안정적인 접근이 필요합니다.\n"
-            "\n"
-            "[규칙]\n"
-            "1. 응답은 반드시 제공한 모든 ETF 목록을 분석한 후에, 위의 [출력 포맷]을 정확하게 따라야 합니다.\n"
-            "2. 각 ETF는 `#### <심볼> (<이름>)` 형식의 제목으로 시작해야 합니다.\n"
-            "3. 각 ETF 정보는 `- **권고 사항**: ...`과 `- **이유**: ...` 항목을 반드시 포함해야 합니다.\n"
-            "4. `### 종합 의견:` 항목을 반드시 포함해야 합니다.\n"
-            "5. 포맷 외에 불필요한 인사말, 서론, 결론 등 부연 설명을 절대 추가하지 마십시오."
-        )
+        user_info, etf_info = user_analysis_info(user, user_setting, etf_data_list)
+        return build_analysis_messages(user_info, etf_info, market_snapshot, structured)
+    except Exception as e:
+        logger.error(f"❌ 통합 분석 메시지 생성 중 오류: {e}")
+        return []
 
-        # 4. 오늘 날짜 (한국 시간 기준)
-        kst_now = get_kst_now()
-        today_date = f"[분석 기준일] {kst_now.year}년 {kst_now.month}월 {kst_now.day}일"
-        
-        # 5. 최종 developer 메시지 조립
-        developer_content = (
-            f"당신은 유능한 금융 분석가입니다. 아래 정보를 바탕으로 포트폴리오 조정에 대한 조언을 생성해야 합니다. 반드시 [규칙]을 엄격히 준수하십시오.\n\n"
-            f"{user_info}\n\n"
-            f"{etf_info}\n\n"
-            f"{today_date}\n\n"
-            f"{output_format_and_rules}"
-        )
-        
-        # 6. user 메시지(명령) 단순화
-        user_content = "오늘의 투자 포트폴리오 조정 조언을 생성해줘."
+def user_analysis_info(user: User, user_setting: InvestmentSettings, etf_data_list: list) -> tuple:
+    """분석/개인화 프롬프트용 (사용자 정보, 보유 ETF 목록) 문구"""
+    # 1. 사용자 정보
+    user_info = f"""[사용자 정보]\n- 이름: {user.name}\n- 위험 성향(0~10): {user_setting.risk_level}\n- 투자 목표/페르소나: {describe_persona(user_setting.persona)}"""
+    
+    # 2. ETF 정보
+    etf_info = "[보유 ETF 목록]\n" + "\n".join([
+        f"- {etf_data['etf'].symbol}: {etf_data['etf_setting'].amount:,}만원, 주기: {etf_data['etf_setting'].cycle}, 이름: {etf_data['etf'].name}"
+        for etf_data in etf_data_list
+    ])
+    return user_info, etf_info
 
-        messages = [
-            {"role": "system", "content": developer_content}, # 역할을 system으로 변경하여 더 강력한 지시
-            {"role": "user", "content": user_content}
-        ]
-        return messages
+def analysis_dedup_key(
+    user_setting: InvestmentSettings,
+    etf_data_list: list,
+    structured: bool = False,
+    shared_credentials: Optional[tuple] = None,
+) -> tuple:
+    """
+    공유 분석 키: (정렬된 심볼, 위험 성향, 분석 기준일, 요청 자격)
+    - 같은 키의 사용자는 공유 포트폴리오 분석 하나를 함께 사용
+    - 서비스 키가 없으면 요청 자격은 (모델, 구조화 출력 여부, API 키 해시): 같은 키를 쓰는 사용자끼리만 공유해
+      한 사용자의 키로 다른 사용자의 분석 비용을 내거나, 한 키의 오류/한도 초과로 다른 사용자가 실패하지 않게 함
+    """
+    symbols = tuple(sorted({etf_data['etf'].symbol for etf_data in etf_data_list}))
+    if shared_credentials:
+        scope = ("service",)
+    else:
+        scope = (user_setting.model_type, structured, text_key(user_setting.api_key or ""))
+    return (symbols, user_setting.risk_level, get_kst_now().date().isoformat()) + scope
+
+def create_personalization_messages(
+    user: User,
+    user_setting: InvestmentSettings,
+    etf_data_list: list,
+    shared_analysis: str,
+    structured: bool = False,
+) -> list:
+    """공유 분석 결과를 사용자 정보(이름, 페르소나, 금액, 주기)에 맞게 다시 쓰는 메시지 생성 (tool 없이 한 번 호출)"""
+    try:
+        user_info, etf_info = user_analysis_info(user, user_setting, etf_data_list)
+        return build_personalization_messages(user_info, etf_info, shared_analysis, structured)
     except Exception as e:
-        logger.error(f"❌ 통합 분석 메시지 생성 중 오류: {e}")
+        logger.error(f"❌ 개인화 메시지 생성 중 오류: {e}")
+        return []
+
+SUMMARY_HEADING = re.compile(r"^#+[ \t]*종합 의견[:：]?", re.MULTILINE)
+
+def personalize_shared_analysis(user: User, etf_data_list: list, shared_analysis: str) -> str:
+    """
+    공유 분석 결과를 LLM 호출 없이 개인화: 종합 의견 앞에 사용자 이름과 보유 구성(금액, 주기)을 채워 넣음
+    - 같은 입력이면 항상 같은 결과 (권고 방향/비율과 판단용 종합 의견 본문은 그대로)
+    - 종합 의견을 찾지 못하면 공유 분석 결과를 그대로 반환
+    """
+    note = build_personal_note(user.name, [
+        (etf_data['etf'].symbol, etf_data['etf_setting'].amount, etf_data['etf_setting'].cycle)
+        for etf_data in etf_data_list
+    ])
+    try:
+        data = json.loads(shared_analysis)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        if not data.get("summary"):
+            return shared_analysis
+        data["summary"] = f"{note}\n{data['summary']}"
+        return json.dumps(data, ensure_ascii=False)
+    
+    match = SUMMARY_HEADING.search(shared_analysis)
+    if not match:
+        return shared_analysis
+    rest = shared_analysis[match.end():].lstrip(" \t\n")
+    return f"{shared_analysis[:match.end()]}\n{note}\n{rest}"
+
+def create_shared_analysis_messages(
+    risk_level: int,
+    etf_data_list: list,
+    market_snapshot: Optional[str] = None,
+    structured: bool = False,
+) -> list:
+    """
+    여러 사용자가 공유하는 포트폴리오/위험 성향 분석 메시지 생성
+    - 이름, 페르소나, 금액, 주기 등 사용자별 정보는 넣지 않음 (개인화는 personalize_shared_analysis 또는 create_personalization_messages)
+    """
+    try:
+        user_info = f"[사용자 정보]\n- 위험 성향(0~10): {risk_level}"
+        etfs = sorted({etf_data['etf'].symbol: etf_data['etf'].name for etf_data in etf_data_list}.items())
+        etf_info = "[보유 ETF 목록]\n" + "\n".join([f"- {symbol}: 이름: {name}" for symbol, name in etfs])
+        return build_analysis_messages(user_info, etf_info, market_snapshot, structured)
+    except Exception as e:
+        logger.error(f"❌ 공유 분석 메시지 생성 중 오류: {e}")
         return []
 
 async def request_ai_analysis(
@@ -136,7 +183,9 @@ async def request_ai_analysis(
                 else:
                     logger.error(f"❌ AI 서비스 HTTP 오류: {response.status_code}")
                     if attempt < MAX_RETRIES - 1:
-                        await asyncio.sleep(RETRY_DELAY)
+                        # 과부하(503)면 AI 서비스가 알려준 Retry-After만큼 대기
+                        delay = retry_after_delay(response, RETRY_DELAY) if response.status_code == 503 else RETRY_DELAY
+                        await asyncio.sleep(delay)
                         continue
                     return None
                     
@@ -164,112 +213,364 @@ async def request_ai_analysis(
     logger.error(f"❌ AI 서비스 요청 최대 재시도 횟수 초과 ({MAX_RETRIES}회)")
     return None
 
+async def request_market_snapshot() -> Optional[str]:
+    """ETF_AI 서비스에서 카탈로그 ETF 기술적 지표 스냅샷 조회 (실패 시 None)"""
+    try:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await client.get(f"{AI_SERVICE_URL}/market/snapshot")
+
+            if response.status_code == 200:
+                result = response.json()
+                if result.get("success", False):
+                    logger.info(f"✅ 시장 지표 스냅샷 조회 성공 (처리시간: {result.get('processing_time', 0):.3f}초)")
+                    return result.get("snapshot", {}).get("text")
+                logger.warning(f"⚠️ 시장 지표 스냅샷 생성 실패: {result.get('error', 'Unknown error')}")
+            else:
+                logger.warning(f"⚠️ 시장 지표 스냅샷 HTTP 오류: {response.status_code}")
+
+    except Exception as e:
+        logger.warning(f"⚠️ 시장 지표 스냅샷 조회 중 오류: {e}")
+
+    return None
+
+def retry_after_delay(response: httpx.Response, default: float) -> float:
+    """AI 서비스 503 응답의 Retry-After(초)를 읽어 대기 시간으로 사용 (AI_RETRY_AFTER_MAX로 제한)"""
+    try:
+        delay = float(response.headers.get("Retry-After", default))
+    except (TypeError, ValueError):
+        delay = default
+    return min(max(delay, 0.0), AI_RETRY_AFTER_MAX)
+
 async def request_batch_ai_analysis(
     analysis_requests: list
 ) -> list:
-    """ETF_AI 서비스에 배치 분석 요청 - 병렬 처리 지원"""
+    """
+    ETF_AI 서비스에 배치 분석 요청 - 병렬 처리 지원
+    - AI_BATCH_CHUNK_SIZE개씩 나누어 동시에 요청하고, 과부하(503)면 Retry-After만큼 기다렸다가 재시도
+    - 반환 리스트는 analysis_requests와 같은 순서이며, 실패한 요청 자리는 빈 문자열
+    """
     
     import asyncio
     
-    try:
-        logger.info(f"🔄 배치 AI 분석 요청 시작: {len(analysis_requests)}개")
-        
-        async with httpx.AsyncClient(timeout=120.0) as client:  # 배치 처리이므로 더 긴 타임아웃
-            response = await client.post(
-                f"{AI_SERVICE_URL}/analyze/batch",
-                json={
-                    "requests": [
-                        {
-                            "messages": req["messages"],
-                            "api_key": req["api_key"],
-                            "model_type": req["model_type"]
-                        }
-                        for req in analysis_requests
-                    ]
-                }
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                if result.get("success", False):
-                    summary = result.get("summary", {})
-                    logger.info(f"✅ 배치 AI 분석 성공: {summary.get('successful_count', 0)}개 성공, {summary.get('failed_count', 0)}개 실패, 총 시간: {summary.get('total_processing_time', 0):.2f}초")
-                    
-                    # 성공한 결과들만 반환
-                    successful_results = result.get("results", {}).get("successful", [])
-                    return [res.get("answer", "") for res in successful_results]
+    logger.info(f"🔄 배치 AI 분석 요청 시작: {len(analysis_requests)}개")
+    answers = [""] * len(analysis_requests)
+    
+    async def request_chunk(client: httpx.AsyncClient, offset: int, chunk: list):
+        for attempt in range(MAX_RETRIES):
+            try:
+                response = await client.post(
+                    f"{AI_SERVICE_URL}/analyze/batch",
+                    json={
+                        "requests": [
+                            {
+                                "messages": req["messages"],
+                                "api_key": req["api_key"],
+                                "model_type": req["model_type"],
+                                "structured": req.get("structured", False),
+                                "tools": req.get("tools", True)
+                            }
+                            for req in chunk
+                        ]
+                    }
+                )
+                
+                if response.status_code == 503 and attempt < MAX_RETRIES - 1:
+                    delay = retry_after_delay(response, RETRY_DELAY)
+                    logger.warning(f"🚦 배치 AI 서비스 과부하: {delay:.0f}초 후 재시도 ({offset}번부터 {len(chunk)}개, 시도 {attempt + 1})")
+                    await asyncio.sleep(delay)
+                    continue
+                
+                if response.status_code == 200:
+                    result = response.json()
+                    if result.get("success", False):
+                        summary = result.get("summary", {})
+                        logger.info(f"✅ 배치 AI 분석 성공: {summary.get('successful_count', 0)}개 성공, {summary.get('failed_count', 0)}개 실패, 총 시간: {summary.get('total_processing_time', 0):.2f}초, 캐시 토큰 비율: {summary.get('cached_token_ratio', 0):.1%}")
+                        
+                        # 요청 순서대로 응답 배치 (실패한 요청은 빈 문자열로 자리만 유지)
+                        for position, res in enumerate(result.get("results", {}).get("successful", [])):
+                            index = res.get("index", position)
+                            if 0 <= index < len(chunk):
+                                answers[offset + index] = res.get("answer", "")
+                        for res in result.get("results", {}).get("failed", []):
+                            logger.warning(f"⚠️ 배치 AI 분석 {offset + (res.get('index') or 0)}번 요청 실패: {res.get('error')}")
+                    else:
+                        error_msg = result.get('error', 'Unknown error')
+                        logger.error(f"❌ 배치 AI 분석 실패: {error_msg}")
                 else:
-                    error_msg = result.get('error', 'Unknown error')
-                    logger.error(f"❌ 배치 AI 분석 실패: {error_msg}")
-                    return []
-            else:
-                logger.error(f"❌ 배치 AI 서비스 HTTP 오류: {response.status_code}")
-                return []
+                    logger.error(f"❌ 배치 AI 서비스 HTTP 오류: {response.status_code}")
+                return
                 
-    except httpx.TimeoutException:
-        logger.warning(f"⏰ 배치 AI 서비스 타임아웃")
-        return []
-        
-    except httpx.ConnectError:
-        logger.error(f"🔌 배치 AI 서비스 연결 오류: {AI_SERVICE_URL}")
-        return []
-        
-    except Exception as e:
-        logger.error(f"❌ 배치 AI 서비스 요청 중 예상치 못한 오류: {e}")
-        return []
+            except httpx.TimeoutException:
+                logger.warning(f"⏰ 배치 AI 서비스 타임아웃")
+                return
+                
+            except httpx.ConnectError:
+                logger.error(f"🔌 배치 AI 서비스 연결 오류: {AI_SERVICE_URL}")
+                return
+                
+            except Exception as e:
+                logger.error(f"❌ 배치 AI 서비스 요청 중 예상치 못한 오류: {e}")
+                return
+    
+    async with httpx.AsyncClient(timeout=120.0) as client:  # 배치 처리이므로 더 긴 타임아웃
+        await asyncio.gather(*[
+            request_chunk(client, offset, analysis_requests[offset:offset + AI_BATCH_CHUNK_SIZE])
+            for offset in range(0, len(analysis_requests), AI_BATCH_CHUNK_SIZE)
+        ])
+    
+    return answers
 
 def parse_structured_ai_response(analysis_text: str) -> dict:
     """
-    구조화된 AI 분석 응답 텍스트(마크다운 형식)를 파싱하여 딕셔셔너리로 변환합니다.
+    구조화된 AI 분석 응답 텍스트(마크다운 형식)를 파싱하여 딕셔너리로 변환합니다.
+    - 단일 패스 파서(lenient 모드)를 사용하고, 구조 오류는 로그로만 남김
+    """
+    try:
+        parsed_data, errors = parse_analysis(analysis_text, strict=ANALYSIS_PARSER_STRICT)
+    except AnalysisParseError as e:
+        logger.warning(f"⚠️ AI 응답 구조 오류 (strict): {e}")
+        parsed_data, errors = parse_analysis(analysis_text)
+    except Exception as e:
+        logger.error(f"❌ AI 응답 파싱 중 오류 발생: {e}")
+        # 파싱 실패 시, 전체 텍스트를 summary에 넣어 기존 로직이 어느정도 동작하도록 함
+        return {"etfs": [], "summary": analysis_text}
+
+    if errors:
+        logger.debug(f"AI 응답 구조 오류: {errors}")
+    logger.debug(f"파싱된 데이터: {parsed_data}")
+    return parsed_data
+
+def encode_summaries(parsed_list: list, indices, failed: Optional[set] = None) -> list:
+    """
+    지정한 결과들의 종합 의견을 한 번의 encode 호출로 임베딩 (종합 의견이 없거나 대상이 아니면 None)
+    - failed를 넘기면 일괄 인코딩 실패 시 한 건씩 다시 인코딩하고, 실패한 인덱스만 failed에 추가 (None으로 남김)
     """
-    import re
-    parsed_data = {"etfs": [], "summary": ""}
+    embeddings = [None] * len(parsed_list)
+    targets = [i for i in indices if parsed_list[i].get("summary")]
+    if not targets:
+        return embeddings
     try:
-        # '### 종합 의견:'을 기준으로 종합 의견 추출
-        summary_match = re.search(r'### 종합 의견:\s*(.*)', analysis_text, re.DOTALL | re.IGNORECASE)
-        if summary_match:
-            parsed_data["summary"] = summary_match.group(1).strip()
-            etf_section = analysis_text[:summary_match.start()]
+        vectors = embedding_service.encode([parsed_list[i]["summary"] for i in targets])
+        for i, vector in zip(targets, vectors):
+            embeddings[i] = vector
+    except Exception as e:
+        if failed is None:
+            raise
+        logger.warning(f"⚠️ 종합 의견 일괄 인코딩 실패, 한 건씩 다시 인코딩: {e}")
+        for i in targets:
+            try:
+                embeddings[i] = embedding_service.encode([parsed_list[i]["summary"]])[0]
+            except Exception as item_error:
+                logger.error(f"❌ 종합 의견 인코딩 실패 ({i}번): {item_error}")
+                failed.add(i)
+    return embeddings
+
+def embedding_row(setting_id: int, analysis_text: str, parsed: dict, vector: Optional[np.ndarray]) -> dict:
+    """analysis_embeddings 저장용 행"""
+    return {
+        "setting_id": setting_id,
+        "source_hash": text_key(analysis_text),
+        "parsed_analysis": parsed,
+        "summary_embedding": vector_to_bytes(vector) if vector is not None else None,
+        "model_name": embedding_service.model_name if vector is not None else None,
+    }
+
+def load_previous_analyses(db, users: list) -> list:
+    """
+    사용자들의 이전 분석 파싱 결과 조회 (한 번의 쿼리)
+    - 저장된 값이 현재 원문과 일치하면 재파싱 없이 사용
+    - 사이드 테이블에 없거나 오래된 항목만 파싱하여 저장 대상에 추가 (커밋은 호출하는 쪽에서 처리)
+    반환: [(parsed, record 또는 None), ...]
+    """
+    records = get_analysis_embeddings_by_setting_ids(db, [user.settings.id for user in users])
+
+    previous, stale_rows = [], []
+    for user in users:
+        previous_analysis = user.settings.last_analysis_result
+        record = records.get(user.settings.id)
+        if record and record.source_hash == text_key(previous_analysis):
+            previous.append((json.loads(record.parsed_analysis), record))
         else:
-            etf_section = analysis_text
+            parsed = parse_structured_ai_response(previous_analysis)
+            previous.append((parsed, None))
+            stale_rows.append(embedding_row(user.settings.id, previous_analysis, parsed, None))
 
-        # '####'로 시작하는 각 ETF 블록을 찾아서 처리
-        etf_blocks = re.split(r'(?=####\s+)', etf_section)
+    bulk_upsert_analysis_embeddings(db, stale_rows)
+    return previous
 
-        for block in etf_blocks:
-            block = block.strip()
-            if not block.startswith('####'):
-                continue
-            
-            # 심볼과 이름 추출
-            title_match = re.search(r'####\s+([A-Z0-9]+)\s*\((.*?)\)', block, re.IGNORECASE)
-            if not title_match:
-                continue
-            
-            symbol, name = title_match.groups()
+def load_previous_embeddings(db, users: list, previous: list, failed: Optional[set] = None) -> list:
+    """
+    이전 분석 종합 의견 임베딩 조회
+    - 저장된 벡터가 있으면 그대로 사용하고, 없는 항목만 모아서 한 번에 인코딩 후 저장
+    - failed를 넘기면 인코딩에 실패한 항목의 인덱스를 추가 (encode_summaries 참고)
+    """
+    vectors = [None] * len(users)
+    stale = []
+    for i, (parsed, record) in enumerate(previous):
+        if record is not None and record.summary_embedding and record.model_name == embedding_service.model_name:
+            vectors[i] = bytes_to_vector(record.summary_embedding)
+        else:
+            stale.append(i)
 
-            # 권고 사항 추출
-            recommendation_match = re.search(r'-\s*\*\*권고 사항\*\*:\s*(.*)', block, re.IGNORECASE)
-            recommendation = recommendation_match.group(1).strip() if recommendation_match else ""
+    if stale:
+        encoded = encode_summaries([parsed for parsed, _ in previous], stale, failed)
+        for i in stale:
+            vectors[i] = encoded[i]
+        bulk_upsert_analysis_embeddings(db, [
+            embedding_row(users[i].settings.id, users[i].settings.last_analysis_result, previous[i][0], vectors[i])
+            for i in stale
+        ])
+    return vectors
 
-            # 이유 추출
-            reason_match = re.search(r'-\s*\*\*이유\*\*:\s*(.*)', block, re.IGNORECASE | re.DOTALL)
-            reason = reason_match.group(1).strip() if reason_match else ""
+def decide_notifications(
+    is_first_analysis_today,
+    has_previous,
+    structural_change,
+    has_current_summary,
+    has_previous_embedding,
+    similarity
+):
+    """
+    알림 여부 판단 규칙 (단건/배치 공용, 스칼라와 NumPy 배열 모두 처리)
+    - 오늘의 첫 분석, 이전 결과 없음 -> 알림
+    - ETF별 권고 행동이 바뀜(CHANGED) -> 알림 / 그대로(UNCHANGED) -> 알림 없음
+    - 판단 보류(UNDETERMINED)면 종합 의견 비교: 비교 불가 또는 유사도가 임계값 미만일 때 알림
+    알림을 보내는 경우에만 최신 분석 결과를 저장함
+    """
+    comparable = np.logical_and(has_current_summary, has_previous_embedding)
+    embedding_change = np.logical_or(~comparable, similarity < SIMILARITY_THRESHOLD)
+    fallback_change = np.logical_and(structural_change == UNDETERMINED, embedding_change)
+    return np.logical_or.reduce([
+        is_first_analysis_today,
+        ~has_previous,
+        structural_change == CHANGED,
+        fallback_change
+    ])
 
-            parsed_data["etfs"].append({
-                "symbol": symbol.strip(),
-                "name": name.strip(),
-                "recommendation": recommendation,
-                "reason": reason
-            })
+def determine_notifications_batch(db, users: list, analysis_results: list, on_decided=None) -> list:
+    """
+    스케줄러 실행 단위의 알림 필요성 일괄 판단
+    - structured 모드에서는 ETF별 권고 행동 비교로 먼저 판단하고, 판단할 수 없는 경우만 임베딩 비교
+    - 임베딩이 필요한 종합 의견은 한 번에 인코딩, 유사도는 행렬 연산 한 번으로 계산
+    - 알림 대상의 최신 분석 상태는 bulk UPDATE 후 한 번만 커밋
+    - 비교에 필요한 임베딩을 만들지 못한 사용자만 오류로 보고 알림 전송 (단건 판단과 같은 기본값, 결과는 저장하지 않음)
+    - on_decided(db, [(user_id, should_notify, parsed_analysis)])를 주면 커밋 직전에 호출해 판단 기록을 같은 트랜잭션으로 저장
+    반환: [(should_notify, parsed_analysis), ...] (입력 순서와 동일)
+    """
+    count = len(users)
+    if count == 0:
+        return []
+
+    try:
+        logger.debug(f"🚀 알림 필요성 일괄 판단 시작: {count}명 (방식: {NOTIFICATION_DIFF_MODE})")
+
+        # 1. 현재 분석 결과 파싱
+        parsed_list = [parse_structured_ai_response(result) if result else {"etfs": [], "summary": ""} for result in analysis_results]
+
+        # 2. 사용자별 판단 조건
+        current_times = []
+        is_first_today = np.zeros(count, dtype=bool)
+        has_previous = np.zeros(count, dtype=bool)
+        for i, user in enumerate(users):
+            last_analysis_time = user.settings.last_analysis_at
+            current_time = datetime.now(last_analysis_time.tzinfo if last_analysis_time else None)
+            current_times.append(current_time)
+            is_first_today[i] = not last_analysis_time or last_analysis_time.date() < current_time.date()
+            has_previous[i] = bool(user.settings.last_analysis_result)
+        has_current_summary = np.array([bool(parsed.get("summary")) for parsed in parsed_list], dtype=bool)
+
+        # 3. 비교가 필요한 사용자만 이전 분석 조회 후 ETF별 권고 행동 비교
+        compare_idx = np.flatnonzero(~is_first_today & has_previous)
+        compare_users = [users[i] for i in compare_idx]
+        previous = load_previous_analyses(db, compare_users)
+
+        structural_change = np.full(count, UNDETERMINED, dtype=np.int8)
+        if NOTIFICATION_DIFF_MODE == "structured":
+            for i, (previous_parsed, _) in zip(compare_idx, previous):
+                structural_change[i] = classify_change(parsed_list[i], previous_parsed)
+
+        # 4. 구조 비교로 판단하지 못한 사용자만 종합 의견 임베딩 비교
+        fallback = [k for k, i in enumerate(compare_idx) if structural_change[i] == UNDETERMINED and has_current_summary[i]]
+        fallback_idx = compare_idx[fallback]
+        previous_embeddings = [None] * count
+        previous_failed = set()
+        for i, vector in zip(fallback_idx, load_previous_embeddings(
+            db, [compare_users[k] for k in fallback], [previous[k] for k in fallback], previous_failed
+        )):
+            previous_embeddings[i] = vector
+        has_previous_embedding = np.array([vector is not None for vector in previous_embeddings], dtype=bool)
+
+        # 임베딩 방식에서는 저장용으로 모든 종합 의견을, 구조 비교 방식에서는 비교에 필요한 것만 인코딩
+        encode_idx = range(count) if NOTIFICATION_DIFF_MODE == "embedding" else fallback_idx[has_previous_embedding[fallback_idx]]
+        failed = {fallback_idx[k] for k in previous_failed}
+        current_embeddings = encode_summaries(parsed_list, encode_idx, failed)
+
+        # 임베딩 비교가 필요한데 인코딩에 실패한 사용자 (저장용 인코딩 실패는 임베딩 없이 저장)
+        error = np.zeros(count, dtype=bool)
+        error[[i for i in fallback_idx if i in failed]] = True
+
+        # 5. 유사도 계산 (정규화된 벡터의 행별 내적)
+        similarity = np.full(count, np.nan, dtype=np.float32)
+        pair_idx = np.flatnonzero([
+            current is not None and previous_vector is not None
+            for current, previous_vector in zip(current_embeddings, previous_embeddings)
+        ])
+        if len(pair_idx):
+            current_matrix = np.stack([current_embeddings[i] for i in pair_idx])
+            previous_matrix = np.stack([previous_embeddings[i] for i in pair_idx])
+            similarity[pair_idx] = np.einsum("ij,ij->i", current_matrix, previous_matrix)
+
+        should_notify = decide_notifications(
+            is_first_today, has_previous, structural_change, has_current_summary, has_previous_embedding, similarity
+        ) | error
+
+        # 6. 알림 대상만 최신 분석 결과로 일괄 저장 (임베딩은 없으면 다음 비교 때 계산, 오류 사용자는 저장하지 않음)
+        notify_idx = np.flatnonzero(should_notify & ~error)
+        bulk_update_analysis_results(db, [
+            {
+                "id": users[i].settings.id,
+                "last_analysis_result": analysis_results[i],
+                "last_analysis_at": current_times[i]
+            }
+            for i in notify_idx
+        ])
+        bulk_upsert_analysis_embeddings(db, [
+            embedding_row(users[i].settings.id, analysis_results[i], parsed_list[i], current_embeddings[i])
+            for i in notify_idx
+        ])
+        decisions = [
+            (True, {"etfs": [], "summary": analysis_results[i]}) if error[i] else (bool(should_notify[i]), parsed_list[i])
+            for i in range(count)
+        ]
+        if on_decided is not None:
+            on_decided(db, [(user.id, notify, parsed) for user, (notify, parsed) in zip(users, decisions)])
+        db.commit()
+
+        for i, user in enumerate(users):
+            logger.debug(
+                f"📊 사용자 {user.id}: 첫 분석={is_first_today[i]}, 구조 비교={structural_change[i]}, "
+                f"유사도={similarity[i]:.4f}, 알림={'전송' if should_notify[i] else '생략'}"
+            )
+        logger.info(
+            f"✅ 알림 필요성 일괄 판단 완료: {len(notify_idx)}/{count}명 알림 전송 "
+            f"(구조 비교 {len(compare_idx) - len(fallback_idx)}명, 임베딩 비교 {len(pair_idx)}명)"
+        )
+
+        return decisions
 
     except Exception as e:
-        logger.error(f"❌ AI 응답 파싱 중 오류 발생: {e}")
-        # 파싱 실패 시, 전체 텍스트를 summary에 넣어 기존 로직이 어느정도 동작하도록 함
-        return {"etfs": [], "summary": analysis_text}
-    
-    logger.debug(f"파싱된 데이터: {parsed_data}")
-    return parsed_data
+        db.rollback()
+        logger.error(f"❌ 알림 필요성 판단 중 오류: {e}", exc_info=True)
+        # 오류 발생 시에는 일단 알림을 보내는 것을 기본으로 함 (분석 결과는 저장되지 않았으므로 판단 기록만 저장)
+        decisions = [(True, {"etfs": [], "summary": result}) for result in analysis_results]
+        if on_decided is not None:
+            try:
+                on_decided(db, [(user.id, notify, parsed) for user, (notify, parsed) in zip(users, decisions)])
+                db.commit()
+            except Exception as record_error:
+                db.rollback()
+                logger.error(f"❌ 알림 판단 기록 실패: {record_error}")
+        return decisions
 
 def determine_notification_need(
     db,
@@ -277,84 +578,8 @@ def determine_notification_need(
     analysis_result: str
 ) -> tuple[bool, dict]:
     """
-    이전 분석 결과와의 코사인 유사도를 기반으로 알림 필요성 판단
+    이전 분석 결과와의 ETF별 권고 행동 / 종합 의견 유사도를 기반으로 알림 필요성 판단 (단건)
     - 오늘의 첫 분석은 항상 알림 전송
+    - 일괄 판단과 같은 경로를 사용하므로 결과가 항상 동일함
     """
-    if not embedding_model:
-        logger.error(" embedding 모델이 로드되지 않아 알림 판단을 스킵합니다.")
-        return True, {"etfs": [], "summary": analysis_result}
-
-    try:
-        logger.debug(f"🚀 코사인 유사도 기반 알림 필요성 판단 시작 (사용자: {user.id})")
-        
-        # 1. 현재 분석 결과 파싱
-        parsed_analysis = parse_structured_ai_response(analysis_result)
-        
-        # 2. 이전 분석 정보 가져오기
-        previous_analysis = user.settings.last_analysis_result
-        last_analysis_time = user.settings.last_analysis_at
-
-        # 3. 새로운 분석 결과를 DB에 저장할 준비
-        current_time = datetime.now(last_analysis_time.tzinfo if last_analysis_time else None)
-        new_setting_data = {
-            "last_analysis_result": analysis_result,
-            "last_analysis_at": current_time
-        }
-
-        # 4. 오늘의 첫 분석인지 확인
-        is_first_analysis_today = not last_analysis_time or last_analysis_time.date() < current_time.date()
-
-        if is_first_analysis_today:
-            logger.info(f"✅ 오늘의 첫 분석입니다. 알림을 전송하고 결과를 저장합니다.")
-            update_user_investment_settings(db, user.id, new_setting_data)
-            return True, parsed_analysis
-
-        # 5. 이전 분석 결과가 없는 경우 (오늘 첫 분석이 아닌데 이전 결과가 없는 경우)
-        if not previous_analysis:
-            logger.warning(f"⚠️ 이전 분석 결과가 없습니다. 알림을 전송하고 결과를 저장합니다.")
-            update_user_investment_settings(db, user.id, new_setting_data)
-            return True, parsed_analysis
-
-        # 6. 이전과 현재 분석의 "종합 의견"을 추출하여 유사도 계산
-        current_summary = parsed_analysis.get("summary", "")
-        previous_parsed = parse_structured_ai_response(previous_analysis)
-        previous_summary = previous_parsed.get("summary", "")
-
-        # 종합 의견이 없는 경우, 비교가 불가능하므로 변화로 간주
-        if not current_summary or not previous_summary:
-            logger.warning("현재 또는 이전 분석에서 '종합 의견'을 추출할 수 없어, 중요한 변경으로 간주하고 알림을 보냅니다.")
-            update_user_investment_settings(db, user.id, new_setting_data)
-            return True, parsed_analysis
-
-        logger.debug("--- 현재 종합 의견 ---")
-        logger.debug(current_summary)
-        logger.debug("--- 이전 종합 의견 ---")
-        logger.debug(previous_summary)
-        logger.debug("--------------------")
-        
-        embedding_current = embedding_model.encode([current_summary])
-        embedding_previous = embedding_model.encode([previous_summary])
-        
-        similarity = cosine_similarity(embedding_current, embedding_previous)[0][0]
-        
-        logger.debug(f"📊 이전 결과와의 코사인 유사도: {similarity:.4f}")
-
-        # 7. 유사도 임계값을 기준으로 알림 여부 결정
-        SIMILARITY_THRESHOLD = 0.95
-        
-        should_notify = False
-        if similarity < SIMILARITY_THRESHOLD:
-            logger.info(f"✅ 유사도({similarity:.4f})가 임계값({SIMILARITY_THRESHOLD}) 미만. 중요한 변화로 판단하여 알림을 전송하고 결과를 저장합니다.")
-            should_notify = True
-            # 알림을 보낼 때만 최신 분석 결과로 업데이트
-            update_user_investment_settings(db, user.id, new_setting_data)
-        else:
-            logger.info(f"❌ 유사도({similarity:.4f})가 임계값({SIMILARITY_THRESHOLD}) 이상. 변화가 미미하여 알림을 전송하지 않습니다.")
-            # 알림을 보내지 않으므로 결과도 저장하지 않음
-
-        return should_notify, parsed_analysis
-        
-    except Exception as e:
-        logger.error(f"❌ 코사인 유사도 기반 알림 판단 중 오류: {e}", exc_info=True)
-        # 오류 발생 시에는 일단 알림을 보내는 것을 기본으로 함
-        return True, {"etfs": [], "summary": analysis_result}
+    return determine_notifications_batch(db, [user], [analysis_result])[0]
@@ -0,0 +1,154 @@
+"""
+분석 결과 구조 비교
+ETF별 권고 사항을 정규화된 행동(유지 / X% 증가 / X% 감소)으로 변환하여 이전 분석과 비교
+"""
+
+import re
+from typing import Dict, Optional, Tuple
+
+from config.notification_config import RECOMMENDATION_PCT_TOLERANCE
+
+# 정규화된 행동
+MAINTAIN = "maintain"
+INCREASE = "increase"
+DECREASE = "decrease"
+UNKNOWN = "unknown"
+
+# 비교 결과 (NumPy 배열에 담기 위해 정수로 표현)
+CHANGED = 1
+UNCHANGED = 0
+UNDETERMINED = -1
+
+# 방향 신호는 "비중 확대/축소"처럼 비중 조정 표현만 사용 (단독 "매수/매도"는 정기 매수 등과 구분할 수 없으므로 제외)
+WEIGHT = r"비중[^,;]{0,20}?"  # "비중 10% 증가", "비중을 15% 늘려", "비중 유지 후 확대"
+ACTION_PATTERNS = (
+    (DECREASE, re.compile(
+        rf"{WEIGHT}(?:축소|감소|줄이|줄여|하향|낮추|낮춰)|(?:일부|부분|분할)\s*매도|차익\s*실현|"
+        r"\b(?:decrease|reduce|underweight|trim)\b",
+        re.IGNORECASE)),
+    (INCREASE, re.compile(
+        rf"{WEIGHT}(?:확대|증가|늘리|늘려|상향|높이|높여)|추가\s*매수|"
+        r"\b(?:increase|overweight|add\s+to)\b",
+        re.IGNORECASE)),
+)
+HOLD_PATTERN = re.compile(r"유지|보유|관망|동결|보류|\b(?:hold|maintain|keep)\b", re.IGNORECASE)
+# 방향 표현 뒤에 오면 그 방향을 하지 말라는 뜻 ("매수 보류", "매도 자제", "추가 매수 불필요")
+NEGATION_PATTERN = re.compile(r"보류|자제|불필요|필요\s*없|하지\s*않|않|말\s*것|금지|지양|중단|\b(?:not|avoid)\b", re.IGNORECASE)
+# 단독 매수/매도는 방향 신호가 아니지만 부정되면 유지 신호 ("매수 보류" -> 유지)
+TRADE_PATTERN = re.compile(r"매수|매도|\b(?:buy|sell)\b", re.IGNORECASE)
+CLAUSE_SEPARATOR = re.compile(r"[,;/·]|\s+(?:및|그리고|but)\s+")
+PARENTHESIS_PATTERN = re.compile(r"[(\[]([^)\]]*)[)\]]?")
+PERCENT_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+
+
+def clause_signals(clause: str) -> set:
+    """
+    절 하나의 행동 신호
+    - 방향 표현 뒤에 부정/보류 표현이 있으면 유지 신호로 취급
+    - 단독 매수/매도는 부정될 때만 유지 신호
+    """
+    signals = set()
+    for action, pattern in ACTION_PATTERNS:
+        for match in pattern.finditer(clause):
+            signals.add(MAINTAIN if NEGATION_PATTERN.search(clause, match.end()) else action)
+    for match in TRADE_PATTERN.finditer(clause):
+        if NEGATION_PATTERN.search(clause, match.end()):
+            signals.add(MAINTAIN)
+    if HOLD_PATTERN.search(clause):
+        signals.add(MAINTAIN)
+    return signals
+
+
+def text_signals(text: str) -> set:
+    signals = set()
+    for clause in CLAUSE_SEPARATOR.split(text):
+        signals |= clause_signals(clause)
+    return signals
+
+
+def normalize_action(recommendation: str) -> Tuple[str, Optional[float]]:
+    """
+    권고 사항 문장을 (행동, 비율%)로 변환
+    - 괄호 안 부연 설명("비중 유지 (추가 매수 불필요)")은 괄호 밖에 행동 신호가 없을 때만 사용
+    - 비율은 괄호 안에 있어도 사용 ("비중 확대 고려 (10%)" -> 10%)
+    - 신호가 서로 다르거나(증가와 감소, 방향과 유지) 판단할 수 없으면 (UNKNOWN, None) -> 종합 의견 비교로 대체
+    """
+    text = (recommendation or "").strip()
+    if not text:
+        return UNKNOWN, None
+
+    head = PARENTHESIS_PATTERN.sub(" ", text)
+    signals = text_signals(head)
+    if not signals:
+        signals = text_signals(" ".join(PARENTHESIS_PATTERN.findall(text)))
+    if len(signals) != 1:
+        return UNKNOWN, None
+
+    action = signals.pop()
+    if action == MAINTAIN:
+        return MAINTAIN, None
+    percent = PERCENT_PATTERN.search(head) or PERCENT_PATTERN.search(text)
+    return action, float(percent.group(1)) if percent else None
+
+
+def etf_action(etf: dict) -> Tuple[str, Optional[float]]:
+    """구조화 출력 응답은 action/delta_pct를 그대로 사용하고, 마크다운 응답만 권고 문장을 해석"""
+    action = etf.get("action")
+    if action in (MAINTAIN, INCREASE, DECREASE):
+        return action, None if action == MAINTAIN else etf.get("delta_pct")
+    return normalize_action(etf.get("recommendation", ""))
+
+
+def etf_actions(parsed_analysis: dict) -> Dict[str, Tuple[str, Optional[float]]]:
+    """파싱된 분석 결과에서 심볼별 정규화 행동 추출"""
+    return {
+        etf["symbol"].upper(): etf_action(etf)
+        for etf in parsed_analysis.get("etfs", [])
+        if etf.get("symbol")
+    }
+
+
+def diff_analyses(current: dict, previous: dict, tolerance: float = RECOMMENDATION_PCT_TOLERANCE) -> dict:
+    """
+    두 분석 결과의 ETF별 행동 비교
+    반환: {"changed": [...], "added": [...], "removed": [...], "unknown": [...]}
+    """
+    current_actions = etf_actions(current)
+    previous_actions = etf_actions(previous)
+
+    diff = {
+        "changed": [],
+        "added": sorted(set(current_actions) - set(previous_actions)),
+        "removed": sorted(set(previous_actions) - set(current_actions)),
+        "unknown": [],
+    }
+    for symbol in sorted(set(current_actions) & set(previous_actions)):
+        (action, percent), (previous_action, previous_percent) = current_actions[symbol], previous_actions[symbol]
+        if UNKNOWN in (action, previous_action):
+            diff["unknown"].append(symbol)
+        elif action != previous_action:
+            diff["changed"].append(symbol)
+        elif percent is not None and previous_percent is not None and abs(percent - previous_percent) > tolerance:
+            diff["changed"].append(symbol)
+        elif (percent is None) != (previous_percent is None):
+            # 비율이 한쪽에만 있으면 같은 행동인지 확신할 수 없으므로 판단 보류
+            diff["unknown"].append(symbol)
+    return diff
+
+
+def classify_change(current: dict, previous: dict, tolerance: float = RECOMMENDATION_PCT_TOLERANCE) -> int:
+    """
+    구조 비교 결과 요약
+    - CHANGED: 권고 행동이 바뀐 ETF가 있거나 ETF 구성이 달라짐
+    - UNCHANGED: 모든 ETF의 권고 행동이 같음
+    - UNDETERMINED: ETF 정보가 없거나 해석할 수 없는 권고가 있음 (종합 의견 임베딩 비교로 대체)
+    """
+    if not current.get("etfs") or not previous.get("etfs"):
+        return UNDETERMINED
+
+    diff = diff_analyses(current, previous, tolerance)
+    if diff["changed"] or diff["added"] or diff["removed"]:
+        return CHANGED
+    if diff["unknown"]:
+        return UNDETERMINED
+    return UNCHANGED
@@ -0,0 +1,209 @@
+"""
+AI 분석 응답 파서
+마크다운 형식의 통합 분석 응답을 사전 컴파일한 토큰 정규식 한 번의 스캔(finditer)으로 읽어
+{"etfs": [...], "summary": ...} 구조로 변환 (구조 줄만 매칭하고 본문은 위치로 잘라냄)
+"""
+
+import re
+import json
+from typing import List, Tuple
+
+# 구조 토큰 (줄 단위, 대안 순서가 우선순위)
+# - '^' + MULTILINE 대신 줄바꿈 문자로 시작하도록 하여 정규식 엔진이 줄 시작 위치로 바로 건너뛰게 함
+# - [출력 포맷]대로 쓰인 ETF 블록(제목 + 권고 사항 + 이유)은 한 번의 매칭(block)으로 처리
+# - strict: 프롬프트의 [출력 포맷] 그대로
+# - lenient: '###' 제목, 강조/글머리표 없는 항목, 전각 괄호/콜론 등 흔한 변형 허용
+
+# 다음 구조 줄(제목/글머리표) 전까지 이어지는 본문 줄
+CONTINUATION = r"(?:\n(?![ \t]*[#\-*•])[^\n]*)*"
+
+STRICT_TOKEN = re.compile(
+    r"\n[ \t]*(?:"
+    r"(?P<block>####[ \t]+(?P<block_symbol>[A-Z0-9]+)[ \t]*\((?P<block_name>.*?)\).*"
+    r"\n[ \t]*-[ \t]*\*\*권고 사항\*\*:(?P<block_recommendation>.*)"
+    r"\n[ \t]*-[ \t]*\*\*이유\*\*:(?P<block_reason>.*" + CONTINUATION + r"))"
+    r"|(?P<summary>###[ \t]*종합 의견:(?P<summary_rest>.*))"
+    r"|(?P<etf>####[ \t]+(?P<symbol>[A-Z0-9]+)[ \t]*\((?P<name>.*?)\).*)"
+    r"|(?P<heading>#.*)"
+    r"|(?P<field>-[ \t]*\*\*(?P<key>권고 사항|이유)\*\*:(?P<value>.*))"
+    r"|(?P<bullet>[-*•].*)"
+    r")(?=\n|\Z)"
+)
+LENIENT_TOKEN = re.compile(
+    r"\n[ \t]*(?:"
+    r"(?P<block>####[ \t]+(?P<block_symbol>[A-Za-z0-9.\-]+)[ \t]*\((?P<block_name>.*?)\).*"
+    r"\n[ \t]*-[ \t]*\*\*권고 사항\*\*:(?P<block_recommendation>.*)"
+    r"\n[ \t]*-[ \t]*\*\*이유\*\*:(?P<block_reason>.*" + CONTINUATION + r"))"
+    r"|(?P<summary>#{1,5}[ \t]*\**[ \t]*종합[ \t]*의견[ \t]*\**[ \t]*[:：]?(?P<summary_rest>.*))"
+    r"|(?P<etf>#{2,5}[ \t]*(?P<symbol>[A-Za-z0-9.\-]+)[ \t]*[(（](?P<name>.*?)[)）].*)"
+    r"|(?P<heading>#.*)"
+    r"|(?P<field>(?:[-*•][ \t]*)?(?:\*\*)?[ \t]*(?P<key>권고[ \t]*사항|이유)[ \t]*(?:\*\*)?[ \t]*[:：][ \t]*(?:\*\*)?(?P<value>.*))"
+    r"|(?P<bullet>[-*•].*)"
+    r")(?=\n|\Z)"
+)
+
+
+# 구조화 출력(JSON schema) 응답의 행동 -> 권고 사항 문구 (이메일/기존 필드 호환)
+ACTION_LABELS = {"maintain": "비중 유지", "increase": "비중 {delta}% 증가", "decrease": "비중 {delta}% 감소"}
+CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+class AnalysisParseError(ValueError):
+    """strict 모드에서 응답 구조가 [출력 포맷]과 다를 때 발생"""
+
+    def __init__(self, errors: List[dict]):
+        self.errors = errors
+        super().__init__("; ".join(f"{error['line']}행: {error['message']}" for error in errors))
+
+
+def parse_json_analysis(data) -> Tuple[dict, List[dict]]:
+    """구조화 출력 응답을 마크다운 파싱 결과와 같은 구조로 변환 (action/delta_pct 필드 추가)"""
+    errors = []
+    if not isinstance(data, dict):
+        return {"etfs": [], "summary": ""}, [{"line": 0, "message": "JSON 응답이 객체가 아님"}]
+
+    etfs = []
+    for index, item in enumerate(data.get("etfs") or []):
+        symbol = str(item.get("symbol", "")).strip() if isinstance(item, dict) else ""
+        if not symbol:
+            errors.append({"line": 0, "message": f"etfs[{index}]: symbol 누락"})
+            continue
+
+        action = item.get("action")
+        try:
+            delta = abs(float(item.get("delta_pct") or 0))
+        except (TypeError, ValueError):
+            delta = 0.0
+        if action not in ACTION_LABELS:
+            errors.append({"line": 0, "message": f"{symbol}: 알 수 없는 action ({action})"})
+            recommendation = ""
+        else:
+            recommendation = ACTION_LABELS[action].format(delta=f"{delta:g}")
+
+        reason = str(item.get("reason") or "").strip()
+        if not reason:
+            errors.append({"line": 0, "message": f"{symbol}: '이유' 항목 누락"})
+        etfs.append({
+            "symbol": symbol,
+            "name": str(item.get("name") or "").strip(),
+            "recommendation": recommendation,
+            "reason": reason,
+            "action": action if action in ACTION_LABELS else None,
+            "delta_pct": delta if action in ACTION_LABELS else None,
+        })
+
+    summary = str(data.get("summary") or "").strip()
+    if not summary:
+        errors.append({"line": 0, "message": "'summary' 항목 누락"})
+    if not etfs:
+        errors.append({"line": 0, "message": "ETF 분석 블록 없음"})
+    return {"etfs": etfs, "summary": summary}, errors
+
+
+def parse_analysis(analysis_text: str, strict: bool = False) -> Tuple[dict, List[dict]]:
+    """
+    분석 응답 파싱
+    - 반환: (파싱 결과, 구조 오류 목록[{"line", "message"}])
+    - strict=True면 구조 오류가 하나라도 있을 때 AnalysisParseError 발생
+    - 이유는 여러 줄일 수 있으며 다음 항목/제목 직전까지만 포함
+    - JSON 객체로 시작하는 응답(구조화 출력)은 정규식 없이 json.loads로 처리
+    """
+    candidate = (analysis_text or "").strip()
+    if candidate.startswith("```"):
+        candidate = CODE_FENCE.sub("", candidate)
+    if candidate.startswith("{"):
+        try:
+            parsed, errors = parse_json_analysis(json.loads(candidate))
+        except ValueError as e:
+            parsed, errors = {"etfs": [], "summary": ""}, [{"line": 0, "message": f"JSON 파싱 실패: {e}"}]
+        if strict and errors:
+            raise AnalysisParseError(errors)
+        return parsed, errors
+
+    # 첫 줄도 줄바꿈 뒤에 오도록 앞에 '\n'을 붙여서 스캔 (위치는 모두 이 문자열 기준)
+    text = "\n" + (analysis_text or "")
+    token = STRICT_TOKEN if strict else LENIENT_TOKEN
+
+    etfs, problems = [], []  # problems: (문자 위치, 메시지) - 줄 번호는 오류가 있을 때만 계산
+    summary = None
+    current = None  # 현재 ETF 블록 [symbol, name, recommendation, reason, 시작 위치]
+    reason_start = None  # 이유 본문 시작 위치 (다음 토큰 직전까지)
+    seen_symbols = set()
+
+    def close_block():
+        nonlocal current
+        if current is not None:
+            for index, label in ((2, "권고 사항"), (3, "이유")):
+                if not current[index]:
+                    problems.append((current[4], f"{current[0]}: '{label}' 항목 누락"))
+            etfs.append({"symbol": current[0], "name": current[1], "recommendation": current[2], "reason": current[3]})
+        current = None
+
+    for match in token.finditer(text):
+        kind = match.lastgroup
+        if reason_start is not None:
+            current[3] = text[reason_start:match.start()].strip()
+            reason_start = None
+
+        if kind == "summary":
+            close_block()
+            # 종합 의견 이후는 모두 종합 의견 본문
+            summary = text[match.start("summary_rest"):].strip()
+            break
+
+        if kind == "block":
+            close_block()
+            symbol = match.group("block_symbol")
+            if symbol in seen_symbols:
+                problems.append((match.start(), f"{symbol}: ETF 블록 중복"))
+            seen_symbols.add(symbol)
+            current = [
+                symbol,
+                match.group("block_name").strip(),
+                match.group("block_recommendation").strip(),
+                match.group("block_reason").strip(),
+                match.start()
+            ]
+
+        elif kind == "etf":
+            close_block()
+            symbol = match.group("symbol")
+            if symbol in seen_symbols:
+                problems.append((match.start(), f"{symbol}: ETF 블록 중복"))
+            seen_symbols.add(symbol)
+            current = [symbol, match.group("name").strip(), "", "", match.start()]
+
+        elif kind == "field":
+            if current is None:
+                problems.append((match.start(), "ETF 블록 밖의 항목"))
+            elif match.group("key").startswith("권고"):
+                value = match.group("value").strip()
+                current[2] = value if strict else value.strip("*").strip()
+            else:
+                reason_start = match.start("value")
+
+        elif kind == "heading":
+            # ETF/종합 의견이 아닌 제목 (예: '### ETF 분석 결과')은 블록 경계로만 사용
+            if match.group("heading").startswith("####"):
+                problems.append((match.start(), "ETF 제목 형식 오류 ('#### <심볼> (<이름>)' 필요)"))
+            close_block()
+
+        elif strict and current is not None:
+            problems.append((match.start(), "알 수 없는 항목"))
+
+    if reason_start is not None:
+        current[3] = text[reason_start:].strip()
+    close_block()
+
+    if summary is None:
+        problems.append((None, "'### 종합 의견:' 항목 누락"))
+    if not etfs:
+        problems.append((None, "ETF 분석 블록 없음"))
+
+    errors = [
+        {"line": text.count("\n", 0, position + 1) if position is not None else 0, "message": message}
+        for position, message in problems
+    ]
+    if strict and errors:
+        raise AnalysisParseError(errors)
+    return {"etfs": etfs, "summary": summary or ""}, errors
@@ -0,0 +1,215 @@
+"""
+대화 기억 인덱스
+- 최근 N개만 잘라 보내는 대신, 사용자별 과거 메시지 임베딩 행렬에서 이번 질문과 관련 있는 대화를 골라 토큰 예산 안에서 프롬프트에 붙임
+- 임베딩은 chat_message_embeddings 테이블에 float16으로 보관하고, 프로세스에는 최근 사용한 사용자의 행렬만 LRU로 유지
+- 메시지가 저장될 때마다 해당 메시지만 인코딩해서 행렬 끝에 추가 (전체 재계산 없음)
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from crud.chat import get_message_embeddings, replace_message_embeddings, get_chat_messages_by_ids
+from services.embedding_service import embedding_service, vector_to_bytes, bytes_to_vector
+
+logger = logging.getLogger(__name__)
+
+# 대화 기억 설정 (환경 변수로 조정 가능)
+CHAT_RECENT_MESSAGES = int(os.getenv("CHAT_RECENT_MESSAGES", "6"))  # 그대로 붙이는 최근 메시지 수
+CHAT_MEMORY_TOP_K = int(os.getenv("CHAT_MEMORY_TOP_K", "4"))  # 검색해서 붙이는 과거 대화(질문+답변) 수
+CHAT_MEMORY_MIN_SCORE = float(os.getenv("CHAT_MEMORY_MIN_SCORE", "0.45"))  # 코사인 유사도 하한
+CHAT_MEMORY_TOKEN_BUDGET = int(os.getenv("CHAT_MEMORY_TOKEN_BUDGET", "800"))  # 검색 결과에 쓰는 토큰 상한
+CHAT_MEMORY_SNIPPET_CHARS = int(os.getenv("CHAT_MEMORY_SNIPPET_CHARS", "400"))  # 메시지 하나당 최대 글자 수
+CHAT_MEMORY_USERS = int(os.getenv("CHAT_MEMORY_USERS", "256"))  # 메모리에 유지하는 사용자 인덱스 수
+
+MEMORY_HEADER = "[이전 대화 중 관련 내용]"
+
+
+def estimate_tokens(text: str) -> int:
+    """토크나이저 없이 쓰는 대략적인 토큰 수 (한글 기준 2글자당 1토큰)"""
+    return max(1, len(text) // 2)
+
+
+def clip(text: str, limit: int = CHAT_MEMORY_SNIPPET_CHARS) -> str:
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+class UserMemory:
+    """사용자 한 명의 메시지 ID / 역할 / 임베딩 행렬 (메시지 ID 오름차순)"""
+
+    def __init__(self, message_ids: List[int], roles: List[str], vectors: np.ndarray):
+        self.message_ids = message_ids
+        self.roles = roles
+        self.vectors = vectors
+        self.lock = threading.Lock()
+
+    def append(self, message_ids: List[int], roles: List[str], vectors: np.ndarray):
+        with self.lock:
+            self.message_ids = self.message_ids + message_ids
+            self.roles = self.roles + roles
+            self.vectors = np.vstack([self.vectors, vectors]) if len(self.vectors) else vectors
+
+    def search(self, query: np.ndarray, exclude_ids: set, top_k: int, min_score: float) -> List[List[int]]:
+        """
+        관련 메시지를 질문+답변 쌍(메시지 ID 목록)으로 묶어 유사도 순으로 반환
+        - user 메시지가 걸리면 바로 뒤 assistant 답변을, assistant 답변이 걸리면 바로 앞 질문을 함께 묶음
+        """
+        with self.lock:
+            message_ids, roles, vectors = self.message_ids, self.roles, self.vectors
+        if not len(vectors):
+            return []
+
+        scores = vectors @ query
+        candidates = np.flatnonzero(scores >= min_score)
+        if not len(candidates):
+            return []
+        # 전체 정렬 대신 상위 후보만 부분 정렬
+        limit = min(len(candidates), top_k * 4)
+        best = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        best = best[np.argsort(-scores[best])]
+
+        turns, used = [], set()
+        for index in best:
+            if roles[index] == "assistant" and index > 0 and roles[index - 1] == "user":
+                positions = [index - 1, index]
+            elif roles[index] == "user" and index + 1 < len(roles) and roles[index + 1] == "assistant":
+                positions = [index, index + 1]
+            else:
+                positions = [index]
+            turn = [message_ids[position] for position in positions if message_ids[position] not in exclude_ids]
+            if not turn or used.intersection(turn):
+                continue
+            used.update(turn)
+            turns.append(turn)
+            if len(turns) >= top_k:
+                break
+        return turns
+
+
+class ChatMemoryIndex:
+    """사용자별 대화 임베딩 인덱스 (무차별 대입 내적 검색, 사용자당 수천 건 규모에서 1ms 미만)"""
+
+    def __init__(self, max_users: int = CHAT_MEMORY_USERS):
+        self.max_users = max_users
+        self._users = OrderedDict()  # user_id -> UserMemory
+        self._lock = threading.Lock()
+
+    @property
+    def model_name(self) -> str:
+        return embedding_service.model_name
+
+    def _encode_and_store(self, db: Session, user_id: int, messages) -> np.ndarray:
+        """메시지를 한 번에 인코딩하고 임베딩 테이블에 저장 (저장 실패는 인덱스 사용에 영향 없음)"""
+        vectors = embedding_service.encode([message.content for message in messages])
+        try:
+            replace_message_embeddings(db, [
+                {
+                    "message_id": message.id,
+                    "user_id": user_id,
+                    "model_name": self.model_name,
+                    "embedding": vector_to_bytes(vector),
+                }
+                for message, vector in zip(messages, vectors)
+            ])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ 대화 임베딩 저장 실패 (사용자 {user_id}): {e}")
+        return vectors
+
+    def _load(self, db: Session, user_id: int) -> UserMemory:
+        """저장된 임베딩을 읽고, 아직 임베딩이 없는 메시지만 인코딩해서 인덱스 생성"""
+        with self._lock:
+            memory = self._users.get(user_id)
+            if memory is not None:
+                self._users.move_to_end(user_id)
+                return memory
+
+        rows = get_message_embeddings(db, user_id, self.model_name)
+        missing_ids = [message_id for message_id, _, embedding in rows if embedding is None]
+        encoded = {}
+        if missing_ids:
+            missing = get_chat_messages_by_ids(db, missing_ids)
+            vectors = self._encode_and_store(db, user_id, missing)
+            encoded = {message.id: vector for message, vector in zip(missing, vectors)}
+            logger.info(f"🧠 대화 임베딩 {len(encoded)}건 생성 (사용자 {user_id})")
+
+        message_ids, roles, vectors = [], [], []
+        for message_id, role, embedding in rows:
+            vector = bytes_to_vector(embedding) if embedding is not None else encoded.get(message_id)
+            if vector is None:
+                continue
+            message_ids.append(message_id)
+            roles.append(role)
+            vectors.append(vector)
+        matrix = np.stack(vectors).astype(np.float32) if vectors else np.empty((0, 0), dtype=np.float32)
+        memory = UserMemory(message_ids, roles, matrix)
+
+        with self._lock:
+            # 동시에 로드한 요청이 있으면 먼저 등록된 인덱스를 사용
+            memory = self._users.setdefault(user_id, memory)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return memory
+
+    def add(self, db: Session, user_id: int, messages):
+        """새로 저장한 메시지를 인코딩해서 저장하고, 인덱스가 메모리에 있으면 끝에 추가"""
+        messages = [message for message in messages if message is not None and message.content]
+        if not messages:
+            return
+        vectors = self._encode_and_store(db, user_id, messages)
+        with self._lock:
+            memory = self._users.get(user_id)
+        if memory is not None:
+            known = set(memory.message_ids)
+            new = [(message, vector) for message, vector in zip(messages, vectors) if message.id not in known]
+            if new:
+                memory.append([message.id for message, _ in new], [message.role for message, _ in new], np.stack([vector for _, vector in new]))
+
+    def retrieve(self, db: Session, user_id: int, question: str, exclude_ids=(), top_k: int = CHAT_MEMORY_TOP_K,
+                 token_budget: int = CHAT_MEMORY_TOKEN_BUDGET) -> Optional[str]:
+        """이번 질문과 관련 있는 과거 대화를 토큰 예산 안에서 시간순으로 정리한 텍스트 (없으면 None)"""
+        memory = self._load(db, user_id)
+        query = embedding_service.encode([question])[0]
+
+        started_at = time.perf_counter()
+        turns = memory.search(query, set(exclude_ids), top_k, CHAT_MEMORY_MIN_SCORE)
+        search_ms = (time.perf_counter() - started_at) * 1000
+        if not turns:
+            return None
+
+        messages = {message.id: message for message in get_chat_messages_by_ids(db, [i for turn in turns for i in turn])}
+        selected, used_tokens = [], estimate_tokens(MEMORY_HEADER)
+        for turn in turns:
+            lines = [
+                f"{'사용자' if messages[i].role == 'user' else '답변'}: {clip(messages[i].content)}"
+                for i in turn if i in messages
+            ]
+            tokens = sum(estimate_tokens(line) for line in lines)
+            if not lines or used_tokens + tokens > token_budget:
+                continue
+            used_tokens += tokens
+            selected.append((turn[0], lines))
+
+        logger.debug(f"🧠 대화 검색 {search_ms:.2f}ms - 사용자 {user_id}, {len(selected)}건, 약 {used_tokens}토큰")
+        if not selected:
+            return None
+        # 관련도 순으로 고른 뒤 대화 흐름대로 시간순 정렬
+        selected.sort(key=lambda item: item[0])
+        return MEMORY_HEADER + "\n" + "\n\n".join("\n".join(lines) for _, lines in selected)
+
+    def forget(self, user_id: int):
+        """대화 기록을 삭제하면 메모리의 인덱스도 제거"""
+        with self._lock:
+            self._users.pop(user_id, None)
+
+
+# 프로세스 공용 대화 기억 인덱스
+chat_memory = ChatMemoryIndex()
@@ -0,0 +1,174 @@
+"""
+이어받기 가능한 채팅 스트림
+- 답변 생성은 클라이언트 연결과 별개의 태스크에서 끝까지 실행하고, 생성된 이벤트는 스트림별 고정 크기 링 버퍼에 보관
+- SSE 이벤트마다 `id: <stream_id>:<순번>`을 붙여, 연결이 끊긴 클라이언트가 Last-Event-ID로 놓친 이벤트부터 다시 받음
+- 끝난 스트림은 CHAT_STREAM_TTL 동안만 보관 (그 뒤에는 /chat/history로 조회)
+- 구독자가 모두 끊긴 채 CHAT_STREAM_ORPHAN_GRACE가 지나도록 이어받지 않으면 생성을 취소 (AI 서비스 연결을 닫아 토큰 생성 중단)
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 스트림 버퍼 설정 (환경 변수로 조정 가능)
+CHAT_STREAM_BUFFER_EVENTS = int(os.getenv("CHAT_STREAM_BUFFER_EVENTS", "2048"))  # 스트림별 보관 이벤트 수
+CHAT_STREAM_TTL = int(os.getenv("CHAT_STREAM_TTL", "300"))  # 끝난 스트림 보관 시간(초)
+CHAT_STREAM_ORPHAN_GRACE = float(os.getenv("CHAT_STREAM_ORPHAN_GRACE", "30"))  # 구독자 없이 생성을 계속하는 시간(초), 0 이하면 끝까지 생성
+
+DONE = b"[DONE]"
+
+
+class StreamGone(Exception):
+    """요청한 이벤트가 이미 링 버퍼에서 밀려나 이어받을 수 없음"""
+
+
+def format_event(stream_id: str, seq: int, data: bytes) -> bytes:
+    return b"id: %s:%d\ndata: %s\n\n" % (stream_id.encode("ascii"), seq, data)
+
+
+def parse_last_event_id(value: Optional[str]) -> Tuple[Optional[str], int]:
+    """'<stream_id>:<순번>' 형식의 Last-Event-ID를 (stream_id, 순번)으로 변환 (없거나 잘못되면 (None, -1))"""
+    if not value or ":" not in value:
+        return None, -1
+    stream_id, _, seq = value.rpartition(":")
+    try:
+        return stream_id, int(seq)
+    except ValueError:
+        return None, -1
+
+
+class ChatStream:
+    """답변 하나의 이벤트 링 버퍼 (이벤트 루프 하나에서만 사용)"""
+
+    def __init__(self, stream_id: str, user_id: int, buffer_size: int = CHAT_STREAM_BUFFER_EVENTS,
+                 orphan_grace: float = CHAT_STREAM_ORPHAN_GRACE):
+        self.stream_id = stream_id
+        self.user_id = user_id
+        self.orphan_grace = orphan_grace
+        self.subscribers = 0
+        self.abandoned = False
+        self._orphan_timer = None
+        self.events = deque(maxlen=max(buffer_size, 1))  # (순번, SSE 이벤트 bytes)
+        self.next_seq = 0
+        self.done = False
+        self.created_at = time.time()
+        self.finished_at = None
+        self.task = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        # 기다리던 구독자를 모두 깨우고 다음 이벤트용으로 새로 만듦
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def publish(self, data: bytes):
+        """data 줄 내용(JSON bytes)을 그대로 이벤트로 보관 (다시 직렬화하지 않음)"""
+        self.events.append((self.next_seq, format_event(self.stream_id, self.next_seq, data)))
+        self.next_seq += 1
+        self._notify()
+
+    def publish_content(self, content: str):
+        self.publish(json.dumps({"content": content}).encode("ascii"))
+
+    def finish(self):
+        if self.done:
+            return
+        self.publish(DONE)
+        self.done = True
+        self.finished_at = time.time()
+
+    def _abandon(self):
+        """유예 시간 동안 아무도 이어받지 않았으면 생성 태스크 취소"""
+        self._orphan_timer = None
+        if self.subscribers == 0 and not self.done and self.task is not None:
+            self.abandoned = True
+            self.task.cancel()
+
+    async def subscribe(self, last_seq: int = -1) -> AsyncIterator[bytes]:
+        """last_seq 다음 이벤트부터 전달 (버퍼에 남은 것 먼저, 이후 새 이벤트를 기다림)"""
+        self.subscribers += 1
+        if self._orphan_timer is not None:
+            self._orphan_timer.cancel()
+            self._orphan_timer = None
+        try:
+            async for event in self._events_after(last_seq):
+                yield event
+        finally:
+            # 마지막 구독자가 끊기면 유예 시간 뒤 생성 취소
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done and self.orphan_grace > 0:
+                self._orphan_timer = asyncio.get_running_loop().call_later(self.orphan_grace, self._abandon)
+
+    async def _events_after(self, last_seq: int) -> AsyncIterator[bytes]:
+        while True:
+            if self.events and last_seq + 1 < self.events[0][0]:
+                raise StreamGone(f"{self.stream_id}: {last_seq + 1}번 이벤트가 버퍼에 없음")
+            changed = self._changed
+            pending = [(seq, event) for seq, event in self.events if seq > last_seq]
+            for seq, event in pending:
+                yield event
+                last_seq = seq
+            if pending:
+                # 보내는 사이 더 쌓였을 수 있으므로 다시 확인
+                continue
+            if self.done:
+                return
+            await changed.wait()
+
+
+class ChatStreamRegistry:
+    """진행 중/최근 종료된 채팅 스트림 목록"""
+
+    def __init__(self, ttl: int = CHAT_STREAM_TTL):
+        self.ttl = ttl
+        self._streams = {}
+        self.counters = {"started": 0, "resumed": 0, "gone": 0, "abandoned": 0}
+
+    def start(self, user_id: int, producer) -> ChatStream:
+        """
+        producer(stream)을 백그라운드 태스크로 실행
+        - producer는 stream.publish() / publish_content()로 이벤트를 올리고, 끝나면(예외 포함) 스트림을 닫음
+        """
+        stream = ChatStream(uuid.uuid4().hex, user_id)
+        self._streams[stream.stream_id] = stream
+        self.counters["started"] += 1
+        stream.task = asyncio.create_task(self._run(stream, producer))
+        return stream
+
+    async def _run(self, stream: ChatStream, producer):
+        try:
+            await producer(stream)
+        except asyncio.CancelledError:
+            # 구독자 없이 유예 시간이 지나 취소됨 (부분 답변은 저장하지 않음)
+            self.counters["abandoned"] += 1
+            logger.info(f"🛑 채팅 스트림 {stream.stream_id} 생성 취소 (구독자 없음)")
+        except Exception as e:
+            logger.error(f"❌ 채팅 스트림 {stream.stream_id} 생성 실패: {e}")
+        finally:
+            stream.finish()
+            asyncio.get_running_loop().call_later(self.ttl, self._streams.pop, stream.stream_id, None)
+
+    def get(self, stream_id: str, user_id: int) -> Optional[ChatStream]:
+        """본인 스트림만 조회"""
+        stream = self._streams.get(stream_id)
+        if stream is None or stream.user_id != user_id:
+            return None
+        return stream
+
+    def metrics(self) -> dict:
+        return {
+            "active": sum(1 for stream in self._streams.values() if not stream.done),
+            "retained": len(self._streams),
+            **self.counters,
+        }
+
+
+# 프로세스 공용 채팅 스트림 목록
+chat_streams = ChatStreamRegistry()
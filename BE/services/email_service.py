@@ -12,6 +12,8 @@ class EmailService:
         self.sendgrid_api_key = os.getenv('SENDGRID_API_KEY')
         self.from_email = os.getenv('SENDGRID_FROM_EMAIL', 'noreply@etfapp.com')
         self.from_name = os.getenv('SENDGRID_FROM_NAME', 'ETF 투자 관리팀')
+        # 전송 스레드가 응답 없는 요청에 묶이지 않도록 SendGrid 호출 시간 제한(초)
+        self.timeout = float(os.getenv('SENDGRID_TIMEOUT', '10'))
         
         if not self.sendgrid_api_key:
             logger.warning("SENDGRID_API_KEY가 설정되지 않았습니다. 이메일 전송이 비활성화됩니다.")
@@ -72,6 +74,7 @@ class EmailService:
                 'https://api.sendgrid.com/v3/mail/send',
                 headers=headers,
                 json=email_data,
+                timeout=self.timeout,
                 verify=False  # SSL 검증 비활성화
             )
             
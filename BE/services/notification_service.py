@@ -3,13 +3,15 @@
 알림 전송 서비스
 """
 
+import asyncio
 import logging
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
 
 from models.user import User
 from crud.notification import create_notification
 
-from config.notification_config import get_notification_titles, get_notification_types
+from config.notification_config import get_notification_titles, get_notification_types, NOTIFICATION_SEND_WORKERS
 from schemas.notification import NotificationCreate
 from services.email_service import email_service
 from database import SessionLocal
@@ -22,79 +24,114 @@ class NotificationService:
     def __init__(self):
         self.notification_titles = get_notification_titles()
         self.notification_types = get_notification_types()
+        # 알림 전송 전용 스레드 풀 (API 요청 처리와 기본 스레드 풀을 나눠 쓰지 않음)
+        self.executor = ThreadPoolExecutor(max_workers=NOTIFICATION_SEND_WORKERS, thread_name_prefix="notification")
 
-    async def send_bulk_notifications(self, notifications: List[Dict]) -> Dict[str, int]:
+    async def send_bulk_notifications(self, notifications: List[Dict], checkpoint=None) -> Dict[str, int]:
         """
         대량 알림 전송 (통합 포트폴리오 분석 전용으로 단순화)
+        - 이메일 렌더링/SendGrid 호출/저장은 블로킹 작업이므로 전송 전용 스레드 풀에서 NOTIFICATION_SEND_WORKERS개씩 동시에 처리
         
         Args:
             notifications: 알림 데이터 목록
+            checkpoint: 분산 스케줄링 샤드 기록 (있으면 전송 권한을 얻은 사용자에게만 전송하고 결과를 기록)
         
         Returns:
             전송 결과 통계
         """
-        success_count = 0
-        failure_count = 0
+        loop = asyncio.get_running_loop()
+        # 스케줄러 세션의 ETF 객체는 스레드 간에 공유하지 않도록 이메일용 값을 먼저 한 스레드에서 꺼내 둠
+        email_payloads = await loop.run_in_executor(self.executor, self.build_email_payloads, notifications)
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self.executor, self.send_notification, user_id, email_data, checkpoint)
+            for user_id, email_data in email_payloads
+        ))
 
+        return {
+            "success_count": results.count("sent"),
+            "failure_count": results.count("failed") + len(notifications) - len(email_payloads),
+            "skipped_count": results.count("skipped"),
+            "total_count": len(notifications)
+        }
+
+    def build_email_payloads(self, notifications: List[Dict]) -> List[Tuple[int, Dict]]:
+        """알림 데이터에서 이메일/저장에 필요한 값만 추출 [(user_id, 이메일 데이터)]"""
+        payloads = []
         for notification_data in notifications:
-            db = SessionLocal()  # 각 알림마다 새로운 DB 세션을 생성
+            user_id = notification_data.get('user_id')
             try:
-                user_id = notification_data.get('user_id')
-                user = db.query(User).filter(User.id == user_id).first()
-
-                if not user or not user.settings or not user.settings.notification_enabled:
-                    logger.warning(f"⚠️ 사용자 {user_id}를 찾을 수 없거나 알림이 비활성화되어 있습니다.")
-                    failure_count += 1
-                    continue
-
-                # 이메일 전송 로직
                 etf_data_list = notification_data['etf_data_list']
-                etf_list_for_email = [f"• {d['etf'].symbol} ({d['etf'].name}): {d['etf_setting'].amount:,g}만 원" for d in etf_data_list]
-                total_amount = sum(d['etf_setting'].amount for d in etf_data_list)
-                
-                email_data = {
-                    'etf_list': etf_list_for_email,
-                    'total_amount': total_amount,
+                payloads.append((user_id, {
+                    'etf_list': [f"• {d['etf'].symbol} ({d['etf'].name}): {d['etf_setting'].amount:,g}만 원" for d in etf_data_list],
+                    'total_amount': sum(d['etf_setting'].amount for d in etf_data_list),
                     'etf_count': len(etf_data_list),
                     'parsed_analysis': notification_data['parsed_analysis']
-                }
-
-                email_sent = email_service.send_portfolio_analysis_notification(
-                    user.email, user.name, email_data
-                )
-                
-                if email_sent:
-                    logger.info(f"📧 {user.name}님의 포트폴리오 분석 이메일 알림 전송 성공")
-                else:
-                    logger.warning(f"⚠️ {user.name}님의 포트폴리오 분석 이메일 알림 전송 실패")
-
-                # 데이터베이스에 알림 저장 로직
-                title = f"📊 ETF 포트폴리오 투자 분석 알림 ({len(etf_data_list)}개 종목)"
-                content = notification_data['parsed_analysis'].get('summary', '분석 결과를 확인해주세요.')
-                sent_via = "email" if email_sent else "app"
-
-                db_notification_data = NotificationCreate(
-                    user_id=user.id,
-                    title=title,
-                    content=content,
-                    type=self.notification_types.get('PORTFOLIO_ANALYSIS', 'portfolio_analysis'),
-                    sent_via=sent_via
-                )
-                create_notification(db, db_notification_data)
-
-                success_count += 1
-
+                }))
             except Exception as e:
-                logger.error(f"❌ 대량 알림 전송 중 오류: {e}")
-                failure_count += 1
-            finally:
-                db.close()  # 작업이 끝나면 반드시 세션을 닫아줌
+                logger.error(f"❌ 사용자 {user_id} 알림 데이터 준비 중 오류: {e}")
+        return payloads
 
-        return {
-            "success_count": success_count,
-            "failure_count": failure_count,
-            "total_count": len(notifications)
-        }
+    def send_notification(self, user_id: int, email_data: Dict, checkpoint=None) -> str:
+        """
+        사용자 한 명에게 알림 전송 (전송 스레드에서 실행)
+        
+        Returns:
+            "sent" / "failed" / "skipped"(다른 인스턴스가 이미 전송 중이거나 전송함)
+        """
+        if checkpoint:
+            try:
+                if not checkpoint.claim(user_id):
+                    return "skipped"
+            except Exception as e:
+                logger.error(f"❌ 사용자 {user_id} 알림 전송 권한 획득 실패: {e}")
+                return "failed"
+
+        sent = False
+        db = SessionLocal()  # 각 알림마다 새로운 DB 세션을 생성
+        try:
+            user = db.query(User).filter(User.id == user_id).first()
+
+            if not user or not user.settings or not user.settings.notification_enabled:
+                logger.warning(f"⚠️ 사용자 {user_id}를 찾을 수 없거나 알림이 비활성화되어 있습니다.")
+                return "failed"
+
+            # 이메일 전송 로직
+            email_sent = email_service.send_portfolio_analysis_notification(
+                user.email, user.name, email_data
+            )
+            
+            if email_sent:
+                logger.info(f"📧 {user.name}님의 포트폴리오 분석 이메일 알림 전송 성공")
+            else:
+                logger.warning(f"⚠️ {user.name}님의 포트폴리오 분석 이메일 알림 전송 실패")
+
+            # 데이터베이스에 알림 저장 로직
+            title = f"📊 ETF 포트폴리오 투자 분석 알림 ({email_data['etf_count']}개 종목)"
+            content = email_data['parsed_analysis'].get('summary', '분석 결과를 확인해주세요.')
+            sent_via = "email" if email_sent else "app"
+
+            db_notification_data = NotificationCreate(
+                user_id=user.id,
+                title=title,
+                content=content,
+                type=self.notification_types.get('PORTFOLIO_ANALYSIS', 'portfolio_analysis'),
+                sent_via=sent_via
+            )
+            create_notification(db, db_notification_data)
+
+            sent = True
+            return "sent"
+
+        except Exception as e:
+            logger.error(f"❌ 대량 알림 전송 중 오류: {e}")
+            return "failed"
+        finally:
+            db.close()  # 작업이 끝나면 반드시 세션을 닫아줌
+            if checkpoint:
+                try:
+                    checkpoint.complete(user_id, sent)
+                except Exception as e:
+                    logger.error(f"❌ 사용자 {user_id} 알림 전송 결과 기록 실패: {e}")
 
 # 전역 알림 서비스 인스턴스
 notification_service = NotificationService() 
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""
+페르소나 서비스
+투자 설정의 persona 값은 템플릿 참조("persona_template:<id>") 또는 기존 방식의 전체 문자열
+템플릿은 id별로 한 번만 저장/조회하고, 이름과 오늘 날짜는 채팅 전송 시점에 채움
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from config.timezone_config import get_kst_now
+from crud.persona import get_persona_template
+
+logger = logging.getLogger(__name__)
+
+PERSONA_REF_PREFIX = "persona_template:"
+DEFAULT_PERSONA = "기본 투자 상담사"
+
+# 자리 표시자 (AI 서비스 tunning/instructions.py와 같아야 함)
+USER_NAME_SLOT = "{user_name}"
+TODAY_DATE_SLOT = "{today_date}"
+
+TEMPLATE_CACHE_SIZE = 256
+
+_template_cache = OrderedDict()  # template_id -> 템플릿 내용 (내용 해시가 id이므로 무효화 불필요)
+_cache_lock = threading.Lock()
+
+
+def persona_reference(template_id: str) -> str:
+    """InvestmentSettings.persona에 저장할 템플릿 참조 값"""
+    return f"{PERSONA_REF_PREFIX}{template_id}"
+
+
+def parse_persona_reference(persona: Optional[str]) -> Optional[str]:
+    """템플릿 참조면 template_id, 기존 전체 문자열이거나 비어 있으면 None"""
+    if persona and persona.startswith(PERSONA_REF_PREFIX):
+        return persona[len(PERSONA_REF_PREFIX):]
+    return None
+
+
+def today_date_text() -> str:
+    """오늘 날짜 (한국 시간 기준)"""
+    now = get_kst_now()
+    return f"{now.year}년 {now.month}월 {now.day}일"
+
+
+def load_template(db: Session, template_id: str) -> Optional[str]:
+    """템플릿 내용 조회 (프로세스 LRU 캐시 -> DB)"""
+    with _cache_lock:
+        if template_id in _template_cache:
+            _template_cache.move_to_end(template_id)
+            return _template_cache[template_id]
+
+    template = get_persona_template(db, template_id)
+    if not template:
+        return None
+
+    with _cache_lock:
+        _template_cache[template_id] = template.content
+        while len(_template_cache) > TEMPLATE_CACHE_SIZE:
+            _template_cache.popitem(last=False)
+    return template.content
+
+
+def render_persona(db: Session, persona: Optional[str], user_name: str) -> str:
+    """
+    채팅에 보낼 페르소나 문자열
+    - 템플릿 참조: 이름과 오늘 날짜를 채워서 반환 (템플릿이 없으면 기본 페르소나)
+    - 기존 전체 문자열: 그대로 반환
+    """
+    template_id = parse_persona_reference(persona)
+    if template_id is None:
+        return persona or DEFAULT_PERSONA
+
+    content = load_template(db, template_id)
+    if content is None:
+        logger.warning(f"⚠️ 페르소나 템플릿을 찾을 수 없습니다: {template_id}")
+        return DEFAULT_PERSONA
+    # 이름에 자리 표시자가 들어 있어도 다시 치환되지 않도록 날짜를 먼저 채움
+    return content.replace(TODAY_DATE_SLOT, today_date_text()).replace(USER_NAME_SLOT, user_name)
+
+
+def describe_persona(persona: Optional[str]) -> str:
+    """분석 프롬프트용 페르소나 설명 (템플릿은 위험 성향/보유 ETF로 만든 것이므로 내용을 다시 넣지 않음)"""
+    if not persona:
+        return "미입력"
+    if parse_persona_reference(persona) is not None:
+        return "기본 (위험 성향 및 보유 ETF 기준)"
+    return persona
@@ -0,0 +1,135 @@
+"""
+분석 프롬프트 조립
+제공자 측 프롬프트 프리픽스 캐시가 적중하도록 변하지 않는 내용(역할, 규칙, 출력 포맷)을 앞에 두고
+실행 단위로 바뀌는 내용(분석 기준일, 시장 지표), 사용자별 내용(사용자/ETF 정보) 순서로 뒤에 붙임
+"""
+
+from typing import Optional
+
+from config.timezone_config import get_kst_now
+
+# 템플릿 버전 (정적 프리픽스 문구를 바꾸면 올려서 캐시 적중률/품질 변화를 구분)
+PROMPT_VERSION = "analysis-v2"
+
+ROLE_INSTRUCTION = (
+    "당신은 유능한 금융 분석가입니다. 아래 정보를 바탕으로 포트폴리오 조정에 대한 조언을 생성해야 합니다. "
+    "반드시 [규칙]을 엄격히 준수하십시오.\n"
+    "[규칙] 이후의 [분석 기준일], [시장 지표], [사용자 정보], [보유 ETF 목록]이 이번 분석의 입력입니다."
+)
+
+MARKDOWN_OUTPUT_RULES = (
+    "[출력 포맷]\n"
+    "### ETF 분석 결과\n\n"
+    "#### SPY (미국 S&P500)\n"
+    "- **권고 사항**: 비중 유지 (시장 안정, 추가 매수 불필요)\n"
+    "- **이유**: ECB의 주요 정책금리 동결로 인한 글로벌 금융시장의 안정세가 유지되고 있습니다.\n\n"
+    "#### QQQ (미국 나스닥)\n"
+    "- **권고 사항**: 비중 10% 증가 권고 (기술주 강세, 성장 기대)\n"
+    "- **이유**: 기술주 중심의 나스닥 시장은 최근 긍정적인 경제 신호들로 강세를 보입니다.\n\n"
+    "### 종합 의견:\n"
+    "이번 주는 전반적으로 안정된 시장 모습을 보였습니다. 현 상황에서는 점진적이고 안정적인 접근이 필요합니다.\n"
+    "\n"
+    "[규칙]\n"
+    "1. 응답은 반드시 제공한 모든 ETF 목록을 분석한 후에, 위의 [출력 포맷]을 정확하게 따라야 합니다.\n"
+    "2. 각 ETF는 `#### <심볼> (<이름>)` 형식의 제목으로 시작해야 합니다.\n"
+    "3. 각 ETF 정보는 `- **권고 사항**: ...`과 `- **이유**: ...` 항목을 반드시 포함해야 합니다.\n"
+    "4. `### 종합 의견:` 항목을 반드시 포함해야 합니다.\n"
+    "5. 포맷 외에 불필요한 인사말, 서론, 결론 등 부연 설명을 절대 추가하지 마십시오."
+)
+
+# 구조화 출력용 규칙 (형식은 response_format의 JSON schema가 강제)
+STRUCTURED_OUTPUT_RULES = (
+    "[출력 규칙]\n"
+    "1. 제공한 모든 ETF를 분석하여 etfs 배열에 ETF마다 하나씩 포함하십시오.\n"
+    "2. action은 maintain(비중 유지), increase(비중 증가), decrease(비중 감소) 중 하나입니다.\n"
+    "3. delta_pct는 조정할 비중(%)이며 maintain이면 0입니다.\n"
+    "4. reason에는 권고 이유를, summary에는 종합 의견을 작성하십시오."
+)
+
+# 정적 프리픽스는 import 시 한 번만 조립
+STATIC_PREFIX = {
+    False: f"{ROLE_INSTRUCTION}\n\n{MARKDOWN_OUTPUT_RULES}",
+    True: f"{ROLE_INSTRUCTION}\n\n{STRUCTURED_OUTPUT_RULES}",
+}
+
+USER_COMMAND = "오늘의 투자 포트폴리오 조정 조언을 생성해줘."
+
+# 공유 분석 개인화 (분석은 다시 하지 않고, 공유 분석 결과를 사용자 정보에 맞게 다시 씀)
+PERSONALIZE_INSTRUCTION = (
+    "당신은 유능한 금융 분석가입니다. [공유 분석]은 같은 ETF 구성과 위험 성향을 가진 사용자들에게 공통으로 작성한 분석입니다. "
+    "[사용자 정보]와 [보유 ETF 목록]을 반영해 이 사용자에게 보낼 분석으로 다시 작성하십시오.\n"
+    "[개인화 규칙]\n"
+    "1. ETF별 권고 방향(유지/증가/감소)과 비율은 [공유 분석]과 똑같이 유지하십시오.\n"
+    "2. 이유와 종합 의견의 표현만 사용자의 투자 목표/페르소나, 투자 금액, 주기에 맞게 조정하십시오.\n"
+    "3. [공유 분석]에 없는 새로운 시장 정보나 수치를 추가하지 마십시오."
+)
+
+PERSONALIZE_PREFIX = {
+    structured: f"{PERSONALIZE_INSTRUCTION}\n\n{rules}"
+    for structured, rules in ((False, MARKDOWN_OUTPUT_RULES), (True, STRUCTURED_OUTPUT_RULES))
+}
+
+PERSONALIZE_COMMAND = "공유 분석을 나에게 맞게 다시 작성해줘."
+
+# 공유 분석을 LLM 호출 없이 개인화할 때 종합 의견 앞에 붙이는 문구
+PERSONAL_NOTE_TEMPLATE = "{name}님의 보유 구성({holdings}) 기준 의견입니다."
+
+
+def analysis_date_line() -> str:
+    """분석 기준일 (한국 시간 기준)"""
+    kst_now = get_kst_now()
+    return f"[분석 기준일] {kst_now.year}년 {kst_now.month}월 {kst_now.day}일"
+
+
+def build_analysis_messages(
+    user_info: str,
+    etf_info: str,
+    market_snapshot: Optional[str] = None,
+    structured: bool = False,
+) -> list:
+    """
+    분석 메시지 조립: 정적 프리픽스 -> 분석 기준일/시장 지표(실행 단위 공통) -> 사용자/ETF 정보(사용자별)
+    - 같은 실행의 사용자들은 시장 지표까지 동일한 프리픽스를 공유
+    """
+    market_info = f"\n\n[시장 지표]\n{market_snapshot}" if market_snapshot else ""
+    system_content = (
+        f"{STATIC_PREFIX[structured]}\n\n"
+        f"{analysis_date_line()}{market_info}\n\n"
+        f"{user_info}\n\n"
+        f"{etf_info}"
+    )
+    return [
+        {"role": "system", "content": system_content}, # 역할을 system으로 변경하여 더 강력한 지시
+        {"role": "user", "content": USER_COMMAND}
+    ]
+
+
+def build_personalization_messages(
+    user_info: str,
+    etf_info: str,
+    shared_analysis: str,
+    structured: bool = False,
+) -> list:
+    """
+    공유 분석 개인화 메시지 조립: 정적 프리픽스 -> 분석 기준일 -> 사용자/ETF 정보 -> 공유 분석
+    - 출력 형식은 일반 분석과 같으므로 같은 파서/알림 판단을 그대로 사용
+    """
+    system_content = (
+        f"{PERSONALIZE_PREFIX[structured]}\n\n"
+        f"{analysis_date_line()}\n\n"
+        f"{user_info}\n\n"
+        f"{etf_info}\n\n"
+        f"[공유 분석]\n{shared_analysis}"
+    )
+    return [
+        {"role": "system", "content": system_content},
+        {"role": "user", "content": PERSONALIZE_COMMAND}
+    ]
+
+
+def build_personal_note(name: str, holdings: list) -> str:
+    """공유 분석 종합 의견에 붙일 사용자 문구 (holdings: [(심볼, 금액(만원), 주기)])"""
+    return PERSONAL_NOTE_TEMPLATE.format(
+        name=name,
+        holdings=", ".join(f"{symbol} {amount:,}만원/{cycle}" for symbol, amount, cycle in holdings)
+    )
@@ -5,14 +5,26 @@
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
 import logging
-from typing import List
+from typing import List, Optional
 import asyncio
+import json
 import os
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from config.timezone_config import get_kst_now
+from config.notification_config import (
+    uses_structured_analysis,
+    uses_analysis_dedup,
+    uses_llm_personalization,
+    get_shared_analysis_credentials,
+    uses_distributed_scheduler,
+    SCHEDULER_SWEEP_INTERVAL,
+    SCHEDULER_WORKER_THREADS)
 
 from database import SessionLocal
 from crud.notification import get_users_with_notifications_enabled
@@ -20,9 +32,15 @@ from crud.etf import get_investment_etf_settings_by_user_id, get_etf_by_id
 from crud.user import get_user_by_id
 from services.ai_service import (
     request_batch_ai_analysis, 
+    request_market_snapshot,
     create_integrated_analysis_messages, 
-    determine_notification_need)
+    create_shared_analysis_messages,
+    create_personalization_messages,
+    personalize_shared_analysis,
+    analysis_dedup_key,
+    determine_notifications_batch)
 from services.notification_service import notification_service
+from services.shard_coordinator import shard_coordinator, ShardCheckpoint
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +50,10 @@ class NotificationScheduler:
         self.is_running = False
         # 병렬 처리를 위한 설정
         self.max_concurrent_users = int(os.getenv('MAX_CONCURRENT_USERS', '10'))
+        # 블로킹/CPU 작업(DB 조회, 알림 판단) 전용 스레드 풀 (이벤트 루프와 API 요청용 기본 스레드 풀을 막지 않음)
+        self.executor = ThreadPoolExecutor(max_workers=SCHEDULER_WORKER_THREADS, thread_name_prefix="scheduler")
+        # 마지막으로 끝난 실행의 지표 (/metrics 보고용, 실행마다 만든 지표 dict를 끝날 때 통째로 바꿔 넣음)
+        self.last_run_metrics = {}
     
     def start(self):
         """스케줄러 시작"""
@@ -44,11 +66,24 @@ class NotificationScheduler:
                 name='투자일 알림 체크 (병렬 처리 버전)',
                 replace_existing=True
             )
+            if uses_distributed_scheduler():
+                # 임대가 만료된(처리하던 인스턴스가 죽은) 샤드를 주기적으로 이어받음
+                self.scheduler.add_job(
+                    self.resume_expired_shards,
+                    IntervalTrigger(seconds=SCHEDULER_SWEEP_INTERVAL),
+                    id='investment_notification_resume',
+                    name='중단된 알림 샤드 이어받기',
+                    replace_existing=True
+                )
             
             self.scheduler.start()
             self.is_running = True
             logger.info(f"✅ 병렬 처리 알림 스케줄러 시작됨 (매일 8시-17시, 3시간 간격, 최대 동시 처리: {self.max_concurrent_users}명)")
     
+    async def run_blocking(self, func, *args):
+        """블로킹 함수를 스케줄러 스레드 풀에서 실행"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+    
     def stop(self):
         """스케줄러 중지"""
         if self.is_running:
@@ -61,10 +96,15 @@ class NotificationScheduler:
         start_time = time.time()
         logger.info("🔍 투자일 체크 시작 (병렬 처리)...")
         
+        if uses_distributed_scheduler():
+            # 같은 시각에 실행된 인스턴스들은 같은 run_key로 샤드를 나눠 가짐
+            await self.run_distributed(get_kst_now().strftime("%Y-%m-%dT%H"), start_time)
+            return
+        
         db = SessionLocal()
         try:
             # 오늘 투자일인 사용자 조회
-            today_users = self.get_users_with_investment_today(db)
+            today_users = await self.run_blocking(self.get_users_with_investment_today, db)
             
             if not today_users:
                 logger.info("ℹ️ 오늘 투자일인 사용자가 없습니다")
@@ -73,25 +113,94 @@ class NotificationScheduler:
             logger.info(f"📅 오늘 투자일인 사용자: {len(today_users)}명")
             
             # 병렬 처리로 개선
-            await self.process_users_in_parallel(db, today_users)
+            metrics = {}
+            await self.process_users_in_parallel(db, today_users, metrics=metrics)
             
             # 성능 메트릭 기록
             processing_time = time.time() - start_time
-            await self.record_metrics(len(today_users), processing_time)
+            await self.record_metrics(metrics, len(today_users), processing_time)
             
         except Exception as e:
             logger.error(f"❌ 투자일 체크 중 오류 발생: {e}")
         finally:
             db.close()
     
-    def get_users_with_investment_today(self, db: Session) -> List:
-        """오늘 투자일인 사용자 조회 (한 사용자의 모든 투자일 ETF 포함)"""
+    async def run_distributed(self, run_key: str, start_time: float):
+        """임대를 얻을 수 있는 샤드를 차례로 처리 (인스턴스가 늘면 샤드가 나뉘어 처리 시간이 줄어듦)"""
+        try:
+            await self.run_blocking(shard_coordinator.seed, run_key)
+        except Exception as e:
+            # 기록이 없는 샤드는 임대를 얻을 때 만들어짐
+            logger.error(f"❌ 실행 {run_key} 샤드 기록 생성 실패: {e}")
+        
+        user_count = 0
+        metrics = {}  # 이 실행에서 처리한 샤드들의 지표 (이어받기 작업과 동시에 실행되어도 섞이지 않음)
+        for shard in shard_coordinator.shard_order():
+            try:
+                if not await self.run_blocking(shard_coordinator.acquire, run_key, shard):
+                    continue
+                user_count += await self.process_shard(run_key, shard, metrics)
+            except Exception as e:
+                logger.error(f"❌ 샤드 {run_key}/{shard} 처리 중 오류 발생: {e}")
+        
+        if user_count:
+            await self.record_metrics(metrics, user_count, time.time() - start_time)
+    
+    async def resume_expired_shards(self):
+        """오늘 가장 최근 실행에서 임대가 없거나 만료된 샤드를 이어받아 남은 사용자만 처리 (이전 실행은 이어받지 않음)"""
+        try:
+            expired = await self.run_blocking(shard_coordinator.expired, get_kst_now().strftime("%Y-%m-%d"))
+        except Exception as e:
+            logger.error(f"❌ 중단된 샤드 조회 중 오류 발생: {e}")
+            return
+        
+        start_time = time.time()
+        user_count = 0
+        metrics = {}
+        for run_key, shard in expired:
+            try:
+                if not await self.run_blocking(shard_coordinator.acquire, run_key, shard):
+                    continue
+                shard_coordinator.counters["resumed"] += 1
+                logger.info(f"♻️ 중단된 샤드 {run_key}/{shard} 이어받기")
+                user_count += await self.process_shard(run_key, shard, metrics)
+            except Exception as e:
+                logger.error(f"❌ 샤드 {run_key}/{shard} 이어받기 중 오류 발생: {e}")
+        
+        if user_count:
+            await self.record_metrics(metrics, user_count, time.time() - start_time)
+    
+    async def process_shard(self, run_key: str, shard: int, metrics: dict) -> int:
+        """
+        임대를 얻은 샤드 하나 처리 (처리한 사용자 수 반환, 지표는 실행의 metrics에 더함)
+        - 끝까지 처리한 경우에만 완료로 기록하고, 오류/임대 상실이면 임대 만료 후 다른 실행이 이어받음
+        """
+        db = SessionLocal()
+        try:
+            today_users = await self.run_blocking(self.get_users_with_investment_today, db, shard, shard_coordinator.shard_count)
+            logger.info(f"📅 샤드 {run_key}/{shard} 투자일인 사용자: {len(today_users)}명")
+            
+            checkpoint = shard_coordinator.checkpoint(run_key, shard)
+            if today_users:
+                completed = await shard_coordinator.hold(
+                    run_key, shard, self.process_users_in_parallel(db, today_users, checkpoint, metrics)
+                )
+                if not completed:
+                    return 0
+            
+            await self.run_blocking(shard_coordinator.finish, run_key, shard, len(today_users))
+            return len(today_users)
+        finally:
+            db.close()
+    
+    def get_users_with_investment_today(self, db: Session, shard: Optional[int] = None, shard_count: int = 1) -> List:
+        """오늘 투자일인 사용자 조회 (한 사용자의 모든 투자일 ETF 포함, shard를 주면 해당 샤드 사용자만)"""
         today = get_kst_now()  # 한국 시간 기준
         today_weekday = today.weekday()  # 0=월요일, 6=일요일 (Python datetime.weekday() 기준)
         today_day = today.day  # 1-31
         
         # 투자 설정이 있고 알림이 활성화된 사용자 조회
-        enabled_users = get_users_with_notifications_enabled(db)
+        enabled_users = get_users_with_notifications_enabled(db, shard, shard_count)
         
         today_investors = []
         
@@ -114,15 +223,60 @@ class NotificationScheduler:
         
         return today_investors
     
-    async def process_users_in_parallel(self, db: Session, today_users: List):
-        """사용자들을 병렬로 처리하고, 결과를 취합하여 대량 알림을 전송"""
+    async def process_users_in_parallel(self, db: Session, today_users: List, checkpoint: Optional[ShardCheckpoint] = None,
+                                        metrics: Optional[dict] = None):
+        """
+        사용자들을 병렬로 처리하고, 결과를 취합하여 대량 알림을 전송
+        - checkpoint가 있으면(분산 모드) 이미 처리한 사용자는 건너뛰고, 판단만 끝나고 전송하지 못한 사용자는 저장된 분석으로 전송
+        - metrics: 이 실행의 지표 dict (분석 공유 지표를 더함)
+        """
         logger.info(f"🔄 사용자별 통합 AI 분석 시작: {len(today_users)}개 사용자")
+        metrics = {} if metrics is None else metrics
         
-        # 사용자별 통합 분석 요청 데이터 준비
-        analysis_requests = []
-        user_data_map = {}  # 요청과 사용자 데이터 매핑
+        # 이어받은 샤드면 이전 처리 기록 조회
+        claims = await self.run_blocking(
+            checkpoint.load, [user_data['user_setting'].user_id for user_data in today_users]
+        ) if checkpoint else {}
+        
+        # 실행 단위로 한 번만 시장 지표 스냅샷 조회 (모든 사용자 프롬프트에 공유)
+        market_snapshot = await request_market_snapshot() if len(claims) < len(today_users) else None
+        
+        # 사용자별 통합 분석 요청 데이터 준비 (사용자/ETF 조회가 사용자 수만큼 반복되므로 스레드 풀에서 실행)
+        analysis_requests, user_entries, resend_notifications = await self.run_blocking(
+            self.prepare_analysis_requests, db, today_users, claims, market_snapshot
+        )
+        
+        if not analysis_requests and not resend_notifications:
+            logger.warning("⚠️ 처리할 AI 분석 요청이 없습니다")
+            return
+        
+        notifications_to_send = list(resend_notifications)
+        if analysis_requests:
+            notifications_to_send += await self.analyze_and_decide(db, analysis_requests, user_entries, metrics, checkpoint)
+        
+        # 수집된 알림들을 대량으로 전송
+        if notifications_to_send:
+            logger.info(f"📤 통합 투자 알림 대량 전송 시작: {len(notifications_to_send)}개 (이어서 전송 {len(resend_notifications)}개)")
+            result_summary = await notification_service.send_bulk_notifications(notifications_to_send, checkpoint)
+            logger.info(f"✅ 통합 투자 알림 대량 전송 완료: {result_summary}")
+        else:
+            logger.info("ℹ️ 전송할 통합 투자 알림이 없습니다.")
+    
+    def prepare_analysis_requests(self, db: Session, today_users: List, claims: dict, market_snapshot) -> tuple:
+        """
+        사용자별 통합 분석 요청 생성
+        반환: (분석 요청 목록, [(사용자 데이터, 분석 요청 인덱스)], 판단은 끝났지만 전송하지 못한 알림 목록)
+        """
+        resend_notifications = []  # 재분석 없이 저장된 분석으로 전송
+        prepared = []  # (사용자 데이터, API 키, 모델, 구조화 출력 여부, 공유 분석 키)
+        dedup = uses_analysis_dedup()
+        shared_credentials = get_shared_analysis_credentials() if dedup else None
         
         for user_data in today_users:
+            claim_status, claim_payload = claims.get(user_data['user_setting'].user_id, (None, None))
+            if claim_status is not None and claim_status != 'pending':
+                # 알림 불필요로 판단했거나 이미 전송(시도)한 사용자
+                continue
             try:
                 # 사용자 정보 조회
                 user = get_user_by_id(db, user_data['user_setting'].user_id)
@@ -146,75 +300,169 @@ class NotificationScheduler:
                     logger.warning(f"⚠️ {user.name}님의 유효한 ETF가 없습니다")
                     continue
                 
-                # 사용자의 모든 ETF를 포함한 통합 분석 메시지 생성
-                analysis_messages = create_integrated_analysis_messages(
-                    user, user_data['user_setting'], etf_data_list
-                )
-                
-                # 배치 요청에 추가
-                request_id = len(analysis_requests)
-                analysis_requests.append({
-                    "messages": analysis_messages,
-                    "api_key": user_data['user_setting'].api_key,
-                    "model_type": user_data['user_setting'].model_type
-                })
+                if claim_status == 'pending':
+                    resend_notifications.append({
+                        'type': 'integrated_investment',
+                        'user_id': user.id,
+                        'user_setting': user_data['user_setting'],
+                        'etf_data_list': etf_data_list,
+                        'parsed_analysis': json.loads(claim_payload)
+                    })
+                    continue
                 
-                # 사용자 데이터 매핑
-                user_data_map[request_id] = {
+                # 분석 요청 자격: 공유 분석은 서비스 키가 있으면 서비스 키, 없으면 사용자 본인 키 (키가 같은 사용자끼리만 공유)
+                api_key, model_type = shared_credentials or (user_data['user_setting'].api_key, user_data['user_setting'].model_type)
+                structured = uses_structured_analysis(model_type)
+                dedup_key = analysis_dedup_key(user_data['user_setting'], etf_data_list, structured, shared_credentials) if dedup else None
+                prepared.append(({
                     "user": user,
                     "user_setting": user_data['user_setting'],
                     "etf_data_list": etf_data_list
-                }
-                
-                logger.info(f"📊 {user.name}님의 {len(etf_data_list)}개 ETF 통합 분석 준비 완료")
+                }, api_key, model_type, structured, dedup_key))
                 
             except Exception as e:
                 logger.error(f"❌ 사용자 데이터 준비 중 오류: {e}")
                 continue
         
-        if not analysis_requests:
-            logger.warning("⚠️ 처리할 AI 분석 요청이 없습니다")
-            return
+        # 같은 공유 분석 키의 사용자가 둘 이상일 때만 공유 (혼자면 공유해도 호출 수가 줄지 않으므로 기존 통합 분석)
+        group_sizes = Counter(dedup_key for *_, dedup_key in prepared if dedup_key is not None)
+        analysis_requests = []
+        user_entries = []  # (사용자 데이터, 분석 요청 인덱스) - 공유 분석이면 여러 사용자가 같은 요청을 가리킴
+        shared_requests = {}  # 공유 분석 키 -> 분석 요청 인덱스
+        for user_data, api_key, model_type, structured, dedup_key in prepared:
+            user, user_setting, etf_data_list = user_data["user"], user_data["user_setting"], user_data["etf_data_list"]
+            shared = group_sizes.get(dedup_key, 0) > 1
+            user_data["shared"] = shared
+            request_id = shared_requests.get(dedup_key) if shared else None
+            
+            if request_id is None:
+                if shared:
+                    # 같은 (심볼, 위험 성향, 날짜, 요청 자격)의 사용자들이 함께 쓸 공유 분석 요청 생성
+                    analysis_messages = create_shared_analysis_messages(
+                        user_setting.risk_level, etf_data_list, market_snapshot, structured
+                    )
+                else:
+                    # 사용자의 모든 ETF를 포함한 통합 분석 메시지 생성 (사용자 본인 키로 요청)
+                    model_type = user_setting.model_type
+                    structured = uses_structured_analysis(model_type)
+                    api_key = user_setting.api_key
+                    analysis_messages = create_integrated_analysis_messages(
+                        user, user_setting, etf_data_list, market_snapshot, structured
+                    )
+                
+                # 배치 요청에 추가
+                request_id = len(analysis_requests)
+                analysis_requests.append({
+                    "messages": analysis_messages,
+                    "api_key": api_key,
+                    "model_type": model_type,
+                    "structured": structured
+                })
+                if shared:
+                    shared_requests[dedup_key] = request_id
+            
+            # 사용자 데이터 매핑
+            user_entries.append((user_data, request_id))
+            
+            logger.info(f"📊 {user.name}님의 {len(etf_data_list)}개 ETF 통합 분석 준비 완료")
         
+        return analysis_requests, user_entries, resend_notifications
+    
+    async def analyze_and_decide(self, db: Session, analysis_requests: List, user_entries: List, metrics: dict,
+                                 checkpoint: Optional[ShardCheckpoint] = None) -> List:
+        """배치 AI 분석 후 알림 필요성을 판단하고 전송할 알림 목록 반환 (checkpoint가 있으면 판단 결과를 판단과 함께 커밋)"""
         # 배치 AI 분석 실행
         analysis_results = await request_batch_ai_analysis(analysis_requests)
         
+        # 응답이 있는 결과만 모아서 알림 필요성을 일괄 판단 (파싱/인코딩/저장을 한 번에 처리)
+        decided = [
+            (user_data, analysis_results[request_id])
+            for user_data, request_id in user_entries
+            if request_id < len(analysis_results) and analysis_results[request_id]
+        ]
+        if uses_analysis_dedup():
+            decided = await self.personalize_shared_results(decided, metrics)
+        
+        # 분석 공유 지표: 개인화 호출까지 포함한 전체 LLM 호출 수 기준, 샤드 여러 개면 실행 전체로 누적 (공유하지 않으면 dedup_ratio = 0)
+        metrics["users"] = metrics.get("users", 0) + len(user_entries)
+        metrics["analysis_requests"] = metrics.get("analysis_requests", 0) + len(analysis_requests)
+        metrics["llm_requests"] = metrics["analysis_requests"] + metrics.get("personalization_requests", 0)
+        metrics["dedup_ratio"] = 1 - metrics["llm_requests"] / metrics["users"] if metrics["users"] else 0
+        logger.info(f"📊 LLM 호출 누적 {metrics['llm_requests']}개 / 사용자 {metrics['users']}명 (공유율 {metrics['dedup_ratio']:.1%})")
+        # 이어받을 때 재분석/재판단하지 않도록 판단 결과는 최신 분석 결과 저장과 같은 트랜잭션으로 기록
+        decisions = await self.run_blocking(
+            determine_notifications_batch,
+            db,
+            [user_data["user"] for user_data, _ in decided],
+            [analysis_result for _, analysis_result in decided],
+            checkpoint.stage if checkpoint else None
+        )
+        
         # 알림 전송을 위한 데이터 수집
         notifications_to_send = []
-        for i, analysis_result in enumerate(analysis_results):
-            if i in user_data_map and analysis_result:
-                try:
-                    user_data = user_data_map[i]
-                    user = user_data["user"]
-                    
-                    # 분석 결과 저장
-                    portfolio_key = f"portfolio_{user.id}"
-                    
-                    # 알림 필요성 판단 및 파싱된 데이터 수신
-                    should_notify, parsed_analysis = determine_notification_need(db, user, analysis_result)
-                    logger.info(f"✅ {user.name}님의 {len(user_data['etf_data_list'])}개 ETF 통합 분석 완료: 알림 {'전송 필요' if should_notify else '불필요'}")
+        for (user_data, _), (should_notify, parsed_analysis) in zip(decided, decisions):
+            try:
+                user = user_data["user"]
+                logger.info(f"✅ {user.name}님의 {len(user_data['etf_data_list'])}개 ETF 통합 분석 완료: 알림 {'전송 필요' if should_notify else '불필요'}")
 
-                    if should_notify:
-                        notifications_to_send.append({
-                            'type': 'integrated_investment',
-                            'user_id': user.id,
-                            'user_setting': user_data["user_setting"],
-                            'etf_data_list': user_data["etf_data_list"],
-                            'parsed_analysis': parsed_analysis # 파싱된 데이터를 전달
-                        })
-                except Exception as e:
-                    logger.error(f"❌ 통합 분석 결과 처리 중 오류: {e}")
+                if should_notify:
+                    notifications_to_send.append({
+                        'type': 'integrated_investment',
+                        'user_id': user.id,
+                        'user_setting': user_data["user_setting"],
+                        'etf_data_list': user_data["etf_data_list"],
+                        'parsed_analysis': parsed_analysis # 파싱된 데이터를 전달
+                    })
+            except Exception as e:
+                logger.error(f"❌ 통합 분석 결과 처리 중 오류: {e}")
 
-        # 수집된 알림들을 대량으로 전송
-        if notifications_to_send:
-            logger.info(f"📤 통합 투자 알림 대량 전송 시작: {len(notifications_to_send)}개")
-            result_summary = await notification_service.send_bulk_notifications(notifications_to_send)
-            logger.info(f"✅ 통합 투자 알림 대량 전송 완료: {result_summary}")
-        else:
-            logger.info("ℹ️ 전송할 통합 투자 알림이 없습니다.")
+        return notifications_to_send
+    
+    async def personalize_shared_results(self, decided: List, metrics: dict) -> List:
+        """
+        공유 분석 결과를 사용자별로 개인화 (혼자 받은 통합 분석은 그대로)
+        - 기본: 종합 의견에 이름/금액/주기를 채워 넣는 템플릿 개인화 (LLM 호출 없음)
+        - ANALYSIS_LLM_PERSONALIZATION: 사용자 본인 API 키로 다시 작성 (tool 없이 한 번 호출), 실패하면 템플릿 개인화 결과 사용
+        """
+        decided = [
+            (user_data, personalize_shared_analysis(user_data["user"], user_data["etf_data_list"], analysis_result)
+             if user_data.get("shared") else analysis_result)
+            for user_data, analysis_result in decided
+        ]
+        if not uses_llm_personalization():
+            return decided
+        
+        shared_indexes = [index for index, (user_data, _) in enumerate(decided) if user_data.get("shared")]
+        personalization_requests = []
+        for index in shared_indexes:
+            user_data, shared_analysis = decided[index]
+            user_setting = user_data["user_setting"]
+            personalization_requests.append({
+                "messages": create_personalization_messages(
+                    user_data["user"], user_setting, user_data["etf_data_list"], shared_analysis,
+                    uses_structured_analysis(user_setting.model_type)
+                ),
+                "api_key": user_setting.api_key,
+                "model_type": user_setting.model_type,
+                "structured": uses_structured_analysis(user_setting.model_type),
+                "tools": False
+            })
+        if not personalization_requests:
+            return decided
+        
+        personalized = await request_batch_ai_analysis(personalization_requests)
+        failed = sum(1 for result in personalized if not result)
+        metrics["personalization_requests"] = metrics.get("personalization_requests", 0) + len(personalization_requests)
+        metrics["personalization_failed"] = metrics.get("personalization_failed", 0) + failed
+        if failed:
+            logger.warning(f"⚠️ 공유 분석 개인화 실패 {failed}건: 템플릿 개인화 결과를 그대로 사용")
+        for index, personal in zip(shared_indexes, personalized):
+            if personal:
+                decided[index] = (decided[index][0], personal)
+        return decided
     
-    async def record_metrics(self, user_count: int, processing_time: float):
-        """성능 메트릭 기록"""
+    async def record_metrics(self, metrics: dict, user_count: int, processing_time: float):
+        """성능 메트릭 기록 (실행의 metrics를 마지막 실행 지표로 교체)"""
         avg_time_per_user = processing_time / user_count if user_count > 0 else 0
         
         logger.info(f"📊 성능 메트릭:")
@@ -222,6 +470,9 @@ class NotificationScheduler:
         logger.info(f"   - 처리된 사용자: {user_count}명")
         logger.info(f"   - 사용자당 평균 시간: {avg_time_per_user:.2f}초")
         logger.info(f"   - 처리 속도: {user_count/processing_time:.2f}명/초")
+        if metrics:
+            logger.info(f"   - 분석 공유율: {metrics.get('dedup_ratio', 0):.1%}")
+        self.last_run_metrics = dict(metrics, processing_time=processing_time, finished_at=get_kst_now().isoformat())
     
     def is_investment_day(self, etf_setting, today_weekday: int, today_day: int) -> bool:
         """투자일 여부 확인"""
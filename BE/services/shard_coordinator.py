@@ -0,0 +1,152 @@
+"""
+분산 알림 스케줄링 조정
+- 실행(run_key)마다 사용자를 user_id % 샤드 수로 나누고, 인스턴스는 DB 임대(lease)를 얻은 샤드만 처리
+- 처리 중에는 임대를 주기적으로 연장하고, 인스턴스가 죽어 임대가 만료되면 다른 인스턴스가 샤드를 이어받음
+- 사용자별 판단 결과(skipped / pending)와 전송 상태(sending / sent / failed)를 기록해 이어받을 때 재분석/중복 전송을 막음
+  (전송 직전에 pending -> sending으로 바꾼 인스턴스만 전송하므로, 전송 중 죽은 사용자는 다시 보내지 않음: 최대 한 번 전송)
+"""
+
+import os
+import json
+import socket
+import asyncio
+import logging
+import zlib
+from typing import Dict, List, Tuple
+
+from database import SessionLocal
+from config.notification_config import SCHEDULER_LEASE_TTL, get_scheduler_shards
+from crud.scheduler import (
+    acquire_shard_lease,
+    renew_shard_lease,
+    finish_shard_run,
+    seed_shard_runs,
+    get_expired_shard_runs,
+    get_send_claims,
+    stage_send_decisions,
+    claim_send,
+    complete_send)
+
+logger = logging.getLogger(__name__)
+
+
+def run_db(func, *args):
+    """짧은 DB 작업 하나를 별도 세션으로 실행 (임대/체크포인트 기록은 처리 중인 세션과 분리해 즉시 커밋)"""
+    db = SessionLocal()
+    try:
+        return func(db, *args)
+    finally:
+        db.close()
+
+
+class ShardCheckpoint:
+    """샤드 하나의 사용자별 처리 기록"""
+
+    def __init__(self, run_key: str, shard: int, owner: str):
+        self.run_key = run_key
+        self.shard = shard
+        self.owner = owner
+
+    def load(self, user_ids: List[int]) -> Dict[int, Tuple[str, str]]:
+        """이미 처리한 사용자 {user_id: (status, payload)}"""
+        claims = run_db(get_send_claims, self.run_key, user_ids)
+        return {user_id: (claim.status, claim.payload) for user_id, claim in claims.items()}
+
+    def stage(self, db, decisions: List[Tuple[int, bool, dict]]):
+        """
+        판단 결과 [(user_id, 알림 여부, 파싱된 분석)]를 db 세션에 추가 (커밋은 호출한 쪽에서)
+        - 최신 분석 결과 저장과 같은 트랜잭션으로 커밋해야, 이어받은 인스턴스가 저장된 결과와 비교해 '변화 없음'으로 판단하지 않음
+        - 알림 대상은 전송할 분석 결과를 함께 보관
+        """
+        stage_send_decisions(db, self.run_key, self.owner, [
+            {
+                "user_id": user_id,
+                "status": "pending" if should_notify else "skipped",
+                "payload": json.dumps(parsed_analysis, ensure_ascii=False) if should_notify else None
+            }
+            for user_id, should_notify, parsed_analysis in decisions
+        ])
+
+    def claim(self, user_id: int) -> bool:
+        """전송 권한 획득 (다른 인스턴스가 이미 전송 중/완료면 False)"""
+        return run_db(claim_send, self.run_key, user_id, self.owner)
+
+    def complete(self, user_id: int, sent: bool):
+        run_db(complete_send, self.run_key, user_id, "sent" if sent else "failed")
+
+
+class ShardCoordinator:
+    """인스턴스 단위 샤드 임대 관리"""
+
+    def __init__(self, shard_count: int = None, lease_ttl: int = SCHEDULER_LEASE_TTL):
+        self.instance_id = os.getenv("SCHEDULER_INSTANCE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+        self.shard_count = shard_count or get_scheduler_shards()
+        self.lease_ttl = lease_ttl
+        self.counters = {"acquired": 0, "finished": 0, "lost": 0, "resumed": 0}
+
+    def shard_order(self) -> List[int]:
+        """인스턴스마다 다른 샤드부터 시도하도록 인스턴스 ID 기준으로 회전한 샤드 순서"""
+        offset = zlib.crc32(self.instance_id.encode("utf-8")) % self.shard_count
+        return [(offset + i) % self.shard_count for i in range(self.shard_count)]
+
+    def acquire(self, run_key: str, shard: int) -> bool:
+        acquired = run_db(acquire_shard_lease, run_key, shard, self.instance_id, self.lease_ttl)
+        if acquired:
+            self.counters["acquired"] += 1
+        return acquired
+
+    def finish(self, run_key: str, shard: int, users_total: int):
+        run_db(finish_shard_run, run_key, shard, self.instance_id, users_total)
+        self.counters["finished"] += 1
+
+    def expired(self, run_key_prefix: str) -> List[Tuple[str, int]]:
+        """가장 최근 실행에서 임대가 없거나 만료된 미완료 샤드 [(run_key, shard)]"""
+        return run_db(get_expired_shard_runs, run_key_prefix)
+
+    def seed(self, run_key: str):
+        """실행의 모든 샤드 진행 기록을 미리 생성 (임대를 얻기 전에 죽은 샤드도 이어받을 수 있도록), 이전 실행의 미완료 샤드는 superseded 처리"""
+        run_db(seed_shard_runs, run_key, self.shard_count)
+
+    def checkpoint(self, run_key: str, shard: int) -> ShardCheckpoint:
+        return ShardCheckpoint(run_key, shard, self.instance_id)
+
+    async def hold(self, run_key: str, shard: int, work) -> bool:
+        """
+        임대를 연장하면서 work(코루틴)를 실행
+        - 연장에 실패하면(다른 인스턴스가 이어받음) work를 취소하고 False 반환
+        """
+        task = asyncio.create_task(work)
+        interval = max(self.lease_ttl / 3, 1)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=interval)
+                if done:
+                    task.result()
+                    return True
+                try:
+                    renewed = await asyncio.get_running_loop().run_in_executor(
+                        None, run_db, renew_shard_lease, run_key, shard, self.instance_id, self.lease_ttl
+                    )
+                except Exception as e:
+                    # 일시적인 DB 오류는 다음 주기에 다시 시도 (그 사이 만료되면 이어받은 쪽과 전송 기록으로 구분)
+                    logger.warning(f"⚠️ 샤드 {run_key}/{shard} 임대 연장 실패: {e}")
+                    continue
+                if not renewed:
+                    self.counters["lost"] += 1
+                    logger.warning(f"⚠️ 샤드 {run_key}/{shard} 임대를 잃어 처리 중단")
+                    return False
+        finally:
+            if not task.done():
+                task.cancel()
+
+    def metrics(self) -> dict:
+        return {
+            "instance_id": self.instance_id,
+            "shards": self.shard_count,
+            "lease_ttl": self.lease_ttl,
+            **self.counters,
+        }
+
+
+# 프로세스 공용 샤드 조정자
+shard_coordinator = ShardCoordinator()
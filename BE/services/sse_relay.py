@@ -0,0 +1,143 @@
+"""
+AI 서비스 -> 백엔드 SSE 중계
+- raw 모드: aiter_raw로 받은 바이트에서 이벤트 경계만 찾아 data 줄(JSON bytes)을 다시 직렬화하지 않고 그대로 전달
+  (본문은 저장용으로 bytearray에만 이어 붙였다가 끝날 때 한 번에 디코딩)
+- parse 모드: 줄마다 json.loads 후 content를 목록에 모아 전달 (기존 방식, 비교/문제 발생 시 되돌리기용)
+- 한 번에 읽힌 여러 content 이벤트는 설정에 따라 이벤트 하나로 합쳐 전달 (JSON 문자열 본문끼리 이어 붙이므로 파싱 없음)
+"""
+
+import os
+import json
+from typing import Callable, List
+
+# 중계 설정 (환경 변수로 조정 가능)
+CHAT_RELAY_MODE = os.getenv("CHAT_RELAY_MODE", "raw").lower()  # raw / parse
+CHAT_RELAY_COALESCE = os.getenv("CHAT_RELAY_COALESCE", "true").lower() == "true"  # 같은 읽기의 이벤트 합치기
+CHAT_RELAY_COALESCE_MAX_BYTES = int(os.getenv("CHAT_RELAY_COALESCE_MAX_BYTES", "4096"))  # 합친 이벤트 하나의 최대 크기
+
+EVENT_SEPARATOR = b"\n\n"
+DATA_PREFIX = b"data: "
+DONE = b"[DONE]"
+# AI 서비스가 보내는 content 이벤트 형식: json.dumps({'content': ...}) (ensure_ascii라 ASCII bytes)
+CONTENT_PREFIX = b'{"content": "'
+CONTENT_SUFFIX = b'"}'
+
+
+def split_events(buffer: bytearray) -> List[bytes]:
+    """버퍼에서 완성된 이벤트의 data 내용만 꺼내고, 남은 미완성 이벤트는 버퍼에 둠"""
+    payloads = []
+    start = 0
+    while True:
+        end = buffer.find(EVENT_SEPARATOR, start)
+        if end < 0:
+            break
+        for line in buffer[start:end].split(b"\n"):
+            if line.startswith(DATA_PREFIX):
+                payloads.append(bytes(line[len(DATA_PREFIX):]))
+        start = end + len(EVENT_SEPARATOR)
+    del buffer[:start]
+    return payloads
+
+
+def is_content_event(payload: bytes) -> bool:
+    return payload.startswith(CONTENT_PREFIX) and payload.endswith(CONTENT_SUFFIX)
+
+
+def coalesce_events(payloads: List[bytes], max_bytes: int = CHAT_RELAY_COALESCE_MAX_BYTES) -> List[bytes]:
+    """연속된 content 이벤트를 max_bytes 이하의 이벤트 하나로 합침 (이스케이프된 JSON 문자열 본문은 그대로 이어 붙여도 유효)"""
+    merged, group, size = [], [], 0
+    overhead = len(CONTENT_PREFIX) + len(CONTENT_SUFFIX)
+
+    def flush():
+        if len(group) == 1:
+            merged.append(group[0])
+        elif group:
+            merged.append(CONTENT_PREFIX + b"".join(payload[len(CONTENT_PREFIX):-len(CONTENT_SUFFIX)] for payload in group) + CONTENT_SUFFIX)
+        group.clear()
+
+    for payload in payloads:
+        if not is_content_event(payload):
+            flush()
+            size = 0
+            merged.append(payload)
+            continue
+        body = len(payload) - overhead
+        if group and size + body > max_bytes - overhead:
+            flush()
+            size = 0
+        group.append(payload)
+        size += body
+    flush()
+    return merged
+
+
+class ContentAccumulator:
+    """저장용 답변 본문 (이스케이프된 JSON 문자열 본문을 bytearray 하나에 이어 붙였다가 끝에서 한 번만 디코딩)"""
+
+    def __init__(self):
+        self.body = bytearray()
+
+    def add(self, payload: bytes):
+        if is_content_event(payload):
+            self.body += memoryview(payload)[len(CONTENT_PREFIX):-len(CONTENT_SUFFIX)]
+            return
+        # 형식이 다른 이벤트만 따로 디코딩해서 같은 형태(이스케이프된 본문)로 보관
+        try:
+            item = json.loads(payload)
+            content = item.get("content", "") if isinstance(item, dict) else str(item)
+        except ValueError:
+            content = payload.decode("utf-8", "replace")
+        self.body += json.dumps(content).encode("ascii")[1:-1]
+
+    def text(self) -> str:
+        return json.loads(b'"' + self.body + b'"') if self.body else ""
+
+
+async def relay_raw(response, publish: Callable[[bytes], None], coalesce: bool = CHAT_RELAY_COALESCE,
+                    max_bytes: int = CHAT_RELAY_COALESCE_MAX_BYTES) -> str:
+    """AI 서비스 응답 바이트를 이벤트 단위로 그대로 전달하고 저장용 본문 반환"""
+    buffer = bytearray()
+    accumulator = ContentAccumulator()
+    async for chunk in response.aiter_raw():
+        buffer += chunk
+        payloads = split_events(buffer)
+        if not payloads:
+            continue
+        done = DONE in payloads
+        if done:
+            payloads = payloads[:payloads.index(DONE)]
+        for payload in (coalesce_events(payloads, max_bytes) if coalesce else payloads):
+            if not payload.startswith(b"{"):
+                # JSON이 아닌 data는 기존처럼 content로 감싸서 전달
+                payload = json.dumps({"content": payload.decode("utf-8", "replace")}).encode("ascii")
+            accumulator.add(payload)
+            publish(payload)
+        if done:
+            break
+    return accumulator.text()
+
+
+async def relay_parsed(response, publish: Callable[[bytes], None]) -> str:
+    """줄마다 JSON을 파싱해 content만 다시 직렬화해서 전달하고 저장용 본문 반환"""
+    parts = []
+    async for line in response.aiter_lines():
+        if line.startswith('data: '):
+            data = line[6:]  # 'data: ' 제거
+            if data == '[DONE]':
+                break
+            try:
+                parsed = json.loads(data)
+                if 'content' in parsed:
+                    parts.append(parsed['content'])
+                    publish(json.dumps({'content': parsed['content']}).encode("ascii"))
+            except json.JSONDecodeError:
+                parts.append(data)
+                publish(json.dumps({'content': data}).encode("ascii"))
+    return "".join(parts)
+
+
+async def relay_chat_stream(response, publish: Callable[[bytes], None]) -> str:
+    """CHAT_RELAY_MODE에 따라 중계 방식 선택"""
+    if CHAT_RELAY_MODE == "parse":
+        return await relay_parsed(response, publish)
+    return await relay_raw(response, publish)
@@ -0,0 +1,107 @@
+"""
+알림 스케줄러 워커
+API 서버(uvicorn)와 별도 프로세스에서 알림 스케줄러와 전송을 실행해, 실행 중의 DB 조회/알림 판단/이메일 전송이
+API 요청 처리와 이벤트 루프/스레드 풀/DB 연결 풀을 나눠 쓰지 않도록 함
+
+실행: BE 디렉토리에서 `python -m services.worker` (API 서버는 ENABLE_IN_PROCESS_SCHEDULER=false로 실행)
+      `python -m services.worker --once`는 스케줄 없이 투자일 체크를 한 번만 실행
+지표: WORKER_METRICS_PORT를 지정하면 해당 포트의 HTTP GET 요청에 실행 지표(JSON)를 응답 (API 서버 /metrics의 scheduler 항목)
+"""
+
+import sys
+import json
+import signal
+import asyncio
+import logging
+from dotenv import load_dotenv
+
+# .env 파일 로드 (설정 모듈보다 먼저)
+load_dotenv()
+
+from database import engine, Base
+from config.notification_config import get_worker_metrics_port
+from services.scheduler_service import scheduler
+from services.shard_coordinator import shard_coordinator
+
+logger = logging.getLogger(__name__)
+
+
+def setup_logging():
+    """워커 로깅 설정 (콘솔 로그)"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler()]
+    )
+
+
+def worker_metrics() -> dict:
+    """워커의 마지막 스케줄러 실행 지표와 샤드 임대 현황"""
+    return {
+        "scheduler_mode": "worker",
+        "scheduler": scheduler.last_run_metrics,
+        "scheduler_shards": shard_coordinator.metrics()
+    }
+
+
+async def serve_metrics(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """요청 경로와 관계없이 실행 지표를 JSON으로 한 번 응답하고 연결 종료"""
+    try:
+        await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=5)
+        body = json.dumps(worker_metrics(), ensure_ascii=False, default=str).encode("utf-8")
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json; charset=utf-8\r\n"
+            + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii")
+            + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def run_worker(once: bool = False):
+    # 데이터베이스 테이블 생성 (API 서버보다 먼저 뜰 수 있으므로)
+    Base.metadata.create_all(bind=engine)
+
+    if once:
+        await scheduler.check_investment_dates()
+        logger.info(f"📊 실행 지표: {scheduler.last_run_metrics}")
+        return
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Windows에서는 KeyboardInterrupt로 종료
+            pass
+
+    metrics_port = get_worker_metrics_port()
+    metrics_server = await asyncio.start_server(serve_metrics, "0.0.0.0", metrics_port) if metrics_port else None
+
+    scheduler.start()
+    logger.info(f"✅ 알림 스케줄러 워커 시작{f' (지표 포트 {metrics_port})' if metrics_server else ''}")
+    try:
+        await stop_event.wait()
+    finally:
+        logger.info("워커 종료 중...")
+        scheduler.stop()
+        if metrics_server is not None:
+            metrics_server.close()
+            await metrics_server.wait_closed()
+        logger.info("✅ 알림 스케줄러 워커 종료 완료")
+
+
+def main():
+    setup_logging()
+    try:
+        asyncio.run(run_worker(once="--once" in sys.argv[1:]))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# BE 디렉토리 기준 import (services.*, config.* 등)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
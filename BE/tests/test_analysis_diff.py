@@ -0,0 +1,46 @@
+import pytest
+
+from services.analysis_diff import (
+    normalize_action, classify_change,
+    MAINTAIN, INCREASE, DECREASE, UNKNOWN, CHANGED, UNCHANGED, UNDETERMINED,
+)
+
+
+@pytest.mark.parametrize("recommendation, expected", [
+    # 단독 매수/매도와 부정/보류 표현
+    ("정기 매수 유지", (MAINTAIN, None)),
+    ("매수 보류", (MAINTAIN, None)),
+    ("현 비중 유지, 매도 자제", (MAINTAIN, None)),
+    ("비중 유지 (시장 안정, 추가 매수 불필요)", (MAINTAIN, None)),
+    ("비중 확대는 하지 않음", (MAINTAIN, None)),
+    # 비중 조정 표현과 비율 (괄호 안 비율 포함)
+    ("비중 확대 고려 (10%)", (INCREASE, 10.0)),
+    ("비중 10% 증가 권고 (기술주 강세, 성장 기대)", (INCREASE, 10.0)),
+    ("비중을 15% 늘려 주세요", (INCREASE, 15.0)),
+    ("비중 5% 축소", (DECREASE, 5.0)),
+    ("일부 매도 권고 (차익 실현)", (DECREASE, None)),
+    ("Increase by 5%", (INCREASE, 5.0)),
+    # 신호가 충돌하거나 없으면 판단 보류
+    ("비중 확대, 비중 축소", (UNKNOWN, None)),
+    ("비중 유지 후 확대", (UNKNOWN, None)),
+    ("매수", (UNKNOWN, None)),
+    ("", (UNKNOWN, None)),
+])
+def test_normalize_action(recommendation, expected):
+    assert normalize_action(recommendation) == expected
+
+
+def analysis(*recommendations):
+    return {"etfs": [{"symbol": f"ETF{i}", "recommendation": text} for i, text in enumerate(recommendations)]}
+
+
+def test_hold_phrasings_are_unchanged():
+    assert classify_change(analysis("정기 매수 유지", "매수 보류"), analysis("비중 유지", "현 비중 유지, 매도 자제")) == UNCHANGED
+
+
+def test_negated_sell_is_not_a_decrease():
+    assert classify_change(analysis("현 비중 유지, 매도 자제"), analysis("비중 5% 축소")) == CHANGED
+
+
+def test_conflicting_signals_fall_back_to_text_comparison():
+    assert classify_change(analysis("비중 유지 후 확대"), analysis("비중 유지")) == UNDETERMINED
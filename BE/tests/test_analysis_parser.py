@@ -0,0 +1,169 @@
+"""
+단일 패스 분석 응답 파서(parse_analysis)와 변경 전 정규식 파서(legacy_parse) 비교
+- 정상 형식의 응답에서는 두 파서 결과가 같아야 함
+- 변형/손상된 응답과 무작위 변형(fuzz)에서도 예외 없이 결과 구조와 불변 조건을 지켜야 함
+"""
+
+import re
+import json
+import random
+
+import pytest
+
+from services.analysis_parser import parse_analysis, AnalysisParseError
+
+ETFS = [("SPY", "미국 S&P500"), ("QQQ", "미국 나스닥"), ("EWY", "한국"), ("EWJ", "일본"), ("MCHI", "중국"), ("VGK", "유럽")]
+RECOMMENDATIONS = ["비중 유지 (시장 안정, 추가 매수 불필요)", "비중 10% 증가 권고 (기술주 강세)", "비중 5% 축소 (변동성 확대)"]
+FUZZ_COUNT = 2000
+
+
+def legacy_parse(analysis_text):
+    """변경 전 parse_structured_ai_response (비교 기준)"""
+    parsed_data = {"etfs": [], "summary": ""}
+    summary_match = re.search(r'### 종합 의견:\s*(.*)', analysis_text, re.DOTALL | re.IGNORECASE)
+    if summary_match:
+        parsed_data["summary"] = summary_match.group(1).strip()
+        etf_section = analysis_text[:summary_match.start()]
+    else:
+        etf_section = analysis_text
+
+    for block in re.split(r'(?=####\s+)', etf_section):
+        block = block.strip()
+        if not block.startswith('####'):
+            continue
+        title_match = re.search(r'####\s+([A-Z0-9]+)\s*\((.*?)\)', block, re.IGNORECASE)
+        if not title_match:
+            continue
+        symbol, name = title_match.groups()
+        recommendation_match = re.search(r'-\s*\*\*권고 사항\*\*:\s*(.*)', block, re.IGNORECASE)
+        reason_match = re.search(r'-\s*\*\*이유\*\*:\s*(.*)', block, re.IGNORECASE | re.DOTALL)
+        parsed_data["etfs"].append({
+            "symbol": symbol.strip(),
+            "name": name.strip(),
+            "recommendation": recommendation_match.group(1).strip() if recommendation_match else "",
+            "reason": reason_match.group(1).strip() if reason_match else "",
+        })
+    return parsed_data
+
+
+def make_response(etfs, rng):
+    lines = ["### ETF 분석 결과", ""]
+    for symbol, name in etfs:
+        lines += [
+            f"#### {symbol} ({name})",
+            f"- **권고 사항**: {rng.choice(RECOMMENDATIONS)}",
+            f"- **이유**: {'글로벌 금리 동결과 실적 개선 기대가 반영되고 있습니다. ' * rng.randint(1, 4)}",
+            "",
+        ]
+    lines += ["### 종합 의견:", "전반적으로 안정된 시장입니다. 점진적이고 안정적인 접근이 필요합니다."]
+    return "\n".join(lines)
+
+
+def make_json_response(etfs, rng):
+    return json.dumps({
+        "etfs": [
+            {
+                "symbol": symbol,
+                "name": name,
+                "action": rng.choice(["maintain", "increase", "decrease"]),
+                "delta_pct": rng.choice([0, 5, 10]),
+                "reason": "글로벌 금리 동결과 실적 개선 기대가 반영되고 있습니다. " * rng.randint(1, 4),
+            }
+            for symbol, name in etfs
+        ],
+        "summary": "전반적으로 안정된 시장입니다. 점진적이고 안정적인 접근이 필요합니다.",
+    }, ensure_ascii=False)
+
+
+# 실제 형식의 응답과 흔한 변형/손상 사례
+CORPUS = {
+    "정상": make_response(ETFS[:3], random.Random(0)),
+    "정상(6개)": make_response(ETFS, random.Random(1)),
+    "이유 여러 줄": "#### SPY (미국 S&P500)\n- **권고 사항**: 비중 유지\n- **이유**: 첫째 줄\n둘째 줄\n\n### 종합 의견:\n요약",
+    "종합 의견 같은 줄": "#### SPY (미국 S&P500)\n- **권고 사항**: 비중 유지\n- **이유**: 안정\n### 종합 의견: 한 줄 요약",
+    "강조 없음": "#### SPY (미국 S&P500)\n- 권고 사항: 비중 유지\n- 이유: 안정\n\n### 종합 의견:\n요약",
+    "### 제목": "### SPY (미국 S&P500)\n- **권고 사항**: 비중 유지\n- **이유**: 안정\n\n### 종합 의견:\n요약",
+    "전각 괄호/콜론": "#### SPY（미국 S&P500）\n- **권고 사항**：비중 유지\n- **이유**：안정\n\n## 종합 의견\n요약",
+    "이유 누락": "#### SPY (미국 S&P500)\n- **권고 사항**: 비중 유지\n\n### 종합 의견:\n요약",
+    "종합 의견 누락": "#### SPY (미국 S&P500)\n- **권고 사항**: 비중 유지\n- **이유**: 안정",
+    "중복 ETF": "#### SPY (A)\n- **권고 사항**: 유지\n- **이유**: a\n#### SPY (B)\n- **권고 사항**: 유지\n- **이유**: b\n### 종합 의견:\n요약",
+    "제목 형식 오류": "#### SPY 미국 S&P500\n- **권고 사항**: 비중 유지\n- **이유**: 안정\n### 종합 의견:\n요약",
+    "JSON(구조화 출력)": json.dumps({
+        "etfs": [{"symbol": "SPY", "name": "미국 S&P500", "action": "increase", "delta_pct": 10, "reason": "실적 개선"}],
+        "summary": "요약",
+    }, ensure_ascii=False),
+    "JSON 손상": '{"etfs": [{"symbol": "SPY"',
+    "구조 없음": "오늘은 시장이 안정적입니다. 별도의 조정은 필요하지 않습니다.",
+    "빈 응답": "",
+}
+
+
+def mutate(text, rng):
+    """줄 삭제/중복/순서 변경/잘라내기/공백 삽입 중 하나를 적용"""
+    lines = text.splitlines()
+    if not lines:
+        return text
+    op = rng.randrange(5)
+    i = rng.randrange(len(lines))
+    if op == 0:
+        del lines[i]
+    elif op == 1:
+        lines.insert(i, lines[i])
+    elif op == 2:
+        j = rng.randrange(len(lines))
+        lines[i], lines[j] = lines[j], lines[i]
+    elif op == 3:
+        return text[:rng.randrange(len(text) + 1)]
+    else:
+        lines[i] = "   " + lines[i] + "  "
+    return "\n".join(lines)
+
+
+def check_invariants(text, parsed):
+    """파서가 항상 지켜야 하는 성질"""
+    assert set(parsed) == {"etfs", "summary"}
+    for etf in parsed["etfs"]:
+        assert {"symbol", "name", "recommendation", "reason"} <= set(etf)
+        assert etf["symbol"] and etf["symbol"] in text
+        # 이유는 다음 ETF 블록이나 종합 의견을 삼키지 않음
+        assert "####" not in etf["reason"] and "종합 의견" not in etf["reason"]
+    assert parsed["summary"] in text
+
+
+@pytest.mark.parametrize("name", ["정상", "정상(6개)"])
+def test_matches_legacy_parser_on_well_formed_corpus(name):
+    assert parse_analysis(CORPUS[name])[0] == legacy_parse(CORPUS[name])
+
+
+def test_matches_legacy_parser_on_generated_responses():
+    rng = random.Random(7)
+    for _ in range(200):
+        text = make_response(ETFS[:rng.randint(1, len(ETFS))], rng)
+        assert parse_analysis(text)[0] == legacy_parse(text)
+
+
+@pytest.mark.parametrize("name", list(CORPUS))
+def test_corpus_invariants(name):
+    text = CORPUS[name]
+    parsed, _ = parse_analysis(text)
+    check_invariants(text, parsed)
+
+
+@pytest.mark.parametrize("name", ["정상", "정상(6개)", "JSON(구조화 출력)"])
+def test_strict_accepts_well_formed(name):
+    parse_analysis(CORPUS[name], strict=True)
+
+
+@pytest.mark.parametrize("name", ["JSON 손상", "구조 없음", "빈 응답"])
+def test_strict_rejects_malformed(name):
+    with pytest.raises(AnalysisParseError):
+        parse_analysis(CORPUS[name], strict=True)
+
+
+def test_fuzzed_responses_keep_invariants():
+    rng = random.Random(42)
+    for _ in range(FUZZ_COUNT):
+        text = rng.choice(list(CORPUS.values()))
+        for _ in range(rng.randint(1, 4)):
+            text = mutate(text, rng)
+        check_invariants(text, parse_analysis(text)[0])
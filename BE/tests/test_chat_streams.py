@@ -0,0 +1,168 @@
+"""
+이어받기 가능한 채팅 스트림(services.chat_streams) 테스트
+- Last-Event-ID 이어받기, 링 버퍼에서 밀려난 이벤트(410), 구독자 없는 스트림의 생성 취소
+"""
+
+import json
+import asyncio
+
+import pytest
+
+from services.chat_streams import ChatStream, ChatStreamRegistry, StreamGone, parse_last_event_id, DONE
+
+GRACE = 0.05
+
+
+def event_id(event: bytes) -> str:
+    return event.split(b"\n", 1)[0][len(b"id: "):].decode("ascii")
+
+
+def event_data(event: bytes) -> bytes:
+    return event.split(b"\n")[1][len(b"data: "):]
+
+
+async def take(stream: ChatStream, last_seq: int = -1, count: int = None) -> list:
+    """구독해서 count개(없으면 끝까지) 이벤트를 받고 구독 종료"""
+    events = []
+    subscription = stream.subscribe(last_seq)
+    try:
+        async for event in subscription:
+            events.append(event)
+            if count is not None and len(events) == count:
+                break
+    finally:
+        await subscription.aclose()
+    return events
+
+
+def test_parse_last_event_id():
+    assert parse_last_event_id("abc:12") == ("abc", 12)
+    assert parse_last_event_id("a:b:3") == ("a:b", 3)
+    assert parse_last_event_id("abc") == (None, -1)
+    assert parse_last_event_id("abc:x") == (None, -1)
+    assert parse_last_event_id(None) == (None, -1)
+
+
+def test_resume_from_last_event_id():
+    async def scenario():
+        stream = ChatStream("s1", user_id=1)
+        for content in ["a", "b", "c"]:
+            stream.publish_content(content)
+
+        first = await take(stream, count=2)
+        stream_id, last_seq = parse_last_event_id(event_id(first[-1]))
+        assert (stream_id, last_seq) == ("s1", 1)
+
+        # 끊긴 사이 생성된 이벤트까지 놓친 것부터 이어받음
+        stream.publish_content("d")
+        stream.finish()
+        resumed = await take(stream, last_seq)
+        return resumed
+
+    resumed = asyncio.run(scenario())
+    assert [event_id(event) for event in resumed] == ["s1:2", "s1:3", "s1:4"]
+    assert [event_data(event) for event in resumed] == [
+        json.dumps({"content": "c"}).encode("ascii"), json.dumps({"content": "d"}).encode("ascii"), DONE
+    ]
+
+
+def test_subscriber_waits_for_new_events():
+    async def scenario():
+        stream = ChatStream("s1", user_id=1)
+        reader = asyncio.create_task(take(stream))
+        await asyncio.sleep(0)
+        stream.publish_content("a")
+        await asyncio.sleep(0)
+        stream.publish_content("b")
+        stream.finish()
+        return await reader
+
+    events = asyncio.run(scenario())
+    assert [event_id(event) for event in events] == ["s1:0", "s1:1", "s1:2"]
+
+
+def test_stream_gone_after_ring_buffer_overflow():
+    async def scenario():
+        stream = ChatStream("s1", user_id=1, buffer_size=3)
+        for content in "abcde":
+            stream.publish_content(content)  # 순번 0~4 중 2~4만 남음
+
+        with pytest.raises(StreamGone):
+            await take(stream, last_seq=0)
+        with pytest.raises(StreamGone):
+            await take(stream)
+        # 버퍼에 남은 첫 이벤트 바로 앞까지 받은 구독자는 이어받을 수 있음
+        return await take(stream, last_seq=1, count=3)
+
+    events = asyncio.run(scenario())
+    assert [event_id(event) for event in events] == ["s1:2", "s1:3", "s1:4"]
+
+
+def start_endless(registry: ChatStreamRegistry, release: asyncio.Event) -> ChatStream:
+    """release 전까지 끝나지 않는 답변 생성 스트림"""
+    async def producer(stream):
+        stream.publish_content("a")
+        await release.wait()
+        stream.publish_content("b")
+
+    stream = registry.start(1, producer)
+    stream.orphan_grace = GRACE
+    return stream
+
+
+def test_orphan_stream_is_cancelled_after_grace():
+    async def scenario():
+        registry = ChatStreamRegistry(ttl=60)
+        stream = start_endless(registry, asyncio.Event())
+        await take(stream, count=1)  # 구독 후 끊김
+
+        await asyncio.sleep(GRACE / 2)
+        assert not stream.task.done()
+
+        await asyncio.sleep(GRACE * 2)
+        return stream, registry
+
+    stream, registry = asyncio.run(scenario())
+    assert stream.abandoned
+    assert stream.task.done()
+    assert stream.done
+    assert registry.counters["abandoned"] == 1
+
+
+def test_resubscribe_within_grace_keeps_generation():
+    async def scenario():
+        registry = ChatStreamRegistry(ttl=60)
+        release = asyncio.Event()
+        stream = start_endless(registry, release)
+        first = await take(stream, count=1)
+
+        # 유예 시간 안에 이어받으면 생성을 계속함
+        await asyncio.sleep(GRACE / 2)
+        _, last_seq = parse_last_event_id(event_id(first[-1]))
+        reader = asyncio.create_task(take(stream, last_seq))
+        await asyncio.sleep(GRACE * 2)
+        assert not stream.task.done()
+
+        release.set()
+        return stream, registry, await reader
+
+    stream, registry, events = asyncio.run(scenario())
+    assert not stream.abandoned
+    assert registry.counters["abandoned"] == 0
+    assert [event_data(event) for event in events] == [json.dumps({"content": "b"}).encode("ascii"), DONE]
+
+
+def test_no_cancellation_after_finish():
+    async def scenario():
+        registry = ChatStreamRegistry(ttl=60)
+        release = asyncio.Event()
+        stream = start_endless(registry, release)
+        release.set()
+        events = await take(stream)
+        await asyncio.sleep(GRACE * 2)
+        return stream, registry, events
+
+    stream, registry, events = asyncio.run(scenario())
+    assert event_data(events[-1]) == DONE
+    assert not stream.abandoned
+    assert registry.counters["abandoned"] == 0
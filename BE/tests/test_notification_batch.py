@@ -0,0 +1,193 @@
+"""
+알림 필요성 일괄 판단(determine_notifications_batch)과 기존 사용자별 판단의 결과 비교
+- 기준은 일괄 판단 도입 전의 determine_notification_need (종합 의견 임베딩 비교) 로직
+- 구조 비교(structured) 모드는 의도적으로 판단 방식이 다르므로 embedding 모드에서 비교
+"""
+
+import math
+import hashlib
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("sqlalchemy")
+
+from services import ai_service
+from services.ai_service import determine_notifications_batch, parse_structured_ai_response
+from config.notification_config import SIMILARITY_THRESHOLD
+
+ENCODE_ERROR = "인코딩 오류를 일으키는 종합 의견"
+
+
+class FakeEmbedding:
+    """2차원 단위 벡터 임베딩 (문장별 각도로 유사도를 정함)"""
+
+    model_name = "fake-embedding"
+
+    def __init__(self, angles: dict):
+        self.angles = angles
+
+    def encode(self, texts):
+        vectors = []
+        for text in texts:
+            if text == ENCODE_ERROR:
+                raise RuntimeError("encode failed")
+            angle = self.angles.get(text)
+            if angle is None:
+                angle = int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16) % 360
+            radians = math.radians(angle)
+            vectors.append([math.cos(radians), math.sin(radians)])
+        return np.array(vectors, dtype=np.float32)
+
+
+class FakeDB:
+    def __init__(self, events=None):
+        self.events = events if events is not None else []
+
+    def commit(self):
+        self.events.append("commit")
+
+    def rollback(self):
+        self.events.append("rollback")
+
+
+def analysis_text(summary: str) -> str:
+    text = (
+        "### ETF 분석 결과\n\n"
+        "#### SPY (미국 S&P500)\n"
+        "- **권고 사항**: 비중 유지\n"
+        "- **이유**: 시장 안정\n\n"
+    )
+    return text + (f"### 종합 의견:\n{summary}\n" if summary else "")
+
+
+def legacy_determine_notification_need(user, analysis_result: str, encode, persist) -> tuple:
+    """일괄 판단 도입 전의 사용자별 판단 (DB 저장은 persist(setting_id)로 대체)"""
+    try:
+        parsed_analysis = parse_structured_ai_response(analysis_result)
+        previous_analysis = user.settings.last_analysis_result
+        last_analysis_time = user.settings.last_analysis_at
+        current_time = datetime.now(last_analysis_time.tzinfo if last_analysis_time else None)
+
+        is_first_analysis_today = not last_analysis_time or last_analysis_time.date() < current_time.date()
+        if is_first_analysis_today or not previous_analysis:
+            persist(user.settings.id)
+            return True, parsed_analysis
+
+        current_summary = parsed_analysis.get("summary", "")
+        previous_summary = parse_structured_ai_response(previous_analysis).get("summary", "")
+        if not current_summary or not previous_summary:
+            persist(user.settings.id)
+            return True, parsed_analysis
+
+        similarity = float(encode([current_summary])[0] @ encode([previous_summary])[0])
+        if similarity < SIMILARITY_THRESHOLD:
+            persist(user.settings.id)
+            return True, parsed_analysis
+        return False, parsed_analysis
+    except Exception:
+        return True, {"etfs": [], "summary": analysis_result}
+
+
+def make_user(user_id: int, last_analysis_at, previous_summary):
+    previous = analysis_text(previous_summary) if previous_summary is not None else None
+    return SimpleNamespace(id=user_id, settings=SimpleNamespace(
+        id=user_id * 10, last_analysis_at=last_analysis_at, last_analysis_result=previous
+    ))
+
+
+@pytest.fixture
+def cases():
+    now = datetime.now()
+    earlier_today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    yesterday = now - timedelta(days=1)
+    # (이름, 사용자, 현재 분석 결과)
+    return [
+        ("first_run_today", make_user(1, yesterday, "어제 의견"), analysis_text("오늘 의견")),
+        ("never_analyzed", make_user(2, None, None), analysis_text("오늘 의견")),
+        ("no_previous_result", make_user(3, earlier_today, None), analysis_text("오늘 의견")),
+        ("unchanged", make_user(4, earlier_today, "시장 안정"), analysis_text("시장 안정")),
+        ("nearly_unchanged", make_user(5, earlier_today, "금리 동결"), analysis_text("금리 동결 지속")),
+        ("changed", make_user(6, earlier_today, "기술주 강세"), analysis_text("기술주 약세")),
+        ("no_current_summary", make_user(7, earlier_today, "시장 안정"), analysis_text("")),
+        ("no_previous_summary", make_user(8, earlier_today, ""), analysis_text("시장 안정")),
+        ("encode_error", make_user(9, earlier_today, "변동성 확대"), analysis_text(ENCODE_ERROR)),
+    ]
+
+
+@pytest.fixture
+def embedding(monkeypatch):
+    fake = FakeEmbedding({
+        "금리 동결": 0.0, "금리 동결 지속": 10.0,  # cos 10° ≈ 0.985 (임계값 이상)
+        "기술주 강세": 0.0, "기술주 약세": 60.0,  # cos 60° = 0.5
+    })
+    monkeypatch.setattr(ai_service, "embedding_service", fake)
+    monkeypatch.setattr(ai_service, "NOTIFICATION_DIFF_MODE", "embedding")
+    monkeypatch.setattr(ai_service, "get_analysis_embeddings_by_setting_ids", lambda db, ids: {})
+    monkeypatch.setattr(ai_service, "bulk_upsert_analysis_embeddings", lambda db, rows: None)
+    return fake
+
+
+def run_batch(monkeypatch, users, results):
+    persisted = []
+    monkeypatch.setattr(ai_service, "bulk_update_analysis_results", lambda db, rows: persisted.extend(row["id"] for row in rows))
+    decisions = determine_notifications_batch(FakeDB(), users, results)
+    return decisions, persisted
+
+
+def run_legacy(embedding, users, results):
+    persisted = []
+    decisions = [
+        legacy_determine_notification_need(user, result, embedding.encode, persisted.append)
+        for user, result in zip(users, results)
+    ]
+    return decisions, persisted
+
+
+def test_batch_matches_per_user_decisions(monkeypatch, embedding, cases):
+    names = [name for name, _, _ in cases]
+    users = [user for _, user, _ in cases]
+    results = [result for _, _, result in cases]
+
+    batch, batch_persisted = run_batch(monkeypatch, users, results)
+    legacy, legacy_persisted = run_legacy(embedding, users, results)
+
+    assert {name: decision for name, decision in zip(names, batch)} == {name: decision for name, decision in zip(names, legacy)}
+    assert sorted(batch_persisted) == sorted(legacy_persisted)
+    # 기준 결과가 의도한 경우를 모두 포함하는지 확인
+    expected = {
+        "first_run_today": True, "never_analyzed": True, "no_previous_result": True, "unchanged": False,
+        "nearly_unchanged": False, "changed": True, "no_current_summary": True, "no_previous_summary": True,
+        "encode_error": True,
+    }
+    assert {name: notify for name, (notify, _) in zip(names, legacy)} == expected
+
+
+@pytest.mark.parametrize("index", range(9))
+def test_single_user_batch_matches_per_user_decision(monkeypatch, embedding, cases, index):
+    _, user, result = cases[index]
+    batch, batch_persisted = run_batch(monkeypatch, [user], [result])
+    legacy, legacy_persisted = run_legacy(embedding, [user], [result])
+    assert batch == legacy
+    assert batch_persisted == legacy_persisted
+
+
+def test_decisions_are_staged_in_the_same_transaction(monkeypatch, embedding, cases):
+    """분산 모드의 판단 기록은 최신 분석 결과 저장과 함께 커밋되어야 함 (이어받은 인스턴스가 '변화 없음'으로 판단하지 않도록)"""
+    users = [user for _, user, _ in cases]
+    results = [result for _, _, result in cases]
+    events = []
+    monkeypatch.setattr(ai_service, "bulk_update_analysis_results", lambda db, rows: events.append("update"))
+    staged = []
+
+    def on_decided(db, decisions):
+        events.append("stage")
+        staged.extend(decisions)
+
+    decisions = determine_notifications_batch(FakeDB(events), users, results, on_decided)
+
+    assert events == ["update", "stage", "commit"]
+    assert staged == [(user.id, notify, parsed) for user, (notify, parsed) in zip(users, decisions)]
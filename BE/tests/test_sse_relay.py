@@ -0,0 +1,156 @@
+"""
+채팅 SSE 중계(services.sse_relay) 테스트
+- raw 모드는 이스케이프된 JSON 문자열 본문을 바이트 단위로 이어 붙이므로, 이어 붙인 결과가 parse 모드와 같은지 확인
+"""
+
+import json
+import asyncio
+
+import pytest
+
+from services.sse_relay import (
+    split_events, coalesce_events, ContentAccumulator, relay_raw, relay_parsed,
+    CONTENT_PREFIX, CONTENT_SUFFIX,
+)
+
+# 따옴표, 역슬래시, 줄바꿈, 탭, 한글/이모지(비 ASCII) 포함
+TRICKY_CONTENTS = ["\"ETF\" ", "C:\\path\\ ", "첫 줄\n둘째 줄", "\t탭", "수익률 10% 📈", "끝"]
+
+
+def content_event(content: str) -> bytes:
+    """AI 서비스가 보내는 형식의 content 이벤트 data"""
+    return json.dumps({"content": content}).encode("ascii")
+
+
+def sse(payloads: list) -> bytes:
+    return b"".join(b"data: " + payload + b"\n\n" for payload in payloads)
+
+
+def chunked(data: bytes, size: int) -> list:
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+class FakeResponse:
+    """httpx 스트리밍 응답 대역 (aiter_raw / aiter_lines)"""
+
+    def __init__(self, reads: list):
+        self.reads = reads
+
+    async def aiter_raw(self):
+        for chunk in self.reads:
+            yield chunk
+
+    async def aiter_lines(self):
+        buffer = ""
+        for chunk in self.reads:
+            buffer += chunk.decode("utf-8")
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                yield line
+        if buffer:
+            yield buffer
+
+
+def run_relay(relay, reads: list, **kwargs) -> tuple:
+    published = []
+    text = asyncio.run(relay(FakeResponse(reads), published.append, **kwargs))
+    return text, published
+
+
+def published_text(published: list) -> str:
+    return "".join(json.loads(payload).get("content", "") for payload in published)
+
+
+def test_split_events_keeps_incomplete_event_in_buffer():
+    buffer = bytearray(b'data: {"content": "a"}\n\ndata: {"content": "b')
+    assert split_events(buffer) == [b'{"content": "a"}']
+    assert buffer == bytearray(b'data: {"content": "b')
+
+    buffer += b'"}\n\n'
+    assert split_events(buffer) == [b'{"content": "b"}']
+    assert buffer == bytearray()
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 64])
+def test_event_split_across_raw_chunks(size):
+    """이벤트 경계와 상관없이 잘린 읽기 단위에서도 같은 본문을 전달/저장"""
+    payloads = [content_event(content) for content in TRICKY_CONTENTS]
+    reads = chunked(sse(payloads) + b"data: [DONE]\n\n", size)
+
+    text, published = run_relay(relay_raw, reads, coalesce=False)
+
+    assert published == payloads
+    assert text == "".join(TRICKY_CONTENTS)
+
+
+def test_coalesced_escaped_content_round_trips():
+    """이스케이프 시퀀스와 비 ASCII가 섞인 본문을 합쳐도 유효한 JSON이고 내용이 같음"""
+    payloads = [content_event(content) for content in TRICKY_CONTENTS]
+
+    merged = coalesce_events(payloads, max_bytes=4096)
+
+    assert len(merged) == 1
+    assert json.loads(merged[0]) == {"content": "".join(TRICKY_CONTENTS)}
+
+
+def test_coalesce_at_exactly_max_bytes():
+    overhead = len(CONTENT_PREFIX) + len(CONTENT_SUFFIX)
+    payloads = [content_event("가"), content_event("나다")]  # 본문 6 / 12 bytes (\uXXXX)
+    exact = sum(len(payload) - overhead for payload in payloads) + overhead
+
+    merged = coalesce_events(payloads, max_bytes=exact)
+    assert len(merged) == 1
+    assert len(merged[0]) == exact
+    assert json.loads(merged[0]) == {"content": "가나다"}
+
+    # 1 byte 모자라면 나눠서 전달 (이벤트를 자르지는 않음)
+    assert coalesce_events(payloads, max_bytes=exact - 1) == payloads
+
+
+def test_coalesce_keeps_non_content_events_in_order():
+    payloads = [
+        content_event("a"), content_event("b"),
+        b'{"error": "\\"timeout\\""}',
+        content_event("c"),
+        b'{"content": "d", "cached": true}',  # content 형식이지만 필드가 더 있는 이벤트
+    ]
+
+    merged = coalesce_events(payloads, max_bytes=4096)
+
+    assert merged == [content_event("ab"), payloads[2], content_event("c"), payloads[4]]
+
+
+def test_accumulator_decodes_non_content_events_once():
+    accumulator = ContentAccumulator()
+    accumulator.add(content_event("\"인용\" "))
+    accumulator.add(json.dumps({"content": "줄\n바꿈", "cached": True}).encode("ascii"))
+    accumulator.add(b'{"error": "x"}')
+    accumulator.add("not json 한".encode("utf-8"))
+
+    assert accumulator.text() == "\"인용\" 줄\n바꿈not json 한"
+    assert ContentAccumulator().text() == ""
+
+
+@pytest.mark.parametrize("coalesce", [False, True])
+@pytest.mark.parametrize("size", [5, 40, 4096])
+def test_raw_and_parse_modes_persist_same_text(coalesce, size):
+    payloads = [content_event(content) for content in TRICKY_CONTENTS]
+    payloads.insert(2, b'{"error": "ignored"}')
+    reads = chunked(sse(payloads) + b"data: plain text\n\n" + b"data: [DONE]\n\n", size)
+
+    raw_text, raw_published = run_relay(relay_raw, reads, coalesce=coalesce, max_bytes=32)
+    parsed_text, parsed_published = run_relay(relay_parsed, reads)
+
+    expected = "".join(TRICKY_CONTENTS) + "plain text"
+    assert raw_text == parsed_text == expected
+    # 전달된 본문도 같음 (raw 모드는 content가 없는 이벤트도 그대로 전달)
+    assert published_text(raw_published) == published_text(parsed_published) == expected
+
+
+def test_relay_stops_at_done():
+    reads = [sse([content_event("a")]) + b"data: [DONE]\n\n" + sse([content_event("b")])]
+
+    text, published = run_relay(relay_raw, reads)
+
+    assert text == "a"
+    assert published == [content_event("a")]
@@ -130,52 +130,86 @@ class ApiService {
     return this.request(`/chat/history?limit=${limit}`);
   }
 
-  async sendMessageStream(message, onChunk) {
+  // SSE 스트림을 읽어 이벤트마다 onEvent({ id, data }) 호출. [DONE]을 받으면 true 반환
+  async readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) return false;
+
+      buffer += decoder.decode(value, { stream: true });
+      let events = buffer.split('\n\n');
+      buffer = events.pop(); // 남은 incomplete chunk
+
+      for (const event of events) {
+        let id = null;
+        let data = null;
+        for (const line of event.split('\n')) {
+          if (line.startsWith('id: ')) id = line.slice(4);
+          else if (line.startsWith('data: ')) data = line.slice(6);
+        }
+        if (data === null) continue;
+        if (data === '[DONE]') return true;
+        onEvent({ id, data });
+      }
+    }
+  }
+
+  // 연결이 끊기면 마지막으로 받은 이벤트 ID(Last-Event-ID)부터 이어받음
+  async sendMessageStream(message, onChunk, maxRetries = 3) {
     const authStore = useAuthStore.getState();
     const headers = {
       'Content-Type': 'application/json',
       ...authStore.getAuthHeaders(),
     };
 
-    try {
-      const response = await fetch(`${this.baseURL}/chat/stream`, {
-        method: 'POST',
-        headers,
-        body: JSON.stringify({ content: message }),
-      });
-
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
+    let lastEventId = null;
+    const handleEvent = ({ id, data }) => {
+      if (id) lastEventId = id;
+      try {
+        const parsed = JSON.parse(data);
+        onChunk(parsed.content || '');
+      } catch (e) {
+        console.error('Error parsing chunk:', e);
       }
+    };
+
+    let retries = 0;
+    while (true) {
+      try {
+        let response;
+        if (lastEventId === null) {
+          response = await fetch(`${this.baseURL}/chat/stream`, {
+            method: 'POST',
+            headers,
+            body: JSON.stringify({ content: message }),
+          });
+        } else {
+          const streamId = lastEventId.slice(0, lastEventId.lastIndexOf(':'));
+          response = await fetch(`${this.baseURL}/chat/stream/${streamId}`, {
+            headers: { ...headers, 'Last-Event-ID': lastEventId },
+          });
+        }
 
-      const reader = response.body.getReader();
-      const decoder = new TextDecoder();
-      let buffer = '';
-
-      while (true) {
-        const { done, value } = await reader.read();
-        if (done) break;
-
-        buffer += decoder.decode(value, { stream: true });
-        let lines = buffer.split('\n\n');
-        buffer = lines.pop(); // 남은 incomplete chunk
-
-        for (const line of lines) {
-          if (line.startsWith('data: ')) {
-            const data = line.slice(6);
-            if (data === '[DONE]') return;
-            try {
-              const parsed = JSON.parse(data);
-              onChunk(parsed.content || '');
-            } catch (e) {
-              console.error('Error parsing chunk:', e);
-            }
-          }
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
         }
+
+        if (await this.readEventStream(response, handleEvent)) return;
+        throw new Error('Stream closed before completion');
+      } catch (error) {
+        // 스트림 ID를 받기 전이거나(새 질문 전송 실패) 재시도 횟수를 넘으면 실패 처리
+        if (lastEventId === null || retries >= maxRetries) {
+          console.error('Stream request failed:', error);
+          throw error;
+        }
+        retries += 1;
+        console.warn(`Stream interrupted, resuming from ${lastEventId} (${retries}/${maxRetries})`);
+        await new Promise((resolve) => setTimeout(resolve, 500 * retries));
       }
-    } catch (error) {
-      console.error('Stream request failed:', error);
-      throw error;
     }
   }
 }